@@ -0,0 +1,253 @@
+import os
+import json
+import asyncio
+import logging
+import argparse
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
+
+from rate_limiter import get_rate_limiter
+from html_parsing import make_soup
+from page_cache import DEFAULT_CACHE_DIR, configure_page_cache, get_page_cache, page_type_of
+from http_fetcher import configure_http_fetcher, get_http_fetcher
+from page_readiness import ready_condition
+from catalog import DEFAULT_CATALOG_FILE, configure_catalog, get_catalog
+from record_store import COMPRESSIONS, DEFAULT_STORE_DIR, configure_record_store, get_record_store
+from resource_blocker import DEFAULT_CATEGORIES, RESOURCE_CATEGORIES, configure_resource_blocker, get_resource_blocker
+from coveo_api import DEFAULT_COMMUNITIES_FILE, HOMESITE_TEMPLATE, PLAN_TEMPLATE, get_community_summary
+from driver_pool import close_pool
+from community_records import community_record_exists, save_community_record
+from get_drhorton_page import apply_coveo_summary, collect_detail_urls, extract_community_info, load_api_data
+
+logger = logging.getLogger(__name__)
+
+# 默认同时进行中的页面数量
+DEFAULT_CONCURRENCY = 16
+
+
+def build_run_config(concurrency, scan_full_page=False, mean_delay=0.1, page_types=('community',)):
+    """构建crawl4ai的运行配置，数据容器出现后即返回页面"""
+    return CrawlerRunConfig(
+        cache_mode=CacheMode.BYPASS,
+        semaphore_count=concurrency,
+        scan_full_page=scan_full_page,
+        mean_delay=mean_delay,
+        max_range=mean_delay * 0.2,
+        wait_until='domcontentloaded',
+        wait_for=ready_condition(page_types),
+        wait_for_images=False,
+        page_timeout=60000,
+        verbose=False
+    )
+
+
+async def crawl_html(crawler, urls, concurrency, scan_full_page=False):
+    """使用arun_many并发抓取页面，返回 {url: html}"""
+    pages = {}
+    # 先从磁盘缓存回放有效期内的页面
+    cache = get_page_cache()
+    if cache is not None:
+        for url in urls:
+            content = cache.get(url)
+            if content:
+                pages[url] = content
+        urls = [url for url in urls if url not in pages]
+    if not urls:
+        return pages
+    # crawl4ai按域名间隔请求，间隔取自限速器当前的速率
+    limiter = get_rate_limiter()
+    mean_delay = 1 / limiter.current_rate(urls[0])
+    page_types = sorted({page_type_of(url) for url in urls})
+    config = build_run_config(concurrency, scan_full_page=scan_full_page, mean_delay=mean_delay, page_types=page_types)
+    results = await crawler.arun_many(urls, config=config)
+
+    # arun_many按输入顺序返回结果
+    for url, result in zip(urls, results):
+        if not result.success or not result.html:
+            limiter.record(url, error=True)
+            logger.error(f"抓取页面失败 {url}: {result.error_message}")
+        elif limiter.record(url, status=result.status_code, html=result.html):
+            logger.error(f"页面被拦截 {url}")
+        else:
+            pages[url] = result.html
+            if cache is not None:
+                cache.put(url, result.html, headers=result.response_headers)
+    logger.info(f"成功抓取 {len(pages)} 个页面，本次实际请求 {len(urls)} 个")
+    return pages
+
+
+async def fetch_html_direct(urls, concurrency):
+    """在线程池中用HTTP直连抓取详情页，返回 {url: html}，缺少容器的页面留给浏览器"""
+    fetcher = get_http_fetcher()
+    cache = get_page_cache()
+    if fetcher is None or not urls:
+        return {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(url):
+        if cache is not None:
+            content = await asyncio.to_thread(cache.get, url)
+            if content:
+                return url, content
+        async with semaphore:
+            content, headers = await asyncio.to_thread(fetcher.fetch, url)
+        if content and cache is not None:
+            cache.put(url, content, headers=headers)
+        return url, content
+
+    results = await asyncio.gather(*(fetch_one(url) for url in urls))
+    return {url: content for url, content in results if content}
+
+
+def install_resource_blocking(crawler, blocker):
+    """通过Playwright请求拦截中止匹配拦截规则的请求，并在返回HTML前输出该页面的拦截统计"""
+    async def before_goto(page, context=None, **kwargs):
+        if getattr(page, '_blocked_requests', None) is not None:
+            return page
+        page._blocked_requests = {}
+
+        async def handle(route):
+            category = blocker.category_of(route.request.url)
+            if category is None:
+                await route.continue_()
+                return
+            page._blocked_requests[category] = page._blocked_requests.get(category, 0) + 1
+            await route.abort('blockedbyclient')
+
+        await page.route('**/*', handle)
+        return page
+
+    async def before_return_html(page, html, context=None, **kwargs):
+        blocked = getattr(page, '_blocked_requests', None)
+        if blocked is not None:
+            blocker.record_page(page.url, blocked)
+        return page
+
+    crawler.crawler_strategy.set_hook('before_goto', before_goto)
+    crawler.crawler_strategy.set_hook('before_return_html', before_return_html)
+
+
+def process_community(url, soup, output_dir, detail_pages):
+    """用预先抓取的详情页解析并保存一个社区，返回保存位置；
+    详情页缺失时extract_*会回退到同步的Selenium下载，所以在线程池中调用"""
+    community_info = extract_community_info(soup, url, pages=detail_pages)
+    summary = get_community_summary(url)
+    if summary is not None:
+        apply_coveo_summary(community_info, summary)
+    return save_community_record(url, output_dir, community_info)
+
+
+async def crawl_communities(urls, output_dir, concurrency=DEFAULT_CONCURRENCY):
+    """在一个事件循环中抓取社区页面及其所有homesite和floor-plan详情页"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 跳过已存在输出文件的社区，与fetch_page保持一致
+    pending = []
+    for url in urls:
+        if community_record_exists(url, output_dir):
+            logger.info(f"JSON file already exists for {url}, skipping...")
+        else:
+            pending.append(url)
+    if not pending:
+        return []
+
+    browser_config = BrowserConfig(headless=True, verbose=False)
+    async with AsyncWebCrawler(config=browser_config) as crawler:
+        if get_resource_blocker() is not None:
+            install_resource_blocking(crawler, get_resource_blocker())
+
+        # 第一阶段：抓取社区页面，需要滚动到底部以加载全部房源
+        community_pages = await crawl_html(crawler, pending, concurrency, scan_full_page=True)
+
+        # 第二阶段：汇总所有社区的详情页URL，一次性并发抓取
+        soups = {}
+        detail_urls = []
+        for url, html in community_pages.items():
+            soup = make_soup(html)
+            soups[url] = soup
+            detail_urls.extend(collect_detail_urls(soup))
+        detail_urls = list(dict.fromkeys(detail_urls))
+        logger.info(f"Fetching {len(detail_urls)} homesite/floor-plan pages for {len(soups)} communities")
+        detail_pages = await fetch_html_direct(detail_urls, concurrency)
+        remaining = [url for url in detail_urls if url not in detail_pages]
+        logger.info(f"{len(detail_pages)} detail pages served over HTTP, rendering {len(remaining)} in the browser")
+        detail_pages.update(await crawl_html(crawler, remaining, concurrency))
+
+    # 第三阶段：使用预先抓取的详情页，复用同步流程的extract_*函数；
+    # 在线程池中执行，抓取失败的详情页回退到Selenium时不会阻塞事件循环
+    written = []
+    for url, soup in soups.items():
+        try:
+            output_file = await asyncio.to_thread(process_community, url, soup, output_dir, detail_pages)
+            written.append(output_file)
+            logger.info(f"数据已保存到 {output_file}")
+        except Exception as e:
+            logger.error(f"处理URL时出错 {url}: {str(e)}")
+            logger.exception("详细错误信息：")
+    return written
+
+
+def main():
+    """主函数"""
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description='Crawl D.R. Horton communities with crawl4ai')
+    parser.add_argument('urls', nargs='*', help='Community URLs to crawl')
+    parser.add_argument('--links-file', default='data/drhorton/florida_links.json', help='JSON list of community URLs used when no URLs are given')
+    parser.add_argument('--output-dir', default='data/drhorton', help='Directory for drhorton_<name>.json files')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Maximum number of pages in flight')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Directory of the on-disk page cache')
+    parser.add_argument('--no-page-cache', action='store_true', help='Always crawl pages instead of replaying them from the disk cache')
+    parser.add_argument('--communities-file', default=DEFAULT_COMMUNITIES_FILE, help='Coveo community records written by get_drhorton_api_links.py')
+    parser.add_argument('--no-api', action='store_true', help='Use only fields scraped from the community page')
+    parser.add_argument('--homesite-template', default=HOMESITE_TEMPLATE, help='Coveo template name of homesite documents')
+    parser.add_argument('--plan-template', default=PLAN_TEMPLATE, help='Coveo template name of floor-plan documents')
+    parser.add_argument('--no-api-listings', action='store_true', help='Crawl homesite/floor-plan pages instead of querying them from Coveo')
+    parser.add_argument('--dump-listings', help='Save the raw Coveo homesite/floor-plan results to this JSON file (to check field names)')
+    parser.add_argument('--no-http-fetch', action='store_true', help='Render every homesite/floor-plan page in the browser instead of trying plain HTTP first')
+    parser.add_argument('--no-block-resources', action='store_true', help='Let the browser download images, fonts, media and trackers')
+    parser.add_argument('--block', nargs='+', choices=list(RESOURCE_CATEGORIES), default=list(DEFAULT_CATEGORIES), help='Resource categories blocked in the browser')
+    parser.add_argument('--block-pattern', action='append', default=[], help='Extra URL pattern to block (wildcard syntax, e.g. "*.css*")')
+    parser.add_argument('--allow-pattern', action='append', default=[], help='Remove a pattern from the block list (e.g. "*.svg*")')
+    parser.add_argument('--store', action='store_true', help='Stream community records to rotating JSONL shards instead of one JSON file per community')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help='Directory of the --store shards and their URL index')
+    parser.add_argument('--store-compression', choices=COMPRESSIONS, default='none', help='Compression of --store shards')
+    parser.add_argument('--catalog', nargs='?', const=DEFAULT_CATALOG_FILE, help='Also write communities, plans and homesites to a SQLite catalog')
+    args = parser.parse_args()
+
+    configure_resource_blocker(not args.no_block_resources, categories=args.block,
+                               block=args.block_pattern, allow=args.allow_pattern)
+    configure_page_cache(None if args.no_page_cache else args.cache_dir)
+    if args.store:
+        configure_record_store(args.store_dir, compression=args.store_compression)
+    configure_catalog(args.catalog)
+    configure_http_fetcher(not args.no_http_fetch, pool_size=args.concurrency)
+    if not args.no_api:
+        load_api_data(args)
+
+    urls = args.urls
+    if not urls:
+        with open(args.links_file, 'r', encoding='utf-8') as f:
+            urls = json.load(f)
+
+    logger.info(f"Found {len(urls)} URLs to process")
+    asyncio.run(crawl_communities(urls, args.output_dir, args.concurrency))
+    # 详情页回退到Selenium时创建的浏览器
+    close_pool()
+    if get_http_fetcher() is not None:
+        get_http_fetcher().report()
+    if get_resource_blocker() is not None:
+        get_resource_blocker().report()
+    if get_record_store() is not None:
+        get_record_store().report()
+        get_record_store().close()
+    if get_catalog() is not None:
+        get_catalog().report()
+        get_catalog().close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import json
+import time
+import logging
+import argparse
+
+from html_parsing import make_soup
+from get_drhorton_page import collect_detail_urls, extract_community_info
+from extraction_spec import extract_community_info_xpath
+from records import to_json
+
+COMMUNITY_PAGE = 'data/drhorton/raw_page.html'
+
+
+def timed(func, repeat):
+    """运行repeat次，返回(最后一次结果, 最快一次的耗时毫秒)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def normalized(info):
+    info['timestamp'] = None
+    return json.dumps(info, ensure_ascii=False, default=to_json)
+
+
+def main():
+    """比较BeautifulSoup提取与编译XPath规格提取的耗时和输出（均包含解析）"""
+    parser = argparse.ArgumentParser(description='Benchmark BeautifulSoup extraction against the compiled XPath spec')
+    parser.add_argument('--page', default=COMMUNITY_PAGE)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with open(args.page, 'r', encoding='utf-8') as f:
+        html = f.read()
+    # 详情页置空，只比较社区页面本身的提取
+    pages = {url: '' for url in collect_detail_urls(make_soup(html))}
+
+    cases = [
+        ('bs4 html.parser', lambda: normalized(extract_community_info(make_soup(html, backend='html.parser'), 'benchmark', pages=pages))),
+        ('bs4 lxml', lambda: normalized(extract_community_info(make_soup(html, backend='lxml'), 'benchmark', pages=pages))),
+        ('lxml XPath spec', lambda: normalized(extract_community_info_xpath(html, 'benchmark', pages=pages))),
+    ]
+
+    baseline = None
+    print(f"{'case':<20} {'ms/run':>9} {'speedup':>8}  identical")
+    for name, func in cases:
+        output, ms = timed(func, args.repeat)
+        if baseline is None:
+            baseline = (output, ms)
+        print(f"{name:<20} {ms:>9.1f} {baseline[1] / ms:>7.1f}x  {output == baseline[0]}")
+
+
+if __name__ == "__main__":
+    main()
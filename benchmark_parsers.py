@@ -0,0 +1,83 @@
+import json
+import time
+import logging
+import argparse
+
+import detail_pages
+from html_parsing import make_soup, make_detail_soup
+from records import to_json
+from detail_pages import parse_floorplan_images, parse_homesite_page_info
+from get_drhorton_page import collect_detail_urls, extract_community_info
+
+COMMUNITY_PAGE = 'data/drhorton/raw_page.html'
+DETAIL_PAGE = 'debug_page_content.html'
+
+
+def timed(func, repeat):
+    """运行repeat次，返回(最后一次结果, 最快一次的耗时毫秒)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def community_output(html, backend):
+    """用指定后端解析社区页面并提取社区JSON（不处理详情页）"""
+    soup = make_soup(html, backend=backend)
+    pages = {url: '' for url in collect_detail_urls(soup)}
+    info = extract_community_info(soup, 'benchmark', pages=pages)
+    info['timestamp'] = None
+    return json.dumps(info, sort_keys=True, ensure_ascii=False, default=to_json)
+
+
+def detail_output(html, backend, strained):
+    """解析详情页并提取楼层平面图和homesite信息"""
+    previous = detail_pages.make_detail_soup
+    if strained:
+        detail_pages.make_detail_soup = lambda content: make_detail_soup(content, backend=backend)
+    else:
+        detail_pages.make_detail_soup = lambda content: make_soup(content, backend=backend)
+    try:
+        return json.dumps([parse_floorplan_images(html), parse_homesite_page_info(html)], sort_keys=True, default=to_json)
+    finally:
+        detail_pages.make_detail_soup = previous
+
+
+def main():
+    """比较html.parser与lxml（以及SoupStrainer）的解析耗时和输出"""
+    parser = argparse.ArgumentParser(description='Benchmark BeautifulSoup parser backends on the captured pages')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with open(COMMUNITY_PAGE, 'r', encoding='utf-8') as f:
+        community_html = f.read()
+    with open(DETAIL_PAGE, 'r', encoding='utf-8') as f:
+        detail_html = f.read()
+
+    cases = [
+        ('community page, html.parser', lambda: community_output(community_html, 'html.parser')),
+        ('community page, lxml', lambda: community_output(community_html, 'lxml')),
+        ('detail page, html.parser', lambda: detail_output(detail_html, 'html.parser', strained=False)),
+        ('detail page, lxml', lambda: detail_output(detail_html, 'lxml', strained=False)),
+        ('detail page, lxml + SoupStrainer', lambda: detail_output(detail_html, 'lxml', strained=True)),
+    ]
+
+    results = {}
+    baselines = {}
+    for name, func in cases:
+        output, ms = timed(func, args.repeat)
+        kind = name.split(',')[0]
+        baseline = baselines.setdefault(kind, (output, ms))
+        results[name] = (ms, output == baseline[0], baseline[1] / ms)
+
+    print(f"{'case':<36} {'ms/run':>9} {'speedup':>8}  identical")
+    for name, (ms, identical, speedup) in results.items():
+        print(f"{name:<36} {ms:>9.1f} {speedup:>7.1f}x  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import random
+import timeit
+import logging
+import argparse
+
+from records import Homesite
+from price_stats import listing_stats
+from spec_parsing import PRICE_PATTERN
+
+
+def string_max_price(homesites):
+    """原来的写法：逐个re.search后按字符串比较，"$99,000" > "$269,900\""""
+    max_price = None
+    for homesite in homesites:
+        if homesite.get('price'):
+            price_match = PRICE_PATTERN.search(str(homesite['price']))
+            if price_match:
+                current_price = price_match.group(0)
+                if not max_price or current_price > max_price:
+                    max_price = current_price
+    return max_price
+
+
+def random_homesites(rng, count):
+    return [Homesite(price=f"${rng.randint(90, 999) * 1000 + rng.randint(0, 999):,}", sqft=str(rng.randint(900, 4000)),
+                     beds=str(rng.randint(2, 6))) for _ in range(count)]
+
+
+def main():
+    """比较原来的逐个re.search字符串最大值与price_stats数值统计的耗时（正确性见tests/test_price_stats.py）"""
+    parser = argparse.ArgumentParser(description='Benchmark numeric price aggregation against the string max')
+    parser.add_argument('--homesites', type=int, default=200, help='Homesites per synthetic community')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    homesites = random_homesites(random.Random(args.seed), args.homesites)
+    cases = [
+        ('string max', lambda: string_max_price(homesites)),
+        ('listing_stats', lambda: listing_stats(homesites)),
+    ]
+    print(f"{'case':<16} {'us/community':>13}")
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print(f"{name:<16} {seconds * 1e6:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
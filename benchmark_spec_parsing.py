@@ -0,0 +1,129 @@
+import re
+import random
+import timeit
+import logging
+import argparse
+
+from html_parsing import make_soup
+from spec_parsing import parse_card_specs, parse_loose_specs
+
+COMMUNITY_PAGE = 'data/drhorton/raw_page.html'
+
+
+def inline_card_specs(text):
+    """原来的写法：每个字段单独调用re.search"""
+    raw = {}
+    for kind, pattern in (
+        ('price', r'\$[\d,]+'),
+        ('beds', r'(\d+)\s*Bed'),
+        ('baths', r'(\d+(?:\.\d+)?)\s*Bath'),
+        ('sqft', r'(\d+(?:,\d+)?)\s*Sq\.\s*Ft\.'),
+        ('stories', r'(\d+)\s*Story'),
+    ):
+        match = re.search(pattern, text)
+        if match:
+            raw[kind] = match.group(match.lastindex or 0)
+    match = re.search(r'(\d+)\s*Half\s*Bath', text, re.IGNORECASE)
+    if match:
+        raw['half_baths'] = match.group(1)
+    return raw
+
+
+def inline_loose_specs(text):
+    """原来宽松格式的写法"""
+    text = text.lower()
+    raw = {}
+    match = re.search(r'(\d+)\s*(?:bed|bedroom)', text)
+    if match:
+        raw['beds'] = match.group(1)
+    match = re.search(r'(\d+(?:\.\d+)?)\s*(?:bath|bathroom)', text)
+    if match:
+        raw['baths'] = match.group(1)
+    match = re.search(r'(\d+(?:,\d+)?)\s*sq\s*ft', text.replace(',', ''))
+    if match:
+        raw['sqft'] = match.group(1)
+    return raw
+
+
+def page_texts(path):
+    """社区页面卡片中的所有p/h2/h3文本"""
+    with open(path, 'r', encoding='utf-8') as f:
+        soup = make_soup(f.read())
+    texts = []
+    for card in soup.find_all('div', class_='card-content'):
+        texts.extend(tag.get_text(strip=True) for tag in card.find_all(['p', 'h2', 'h3']))
+    return texts
+
+
+def random_card_text(rng):
+    """随机组合卡片中会出现的片段；片段之间总有分隔符，数字粘连时分词器不会把一个数字拆成两个字段"""
+    pieces = [
+        f"${rng.randint(100, 999)},{rng.randint(0, 999):03d}",
+        f"{rng.randint(1, 7)} Bed",
+        f"{rng.randint(1, 5)}{rng.choice(['', '.5'])} Bath",
+        f"{rng.randint(1, 2)} {rng.choice(['Half', 'half'])} Bath",
+        f"{rng.randint(1, 4)},{rng.randint(0, 999):03d} Sq. Ft.",
+        f"{rng.randint(800, 999)} Sq. Ft.",
+        f"{rng.randint(1, 3)} Story",
+        rng.choice(['Garage', 'Under Contract', 'Starting in the $300s', '|', 'Plan 1800']),
+    ]
+    rng.shuffle(pieces)
+    return rng.choice([' ', ' | ', '\n']).join(pieces[:rng.randint(1, len(pieces))])
+
+
+def check_equivalence(texts, samples, seed):
+    """单次扫描的结果必须与逐个re.search一致，且数值字段类型正确"""
+    rng = random.Random(seed)
+    corpus = list(texts) + [random_card_text(rng) for _ in range(samples)]
+    failures = 0
+    for text in corpus:
+        specs = parse_card_specs(text)
+        if specs.raw != inline_card_specs(text):
+            failures += 1
+            print(f"card mismatch: {text!r}: {specs.raw} != {inline_card_specs(text)}")
+        for name, kind in (('price', int), ('beds', int), ('baths', float), ('half_baths', int), ('sqft', int), ('stories', int)):
+            value = getattr(specs, name)
+            if value is not None and not isinstance(value, kind):
+                failures += 1
+                print(f"type mismatch: {text!r}: {name}={value!r}")
+        if specs.price is not None and specs.price != int(specs.raw['price'][1:].replace(',', '')):
+            failures += 1
+            print(f"price mismatch: {text!r}")
+        loose_raw = parse_loose_specs(text).raw
+        if loose_raw != inline_loose_specs(text):
+            failures += 1
+            print(f"loose mismatch: {text!r}: {loose_raw} != {inline_loose_specs(text)}")
+    return len(corpus), failures
+
+
+def main():
+    """比较逐字段re.search与预编译单次扫描分词器的耗时，并检查两者结果一致"""
+    parser = argparse.ArgumentParser(description='Micro-benchmark the precompiled spec tokenizer')
+    parser.add_argument('--page', default=COMMUNITY_PAGE)
+    parser.add_argument('--samples', type=int, default=20000, help='Random card texts used for the equivalence check')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    texts = page_texts(args.page)
+    checked, failures = check_equivalence(texts, args.samples, args.seed)
+    print(f"equivalence: {checked} texts, {failures} mismatches")
+
+    rng = random.Random(args.seed)
+    corpus = texts + [random_card_text(rng) for _ in range(1000)]
+    cases = [
+        ('inline re.search', lambda: [inline_card_specs(text) for text in corpus]),
+        ('parse_card_specs', lambda: [parse_card_specs(text) for text in corpus]),
+    ]
+    baseline = None
+    print(f"{'case':<20} {'us/text':>9} {'speedup':>8}")
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        per_text = seconds / len(corpus) * 1e6
+        baseline = baseline or per_text
+        print(f"{name:<20} {per_text:>9.2f} {baseline / per_text:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
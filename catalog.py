@@ -0,0 +1,405 @@
+import os
+import sys
+import json
+import math
+import sqlite3
+import logging
+import argparse
+import threading
+
+from derivations import plan_stories
+from fetch_registry import normalize_url
+from spec_parsing import first_number, leading_int, price_to_dollars
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_FILE = 'data/drhorton/catalog.sqlite'
+DEFAULT_BATCH_SIZE = 50
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS communities (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    name TEXT,
+    status TEXT,
+    price_from INTEGER,
+    address TEXT,
+    phone TEXT,
+    description TEXT,
+    latitude REAL,
+    longitude REAL,
+    price_range TEXT,
+    bed_range TEXT,
+    bath_range TEXT,
+    sqft_range TEXT,
+    stories_range TEXT,
+    scraped_at TEXT
+);
+CREATE TABLE IF NOT EXISTS homeplans (
+    id INTEGER PRIMARY KEY,
+    community_id INTEGER NOT NULL REFERENCES communities(id) ON DELETE CASCADE,
+    url TEXT,
+    name TEXT,
+    price INTEGER,
+    beds INTEGER,
+    baths REAL,
+    half_baths INTEGER,
+    sqft INTEGER,
+    stories REAL,
+    status TEXT,
+    price_text TEXT,
+    image_url TEXT
+);
+CREATE TABLE IF NOT EXISTS homesites (
+    id INTEGER PRIMARY KEY,
+    community_id INTEGER NOT NULL REFERENCES communities(id) ON DELETE CASCADE,
+    url TEXT,
+    address TEXT,
+    plan TEXT,
+    price INTEGER,
+    beds INTEGER,
+    baths REAL,
+    sqft INTEGER,
+    status TEXT,
+    latitude REAL,
+    longitude REAL,
+    price_text TEXT,
+    image_url TEXT
+);
+CREATE TABLE IF NOT EXISTS amenities (
+    community_id INTEGER NOT NULL REFERENCES communities(id) ON DELETE CASCADE,
+    name TEXT,
+    description TEXT,
+    icon_url TEXT
+);
+CREATE TABLE IF NOT EXISTS schools (
+    community_id INTEGER NOT NULL REFERENCES communities(id) ON DELETE CASCADE,
+    name TEXT,
+    type_and_grades TEXT,
+    district TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_communities_location ON communities(latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_communities_price ON communities(price_from);
+CREATE INDEX IF NOT EXISTS idx_homeplans_community ON homeplans(community_id);
+CREATE INDEX IF NOT EXISTS idx_homeplans_url ON homeplans(url);
+CREATE INDEX IF NOT EXISTS idx_homeplans_price ON homeplans(price);
+CREATE INDEX IF NOT EXISTS idx_homeplans_beds_price ON homeplans(beds, price);
+CREATE INDEX IF NOT EXISTS idx_homeplans_sqft ON homeplans(sqft);
+CREATE INDEX IF NOT EXISTS idx_homesites_community ON homesites(community_id);
+CREATE INDEX IF NOT EXISTS idx_homesites_url ON homesites(url);
+CREATE INDEX IF NOT EXISTS idx_homesites_price ON homesites(price);
+CREATE INDEX IF NOT EXISTS idx_homesites_beds_price ON homesites(beds, price);
+CREATE INDEX IF NOT EXISTS idx_homesites_sqft ON homesites(sqft);
+CREATE INDEX IF NOT EXISTS idx_homesites_location ON homesites(latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_amenities_community ON amenities(community_id);
+CREATE INDEX IF NOT EXISTS idx_schools_community ON schools(community_id);
+'''
+
+
+def _community_row(key, url, record):
+    location = record.get('location') or {}
+    details = record.get('details') or {}
+    return (
+        key, url, record.get('name'), record.get('status'), price_to_dollars(record.get('price_from')),
+        record.get('address'), record.get('phone'), record.get('description'),
+        location.get('latitude'), location.get('longitude'),
+        details.get('price_range'), details.get('bed_range'), details.get('bath_range'),
+        details.get('sqft_range'), details.get('stories_range'), record.get('timestamp'),
+    )
+
+
+def _homeplan_row(community_id, plan):
+    details = plan.get('details') or {}
+    return (
+        community_id, plan.get('url'), plan.get('name'), price_to_dollars(details.get('price')),
+        leading_int(details['beds']) if details.get('beds') else None, first_number(details.get('baths')),
+        first_number(details.get('half_baths')), first_number(details.get('sqft')), plan_stories(plan),
+        details.get('status'), details.get('price'), details.get('image_url'),
+    )
+
+
+def _homesite_row(community_id, homesite):
+    return (
+        community_id, homesite.get('url'), homesite.get('address'), homesite.get('plan'),
+        price_to_dollars(homesite.get('price')), leading_int(homesite['beds']) if homesite.get('beds') else None,
+        first_number(homesite.get('baths')), first_number(homesite.get('sqft')), homesite.get('status'),
+        homesite.get('latitude'), homesite.get('longitude'), homesite.get('price'), homesite.get('image_url'),
+    )
+
+
+class Catalog:
+    """社区、户型、房源、配套和学校的SQLite目录，按批写入，用于按价格、卧室、面积和位置查询"""
+
+    def __init__(self, path=DEFAULT_CATALOG_FILE, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.stats = {'communities': 0, 'batches': 0}
+        self._pending = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('PRAGMA foreign_keys=ON')
+        self._db.executescript(SCHEMA)
+
+    def add(self, record, url=None):
+        """登记一个社区记录，攒够batch_size个后在一个事务中写入"""
+        url = url or record.get('url')
+        if not url:
+            logger.warning(f"社区记录没有url，无法写入目录: {record.get('name')}")
+            return
+        with self._lock:
+            # 同一批次内重复的社区只保留最新的记录
+            self._pending[normalize_url(url)] = (url, record)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        batch = list(self._pending.items())
+        self._pending.clear()
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            for key, (url, record) in batch:
+                self._write(key, url, record)
+            self._db.execute('COMMIT')
+        except Exception:
+            self._db.execute('ROLLBACK')
+            raise
+        self.stats['communities'] += len(batch)
+        self.stats['batches'] += 1
+
+    def _write(self, key, url, record):
+        """替换一个社区及其所有子表记录"""
+        row = _community_row(key, url, record)
+        community_id = self._db.execute(
+            'INSERT INTO communities (key, url, name, status, price_from, address, phone, description, latitude, longitude, '
+            'price_range, bed_range, bath_range, sqft_range, stories_range, scraped_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET url = excluded.url, name = excluded.name, status = excluded.status, '
+            'price_from = excluded.price_from, address = excluded.address, phone = excluded.phone, '
+            'description = excluded.description, latitude = excluded.latitude, longitude = excluded.longitude, '
+            'price_range = excluded.price_range, bed_range = excluded.bed_range, bath_range = excluded.bath_range, '
+            'sqft_range = excluded.sqft_range, stories_range = excluded.stories_range, scraped_at = excluded.scraped_at '
+            'RETURNING id',
+            row
+        ).fetchone()[0]
+        for table in ('homeplans', 'homesites', 'amenities', 'schools'):
+            self._db.execute(f'DELETE FROM {table} WHERE community_id = ?', (community_id,))
+
+        self._db.executemany(
+            'INSERT INTO homeplans (community_id, url, name, price, beds, baths, half_baths, sqft, stories, status, '
+            'price_text, image_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [_homeplan_row(community_id, plan) for plan in record.get('homeplans') or []]
+        )
+        self._db.executemany(
+            'INSERT INTO homesites (community_id, url, address, plan, price, beds, baths, sqft, status, latitude, '
+            'longitude, price_text, image_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [_homesite_row(community_id, homesite) for homesite in record.get('homesites') or []]
+        )
+        self._db.executemany(
+            'INSERT INTO amenities (community_id, name, description, icon_url) VALUES (?, ?, ?, ?)',
+            [(community_id, amenity.get('name'), amenity.get('description'), amenity.get('icon_url'))
+             for amenity in record.get('amenities') or []]
+        )
+        schools = [school for collection in record.get('collections') or [] for school in collection.get('nearbySchools') or []]
+        self._db.executemany(
+            'INSERT INTO schools (community_id, name, type_and_grades, district) VALUES (?, ?, ?, ?)',
+            [(community_id, school.get('name'), school.get('type_and_grades'), school.get('district')) for school in schools]
+        )
+
+    def backfill_files(self, paths):
+        """从已有的社区JSON文件导入"""
+        count = 0
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"读取文件 {path} 时出错: {str(e)}")
+                continue
+            if isinstance(record, dict) and record.get('url'):
+                self.add(record)
+                count += 1
+            else:
+                logger.warning(f"文件 {path} 中没有url字段，跳过")
+        self.flush()
+        logger.info(f"已从JSON文件导入 {count} 个社区")
+        return count
+
+    def backfill_store(self, store):
+        """从JSONL分片存储顺序导入"""
+        count = 0
+        for url, record in store.iter_records():
+            self.add(record, url=url)
+            count += 1
+        self.flush()
+        logger.info(f"已从分片存储导入 {count} 个社区")
+        return count
+
+    def query(self, sql, params=()):
+        """执行只读查询，返回(列名, 行)"""
+        self.flush()
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            columns = [description[0] for description in cursor.description]
+            return columns, cursor.fetchall()
+
+    def report(self):
+        self.flush()
+        with self._lock:
+            counts = {table: self._db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                      for table in ('communities', 'homeplans', 'homesites', 'amenities', 'schools')}
+        logger.info(f"Catalog ({self.path}): {counts}, written this run: {self.stats}")
+        return counts
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+_default_catalog = None
+
+
+def configure_catalog(path=DEFAULT_CATALOG_FILE, **kwargs):
+    """启用SQLite目录，path为None时禁用"""
+    global _default_catalog
+    if _default_catalog is not None:
+        _default_catalog.close()
+    _default_catalog = Catalog(path, **kwargs) if path else None
+    return _default_catalog
+
+
+def get_catalog():
+    """获取SQLite目录，未启用时返回None"""
+    return _default_catalog
+
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(a))
+
+
+def build_query(table, args):
+    """根据命令行过滤条件生成查询；位置先用经纬度索引按矩形过滤，再在Python中按距离过滤"""
+    community_columns = 'c.name AS community, c.url AS community_url'
+    if table == 'communities':
+        select = 'SELECT c.name, c.url, c.price_from, c.bed_range, c.bath_range, c.sqft_range, c.latitude, c.longitude FROM communities c'
+        prefix, location = 'c.', ('c.latitude', 'c.longitude')
+        price, beds, sqft = 'c.price_from', None, None
+    elif table == 'homeplans':
+        select = (f'SELECT p.name, p.price, p.beds, p.baths, p.sqft, p.stories, p.status, p.url, {community_columns}, '
+                  'c.latitude, c.longitude FROM homeplans p JOIN communities c ON c.id = p.community_id')
+        prefix, location = 'p.', ('c.latitude', 'c.longitude')
+        price, beds, sqft = 'p.price', 'p.beds', 'p.sqft'
+    else:
+        select = (f'SELECT h.address, h.price, h.beds, h.baths, h.sqft, h.status, h.plan, h.url, {community_columns}, '
+                  'COALESCE(h.latitude, c.latitude) AS latitude, COALESCE(h.longitude, c.longitude) AS longitude '
+                  'FROM homesites h JOIN communities c ON c.id = h.community_id')
+        prefix, location = 'h.', ('COALESCE(h.latitude, c.latitude)', 'COALESCE(h.longitude, c.longitude)')
+        price, beds, sqft = 'h.price', 'h.beds', 'h.sqft'
+
+    conditions, params = [], []
+    for column, value, operator in ((price, args.min_price, '>='), (price, args.max_price, '<='),
+                                    (beds, args.min_beds, '>='), (beds, args.max_beds, '<='),
+                                    (sqft, args.min_sqft, '>='), (sqft, args.max_sqft, '<=')):
+        if column and value is not None:
+            conditions.append(f'{column} {operator} ?')
+            params.append(value)
+    if args.status:
+        conditions.append(f'{prefix}status = ?')
+        params.append(args.status)
+    if args.near:
+        latitude, longitude, radius_km = args.near
+        dlat = radius_km / 111.0
+        dlon = radius_km / (111.0 * max(math.cos(math.radians(latitude)), 0.01))
+        conditions.append(f'{location[0]} BETWEEN ? AND ? AND {location[1]} BETWEEN ? AND ?')
+        params.extend([latitude - dlat, latitude + dlat, longitude - dlon, longitude + dlon])
+    sql = select + (' WHERE ' + ' AND '.join(conditions) if conditions else '')
+    sql += f' ORDER BY {price}' if price else ''
+    return sql, params
+
+
+def main():
+    """导入已有数据并查询目录"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Query the SQLite catalog of D.R. Horton communities, plans and homesites')
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_FILE, help='SQLite catalog file')
+    parser.add_argument('--backfill', metavar='DIR', help='Import the drhorton_*.json files in DIR')
+    parser.add_argument('--backfill-store', metavar='DIR', nargs='?', const='data/drhorton/records', help='Import the JSONL shard store')
+    parser.add_argument('--table', choices=['homesites', 'homeplans', 'communities'], default='homesites', help='What to list')
+    parser.add_argument('--min-price', type=int)
+    parser.add_argument('--max-price', type=int)
+    parser.add_argument('--min-beds', type=int)
+    parser.add_argument('--max-beds', type=int)
+    parser.add_argument('--beds', type=int, help='Exact number of bedrooms')
+    parser.add_argument('--min-sqft', type=int)
+    parser.add_argument('--max-sqft', type=int)
+    parser.add_argument('--status', help='Exact status, e.g. Available')
+    parser.add_argument('--near', type=lambda value: tuple(float(part) for part in value.split(',')),
+                        metavar='LAT,LON,KM', help='Only results within KM kilometres of LAT,LON')
+    parser.add_argument('--sql', help='Run a raw SQL query instead of the filters')
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines')
+    args = parser.parse_args()
+    if args.beds is not None:
+        args.min_beds = args.max_beds = args.beds
+
+    catalog = Catalog(args.catalog)
+    try:
+        if args.backfill:
+            paths = sorted(os.path.join(args.backfill, name) for name in os.listdir(args.backfill)
+                           if name.startswith('drhorton_') and name.endswith('.json'))
+            catalog.backfill_files(paths)
+        if args.backfill_store:
+            from record_store import RecordStore
+            store = RecordStore(args.backfill_store)
+            try:
+                catalog.backfill_store(store)
+            finally:
+                store.close()
+        if args.backfill or args.backfill_store:
+            catalog.report()
+            if not (args.sql or any(value is not None for value in (args.min_price, args.max_price, args.min_beds,
+                                                                    args.max_beds, args.min_sqft, args.max_sqft,
+                                                                    args.status, args.near))):
+                return
+
+        if args.sql:
+            columns, rows = catalog.query(args.sql)
+        else:
+            sql, params = build_query(args.table, args)
+            if not args.near:
+                sql += ' LIMIT ?'
+                params.append(args.limit)
+            columns, rows = catalog.query(sql, params)
+            if args.near:
+                latitude, longitude, radius_km = args.near
+                lat_index, lon_index = columns.index('latitude'), columns.index('longitude')
+                rows = [row for row in rows if row[lat_index] is not None and row[lon_index] is not None
+                        and _distance_km(latitude, longitude, row[lat_index], row[lon_index]) <= radius_km]
+        rows = rows[:args.limit]
+
+        if args.json:
+            for row in rows:
+                print(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        else:
+            print('\t'.join(columns))
+            for row in rows:
+                print('\t'.join('' if value is None else str(value) for value in row))
+        print(f"{len(rows)} rows", file=sys.stderr)
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from fetch_registry import normalize_url
+from community_page import as_community_page
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = 'data/drhorton/fingerprints.sqlite'
+
+# 决定社区是否需要重新抓取的Coveo字段；不包含sysdate（modified）这类重新索引时就会变化的字段
+FINGERPRINT_FIELDS = (
+    'status', 'available_homes', 'price_min', 'price_text',
+    'beds_min', 'beds_max', 'baths_min', 'baths_max', 'stories_min', 'stories_max', 'sqft_min', 'sqft_max',
+)
+
+# 房源卡片和户型卡片上的字段，字段都没变时沿用上次从详情页得到的数据
+HOMESITE_CARD_FIELDS = ('address', 'price', 'status', 'beds', 'baths', 'sqft', 'image_url')
+PLAN_CARD_FIELDS = ('price', 'beds', 'baths', 'half_baths', 'sqft', 'image_url')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS communities (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    changed_at REAL NOT NULL
+);
+'''
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def community_fingerprint(summary):
+    """由Coveo社区字段计算指纹"""
+    return 'api:' + _digest({field: summary.get(field) for field in FINGERPRINT_FIELDS})
+
+
+def listing_fingerprint(soup):
+    """没有API数据时，用页面上房源和户型列表的文本计算指纹"""
+    page = as_community_page(soup)
+    parts = []
+    if page.available_homes_container is not None:
+        parts.append(page.available_homes_container.get_text(' ', strip=True))
+    parts.extend(item.get_text(' ', strip=True) for item in page.toggle_items)
+    return 'page:' + _digest(parts)
+
+
+def homesite_card_key(homesite):
+    return _digest([homesite.get(field) for field in HOMESITE_CARD_FIELDS])
+
+
+def plan_card_key(plan):
+    details = plan.get('details') or {}
+    return _digest([plan.get('name')] + [details.get(field) for field in PLAN_CARD_FIELDS])
+
+
+class ChangeTracker:
+    """记录每个社区的指纹，并在重新抓取时提供上次的homesite/plan结果以跳过未变化的详情页"""
+
+    def __init__(self, path=DEFAULT_STATE_FILE):
+        self.path = path
+        self.stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'details_reused': 0}
+        self._lock = threading.Lock()
+        self._previous = {}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def has_changed(self, url, fingerprint):
+        """指纹与上次记录不同（或没有记录）时返回True"""
+        with self._lock:
+            row = self._db.execute('SELECT fingerprint FROM communities WHERE key = ?', (normalize_url(url),)).fetchone()
+        if row is None:
+            self.stats['new'] += 1
+            return True
+        if row[0] != fingerprint:
+            self.stats['changed'] += 1
+            return True
+        self.stats['unchanged'] += 1
+        with self._lock:
+            self._db.execute('UPDATE communities SET checked_at = ? WHERE key = ?', (time.time(), normalize_url(url)))
+            self._db.commit()
+        return False
+
+    def record(self, url, fingerprint):
+        """社区成功写出后记录指纹"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO communities VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET fingerprint = excluded.fingerprint, checked_at = excluded.checked_at, '
+                'changed_at = CASE WHEN communities.fingerprint = excluded.fingerprint THEN communities.changed_at ELSE excluded.changed_at END',
+                (normalize_url(url), url, fingerprint, now, now)
+            )
+            self._db.commit()
+
+    def remember(self, community_info):
+        """登记上次输出中的homesite和plan，供本次抓取对比"""
+        with self._lock:
+            for homesite in community_info.get('homesites', []):
+                if homesite.get('url'):
+                    self._previous[normalize_url(homesite['url'])] = (homesite_card_key(homesite), homesite)
+            for plan in community_info.get('homeplans', []):
+                if plan.get('url'):
+                    self._previous[normalize_url(plan['url'])] = (plan_card_key(plan), plan)
+
+    def forget(self, community_info):
+        with self._lock:
+            for entry in community_info.get('homesites', []) + community_info.get('homeplans', []):
+                if entry.get('url'):
+                    self._previous.pop(normalize_url(entry['url']), None)
+
+    def _previous_entry(self, url, key):
+        with self._lock:
+            previous = self._previous.get(normalize_url(url))
+        if previous is None or previous[0] != key:
+            return None
+        self.stats['details_reused'] += 1
+        return previous[1]
+
+    def reuse_homesite(self, homesite):
+        """卡片没有变化时沿用上次的plan和图片，返回是否沿用"""
+        previous = self._previous_entry(homesite['url'], homesite_card_key(homesite))
+        if previous is None:
+            return False
+        if previous.get('plan'):
+            homesite['plan'] = previous['plan']
+        if previous.get('images'):
+            homesite['images'] = list(previous['images'])
+        return True
+
+    def reuse_plan(self, plan):
+        """卡片没有变化时沿用上次的楼层平面图，返回是否沿用"""
+        previous = self._previous_entry(plan['url'], plan_card_key(plan))
+        if previous is None:
+            return False
+        if previous.get('floorplan_images') is not None:
+            plan['floorplan_images'] = previous['floorplan_images']
+        return True
+
+    def report(self):
+        """输出增量抓取统计"""
+        logger.info(f"Incremental crawl ({self.path}): {self.stats}")
+        return dict(self.stats)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_tracker = None
+
+
+def configure_change_tracker(path=DEFAULT_STATE_FILE):
+    """启用增量抓取，path为None时禁用"""
+    global _default_tracker
+    if _default_tracker is not None:
+        _default_tracker.close()
+    _default_tracker = ChangeTracker(path) if path else None
+    return _default_tracker
+
+
+def get_change_tracker():
+    """获取增量抓取状态，未启用时返回None"""
+    return _default_tracker
@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+
+import numpy as np
+
+from derivations import plan_stories
+from spec_parsing import first_number, leading_int, price_to_dollars
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_DIR = 'data/drhorton/columnar'
+FORMATS = ('auto', 'parquet', 'numpy')
+SCHEMA_FILE = 'schema.json'
+
+# 列类型：数值列缺失时为NaN（整数ID列除外），category列保存为整数编码（-1表示缺失）和类别列表
+TABLES = {
+    'communities': {
+        'community_id': 'int32', 'name': 'category', 'url': 'category', 'status': 'category',
+        'address': 'category', 'price_from': 'float64', 'latitude': 'float64', 'longitude': 'float64',
+        'homeplan_count': 'int32', 'homesite_count': 'int32',
+    },
+    'homeplans': {
+        'plan_id': 'int32', 'community_id': 'int32', 'name': 'category', 'url': 'category', 'status': 'category',
+        'price': 'float64', 'beds': 'float32', 'baths': 'float32', 'half_baths': 'float32',
+        'sqft': 'float32', 'stories': 'float32',
+    },
+    'homesites': {
+        'community_id': 'int32', 'plan_id': 'int32', 'url': 'category', 'address': 'category',
+        'plan': 'category', 'status': 'category', 'price': 'float64', 'beds': 'float32', 'baths': 'float32',
+        'sqft': 'float32', 'latitude': 'float64', 'longitude': 'float64',
+    },
+}
+
+
+def _float(value):
+    """转换为float，无法转换时返回NaN"""
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class TableBuilder:
+    """按列累积一张表的值，结束时转换为类型化的NumPy数组"""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.columns = {name: [] for name in schema}
+
+    def append(self, values):
+        for column, value in zip(self.columns.values(), values):
+            column.append(value)
+
+    def __len__(self):
+        return len(self.columns['community_id'])
+
+    def arrays(self):
+        """返回{列名: 数组}和{列名: 类别列表}"""
+        arrays = {}
+        categories = {}
+        for name, dtype in self.schema.items():
+            values = self.columns[name]
+            if dtype == 'category':
+                labels = sorted({value for value in values if value is not None})
+                codes = {label: code for code, label in enumerate(labels)}
+                code_dtype = np.int16 if len(labels) < np.iinfo(np.int16).max else np.int32
+                arrays[name] = np.fromiter((codes.get(value, -1) for value in values), dtype=code_dtype, count=len(values))
+                categories[name] = labels
+            elif dtype.startswith('int'):
+                arrays[name] = np.fromiter(values, dtype=dtype, count=len(values))
+            else:
+                arrays[name] = np.fromiter((_float(value) for value in values), dtype=dtype, count=len(values))
+        return arrays, categories
+
+
+class ColumnarExporter:
+    """把社区 -> 户型/房源的层级结构展开为communities、homeplans、homesites三张列式表"""
+
+    def __init__(self):
+        self.tables = {name: TableBuilder(schema) for name, schema in TABLES.items()}
+
+    def add(self, record, url=None):
+        communities = self.tables['communities']
+        homeplans = self.tables['homeplans']
+        homesites = self.tables['homesites']
+        community_id = len(communities)
+        location = record.get('location') or {}
+        plans = record.get('homeplans') or []
+        sites = record.get('homesites') or []
+        communities.append((
+            community_id, record.get('name'), url or record.get('url'), record.get('status'), record.get('address'),
+            price_to_dollars(record.get('price_from')), location.get('latitude'), location.get('longitude'),
+            len(plans), len(sites),
+        ))
+
+        # 房源的plan字段是户型名称，对应到同一社区内的户型行
+        plan_ids = {}
+        for plan in plans:
+            details = plan.get('details') or {}
+            plan_id = len(homeplans)
+            plan_ids.setdefault(plan.get('name'), plan_id)
+            homeplans.append((
+                plan_id, community_id, plan.get('name'), plan.get('url'), details.get('status'),
+                price_to_dollars(details.get('price')), leading_int(details['beds']) if details.get('beds') else None,
+                first_number(details.get('baths')), first_number(details.get('half_baths')),
+                first_number(details.get('sqft')), plan_stories(plan),
+            ))
+        for site in sites:
+            homesites.append((
+                community_id, plan_ids.get(site.get('plan'), -1), site.get('url'), site.get('address'),
+                site.get('plan'), site.get('status'), price_to_dollars(site.get('price')),
+                leading_int(site['beds']) if site.get('beds') else None, first_number(site.get('baths')),
+                first_number(site.get('sqft')), site.get('latitude'), site.get('longitude'),
+            ))
+
+    def add_files(self, paths):
+        """读取社区JSON文件"""
+        count = 0
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"读取文件 {path} 时出错: {str(e)}")
+                continue
+            if isinstance(record, dict):
+                self.add(record)
+                count += 1
+        return count
+
+    def add_store(self, store):
+        """顺序读取JSONL分片存储"""
+        count = 0
+        for url, record in store.iter_records():
+            self.add(record, url=url)
+            count += 1
+        return count
+
+    def write(self, directory=DEFAULT_EXPORT_DIR, format='auto'):
+        """写入列式文件：先写临时目录再整体替换，读取方不会看到写了一半的导出"""
+        if format == 'auto':
+            format = 'parquet' if HAS_PYARROW else 'numpy'
+        if format == 'parquet' and not HAS_PYARROW:
+            raise RuntimeError("写入Parquet需要安装pyarrow")
+        directory = directory.rstrip('/')
+        temp_dir = f"{directory}.{os.getpid()}.tmp"
+        old_dir = f"{directory}.{os.getpid()}.old"
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        schema = {'format': format, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'tables': {}}
+        try:
+            for table, builder in self.tables.items():
+                arrays, categories = builder.arrays()
+                schema['tables'][table] = {
+                    'rows': len(builder),
+                    'columns': {name: str(array.dtype) for name, array in arrays.items()},
+                    'categories': categories,
+                }
+                if format == 'parquet':
+                    _frame(arrays, categories).to_parquet(os.path.join(temp_dir, f'{table}.parquet'), index=False)
+                else:
+                    os.makedirs(os.path.join(temp_dir, table))
+                    for name, array in arrays.items():
+                        np.save(os.path.join(temp_dir, table, f'{name}.npy'), array)
+            with open(os.path.join(temp_dir, SCHEMA_FILE), 'w', encoding='utf-8') as f:
+                json.dump(schema, f, ensure_ascii=False)
+            if os.path.exists(directory):
+                os.replace(directory, old_dir)
+            os.replace(temp_dir, directory)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        counts = {table: info['rows'] for table, info in schema['tables'].items()}
+        logger.info(f"已导出列式数据到 {directory} ({format}): {counts}")
+        return counts
+
+
+def _frame(arrays, categories):
+    import pandas as pd
+    return pd.DataFrame({
+        name: pd.Categorical.from_codes(array, categories[name]) if name in categories else array
+        for name, array in arrays.items()
+    })
+
+
+def load_schema(directory=DEFAULT_EXPORT_DIR):
+    with open(os.path.join(directory, SCHEMA_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_columns(directory=DEFAULT_EXPORT_DIR, table='homesites', mmap=True):
+    """读取NumPy格式导出的一张表，返回{列名: 数组}和{列名: 类别列表}；mmap为True时数组直接映射文件，不复制"""
+    schema = load_schema(directory)
+    if schema['format'] != 'numpy':
+        raise ValueError(f"{directory} 是{schema['format']}格式，请使用load_table")
+    info = schema['tables'][table]
+    arrays = {name: np.load(os.path.join(directory, table, f'{name}.npy'), mmap_mode='r' if mmap else None)
+              for name in info['columns']}
+    return arrays, info['categories']
+
+
+def load_table(directory=DEFAULT_EXPORT_DIR, table='homesites', mmap=True):
+    """把导出的一张表读取为pandas DataFrame，category列为pd.Categorical"""
+    import pandas as pd
+    schema = load_schema(directory)
+    if schema['format'] == 'parquet':
+        return pd.read_parquet(os.path.join(directory, f'{table}.parquet'), memory_map=mmap)
+    return _frame(*load_columns(directory, table, mmap=mmap))
+
+
+def export_directory(data_dir, directory=DEFAULT_EXPORT_DIR, format='auto'):
+    """导出目录中的drhorton_*.json"""
+    paths = sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir)
+                   if name.startswith('drhorton_') and name.endswith('.json'))
+    exporter = ColumnarExporter()
+    exporter.add_files(paths)
+    return exporter.write(directory, format)
+
+
+def export_store(store_dir, directory=DEFAULT_EXPORT_DIR, format='auto'):
+    """导出JSONL分片存储"""
+    from record_store import RecordStore
+    store = RecordStore(store_dir)
+    try:
+        exporter = ColumnarExporter()
+        exporter.add_store(store)
+    finally:
+        store.close()
+    return exporter.write(directory, format)
+
+
+def main():
+    """导出列式数据，或读取已有导出并输出各表的行数、类型和读取耗时"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Export community records as typed columnar tables (Parquet or NumPy)')
+    parser.add_argument('--data-dir', default='data/drhorton', help='Directory of drhorton_*.json files')
+    parser.add_argument('--store', nargs='?', const='data/drhorton/records', help='Export the JSONL shard store instead')
+    parser.add_argument('--output', default=DEFAULT_EXPORT_DIR, help='Export directory (replaced atomically)')
+    parser.add_argument('--format', choices=FORMATS, default='auto', help='parquet needs pyarrow; auto falls back to numpy')
+    parser.add_argument('--load', action='store_true', help='Load an existing export and describe it instead of exporting')
+    args = parser.parse_args()
+
+    if args.load:
+        for table in TABLES:
+            started = time.monotonic()
+            frame = load_table(args.output, table)
+            print(f"{table}: {len(frame)} rows in {time.monotonic() - started:.3f}s", file=sys.stderr)
+            print(frame.dtypes.to_string())
+        return
+    if args.store:
+        export_store(args.store, args.output, args.format)
+    else:
+        export_directory(args.data_dir, args.output, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+LATITUDE_PATTERN = re.compile(r'latitude["\s:]+(-?\d+\.\d+)')
+LONGITUDE_PATTERN = re.compile(r'longitude["\s:]+(-?\d+\.\d+)')
+
+
+class CommunityPage:
+    """社区页面的解析结果：一次遍历定位关键容器，并缓存派生值供各个extract_*函数复用"""
+
+    # 按 (标签名, class) 定位的容器
+    CLASS_CONTAINERS = {
+        'secondary_info': ('div', 'community-secondary-info'),
+        'main_info': ('div', 'community-main-info'),
+        'about_section': ('div', 'community-main-details_about'),
+        'amenities_div': ('div', 'amenitiesDiv'),
+        'amenities_list': ('ul', 'amenities'),
+    }
+
+    # 按 (标签名, id) 定位的容器
+    ID_CONTAINERS = {
+        'available_homes_container': ('div', 'available-homes'),
+        'related_movein': ('div', 'relatedmovein'),
+    }
+
+    def __init__(self, soup):
+        self.soup = soup
+        self._cache = {}
+        for name in list(self.CLASS_CONTAINERS) + list(self.ID_CONTAINERS):
+            setattr(self, name, None)
+        self.slick_content = None
+        self.lat_elem = None
+        self.lng_elem = None
+        self.scripts = []
+        self.toggle_items = []
+        self._scan()
+
+    def _scan(self):
+        """遍历一次文档树，记录所有需要的容器"""
+        class_lookup = {value: key for key, value in self.CLASS_CONTAINERS.items()}
+        id_lookup = {value: key for key, value in self.ID_CONTAINERS.items()}
+
+        for tag in self.soup.find_all(True):
+            name = tag.name
+            if name == 'script':
+                self.scripts.append(tag)
+            if name in ('div', 'script'):
+                if self.lat_elem is None and tag.has_attr('data-lat'):
+                    self.lat_elem = tag
+                if self.lng_elem is None and tag.has_attr('data-lng'):
+                    self.lng_elem = tag
+            if name not in ('div', 'ul'):
+                continue
+
+            classes = tag.get('class') or []
+            for cls in classes:
+                key = class_lookup.get((name, cls))
+                if key and getattr(self, key) is None:
+                    setattr(self, key, tag)
+            if name == 'div':
+                if 'toggle-item' in classes:
+                    self.toggle_items.append(tag)
+                if self.slick_content is None and ' '.join(classes) == 'slick-modal-content pics-first':
+                    self.slick_content = tag
+                tag_id = tag.get('id')
+                if tag_id:
+                    key = id_lookup.get((name, tag_id))
+                    if key and getattr(self, key) is None:
+                        setattr(self, key, tag)
+
+    def memoize(self, key, compute):
+        """缓存派生值，同一个页面只计算一次"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def secondary_texts(self):
+        """community-secondary-info中所有p标签的文本"""
+        def compute():
+            if self.secondary_info is None:
+                return []
+            return [p.get_text(strip=True) for p in self.secondary_info.find_all('p')]
+        return self.memoize('secondary_texts', compute)
+
+    def _coordinate(self, elem, attr, pattern):
+        if elem is not None:
+            return float(elem[attr])
+        # 尝试从页面脚本中查找经纬度
+        for script in self.scripts:
+            if script.string:
+                match = pattern.search(script.string)
+                if match:
+                    return float(match.group(1))
+        return 0
+
+    @property
+    def latitude(self):
+        return self.memoize('latitude', lambda: self._coordinate(self.lat_elem, 'data-lat', LATITUDE_PATTERN))
+
+    @property
+    def longitude(self):
+        return self.memoize('longitude', lambda: self._coordinate(self.lng_elem, 'data-lng', LONGITUDE_PATTERN))
+
+
+def as_community_page(soup):
+    """将BeautifulSoup对象包装为CommunityPage，已经是CommunityPage时原样返回"""
+    if isinstance(soup, CommunityPage):
+        return soup
+    return CommunityPage(soup)
+
+
+def soup_of(soup):
+    """返回底层的BeautifulSoup对象，不需要容器定位的提取函数使用"""
+    if isinstance(soup, CommunityPage):
+        return soup.soup
+    return soup
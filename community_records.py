@@ -0,0 +1,53 @@
+import os
+import json
+import logging
+
+from catalog import get_catalog
+from record_store import get_record_store
+from records import to_json
+
+logger = logging.getLogger(__name__)
+
+
+def community_output_file(url, output_dir):
+    """根据社区URL生成输出JSON文件路径"""
+    community_name = url.split('/')[-1].replace('.', '_')
+    return os.path.join(output_dir, f'drhorton_{community_name}.json')
+
+
+def community_record_exists(url, output_dir):
+    """社区是否已经抓取过：启用分片存储时查索引，否则检查输出文件"""
+    store = get_record_store()
+    if store is not None:
+        return store.contains(url)
+    return os.path.exists(community_output_file(url, output_dir))
+
+
+def load_community_record(url, output_dir):
+    """读取上次保存的社区数据；不存在、文件损坏或无法解析时返回None，调用方当作需要重新抓取"""
+    try:
+        store = get_record_store()
+        if store is not None:
+            record = store.get(url)
+        else:
+            with open(community_output_file(url, output_dir), 'r', encoding='utf-8') as f:
+                record = json.load(f)
+    except Exception as e:
+        logger.warning(f"无法读取上次保存的社区数据 {url}: {str(e)}")
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def save_community_record(url, output_dir, community_info):
+    """保存社区数据：启用分片存储时追加到JSONL分片，否则写一个JSON文件；返回保存位置"""
+    catalog = get_catalog()
+    if catalog is not None:
+        catalog.add(community_info, url=url)
+    store = get_record_store()
+    if store is not None:
+        store.put(url, community_info)
+        return store.directory
+    output_file = community_output_file(url, output_dir)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(community_info, f, indent=2, ensure_ascii=False, default=to_json)
+    return output_file
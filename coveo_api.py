@@ -0,0 +1,386 @@
+import os
+import json
+import logging
+import threading
+from collections import Counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from fetch_registry import normalize_url
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = 'https://www.drhorton.com'
+COVEO_SEARCH_URL = f'{BASE_URL}/coveo/rest/search/v2'
+DEFAULT_COMMUNITIES_FILE = 'data/drhorton/florida_communities.json'
+
+COVEO_HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Content-Type": "application/json",
+    "Origin": BASE_URL,
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+CLIENT_ID = "d5e8ca30-409c-0df0-07e8-d3f83de1c009"
+SOURCE_QUERY = "(@source==\"Coveo_web_index - 93DrHortonProd\") (@fz95xlanguage67549==en) (@fz95xlatestversion67549==1)"
+
+# 社区文档中需要的字段
+COMMUNITY_FIELDS = [
+    "@fcommunitythumbnail67549",
+    "@factivationstate67549",
+    "@factivationstatehez120x67549",
+    "@faddress167549",
+    "@famenitylist67549",
+    "@famenitylistfordisplay67549",
+    "@fbrand67549",
+    "@fbrandlogo67549",
+    "@fbrandlogoalt67549",
+    "@fcallforprice67549",
+    "@fcity67549",
+    "fcoordinatesz32xlatitude67549",
+    "@fcoordinatesz32xlongitude67549",
+    "@fid67549",
+    "@fismultigen67549",
+    "@fmarketingname67549",
+    "@fnumberofavailablehomes67549",
+    "@fnumberofbathroomsmaz120x67549",
+    "@fnumberofbathroomsmin67549",
+    "@fnumberofbedroomsmaz120x67549",
+    "@fnumberofbedroomsmin67549",
+    "@fnumberofgaragesmaz120x67549",
+    "@fnumberofgaragesmin67549",
+    "@fnumberofstoriesmaz120x67549",
+    "@fnumberofstoriesmin67549",
+    "@fpricemin67549",
+    "@flongprice67549",
+    "@fpropertytype67549",
+    "fsqftmaz120x67549",
+    "@fsqftmin67549",
+    "@fstate67549",
+    "@fsysuri67549",
+    "@furllink67549",
+    "@fz122xip67549",
+    "@fsalesofficephone67549",
+    "fnumberofbathroomsmin67549",
+    "@source",
+    "@collection",
+    "@urihash",
+    "@sysdate"
+]
+
+
+def build_payload(aq, cq=SOURCE_QUERY, fields=None, number_of_results=5000, first_result=0,
+                  referrer=f'{BASE_URL}/florida', search_hub='Florida'):
+    """构建Coveo搜索请求体"""
+    return {
+        "actionsHistory": [],
+        "referrer": referrer,
+        "analytics": {
+            "clientId": CLIENT_ID,
+            "documentLocation": referrer,
+            "documentReferrer": referrer,
+            "pageId": ""
+        },
+        "visitorId": CLIENT_ID,
+        "isGuestUser": False,
+        "aq": aq,
+        "cq": cq,
+        "queryFunctions": [],
+        "numberOfResults": number_of_results,
+        "firstResult": first_result,
+        "fieldsToInclude": fields if fields is not None else COMMUNITY_FIELDS,
+        "pipeline": "allresults",
+        "searchHub": search_hub,
+        "term": ""
+    }
+
+
+class CoveoClient:
+    """Coveo搜索API客户端，复用同一个连接池"""
+
+    def __init__(self, timeout=30, retries=2, pool_size=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=('GET', 'POST'))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(COVEO_HEADERS)
+
+    def search(self, payload):
+        """发送搜索请求，返回响应JSON"""
+        headers = {"Referer": payload.get("referrer", BASE_URL)}
+        response = self.session.post(COVEO_SEARCH_URL, json=payload, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def community_url(raw):
+    """社区文档对应的页面URL"""
+    link = raw.get('furllink67549')
+    if not link:
+        return None
+    return link if link.startswith('http') else BASE_URL + link
+
+
+def _number(value):
+    """将Coveo返回的数值（可能是字符串或列表）转换为int/float，整数值返回int"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if value is None or value == '':
+        return None
+    try:
+        number = float(str(value).replace('$', '').replace(',', ''))
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def _text(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _text_list(value):
+    """设施等多值字段可能是列表，也可能是用;或|分隔的字符串"""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = str(value).replace('|', ';').split(';')
+    items = []
+    for item in value:
+        item = str(item).strip()
+        if item and item not in items:
+            items.append(item)
+    return items
+
+
+def community_summary(raw):
+    """将社区文档的raw字段转换为类型化的字典"""
+    return {
+        'url': community_url(raw),
+        'id': _text(raw.get('fid67549')),
+        'name': _text(raw.get('fmarketingname67549')),
+        'status': _text(raw.get('factivationstate67549')),
+        'price_min': _number(raw.get('fpricemin67549')),
+        'price_text': _text(raw.get('flongprice67549')),
+        'call_for_price': str(raw.get('fcallforprice67549')).lower() in ('1', 'true'),
+        'phone': _text(raw.get('fsalesofficephone67549')),
+        'street': _text(raw.get('faddress167549')),
+        'city': _text(raw.get('fcity67549')),
+        'state': _text(raw.get('fstate67549')),
+        'zip': _text(raw.get('fz122xip67549')),
+        'latitude': _number(raw.get('fcoordinatesz32xlatitude67549')),
+        'longitude': _number(raw.get('fcoordinatesz32xlongitude67549')),
+        'beds_min': _number(raw.get('fnumberofbedroomsmin67549')),
+        'beds_max': _number(raw.get('fnumberofbedroomsmaz120x67549')),
+        'baths_min': _number(raw.get('fnumberofbathroomsmin67549')),
+        'baths_max': _number(raw.get('fnumberofbathroomsmaz120x67549')),
+        'garages_min': _number(raw.get('fnumberofgaragesmin67549')),
+        'garages_max': _number(raw.get('fnumberofgaragesmaz120x67549')),
+        'stories_min': _number(raw.get('fnumberofstoriesmin67549')),
+        'stories_max': _number(raw.get('fnumberofstoriesmaz120x67549')),
+        'sqft_min': _number(raw.get('fsqftmin67549')),
+        'sqft_max': _number(raw.get('fsqftmaz120x67549')),
+        'available_homes': _number(raw.get('fnumberofavailablehomes67549')),
+        'amenities': _text_list(raw.get('famenitylistfordisplay67549') or raw.get('famenitylist67549')),
+        # 索引中文档的最后修改时间
+        'modified': raw.get('sysdate') or raw.get('date'),
+    }
+
+
+def save_communities(results, path=DEFAULT_COMMUNITIES_FILE):
+    """保存社区文档的raw字段，供抓取页面时直接使用"""
+    records = [result['raw'] for result in results if result.get('raw') and community_url(result['raw'])]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+    logger.info(f"已保存 {len(records)} 个社区的API数据到 {path}")
+    return records
+
+
+_index = {}
+_index_lock = threading.Lock()
+
+
+def load_community_index(path=DEFAULT_COMMUNITIES_FILE):
+    """加载保存的社区API数据，按URL建立索引；文件不存在时索引为空"""
+    global _index
+    index = {}
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for raw in json.load(f):
+                    url = community_url(raw)
+                    if url:
+                        index[normalize_url(url)] = community_summary(raw)
+            logger.info(f"Loaded Coveo data for {len(index)} communities from {path}")
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"加载社区API数据失败 {path}: {str(e)}")
+    with _index_lock:
+        _index = index
+    return index
+
+
+def get_community_summary(url):
+    """获取社区的API数据，没有时返回None"""
+    with _index_lock:
+        return _index.get(normalize_url(url))
+
+
+# 房源和户型文档的模板名和字段名不在社区查询中，可以通过命令行覆盖
+HOMESITE_TEMPLATE = 'Home For Sale'
+PLAN_TEMPLATE = 'Floor Plan'
+COMMUNITY_ID_FIELD = '@fcommunityid67549'
+LISTING_PAGE_SIZE = 1000
+COMMUNITY_BATCH_SIZE = 50
+
+# 摘要字段 -> Coveo raw字段
+LISTING_FIELDS = {
+    'template': 'fz95xtemplatename67549',
+    'url': 'furllink67549',
+    'name': 'fmarketingname67549',
+    'plan': 'fplanname67549',
+    'price': 'fpricemin67549',
+    'beds': 'fnumberofbedroomsmin67549',
+    'baths': 'fnumberofbathroomsmin67549',
+    'half_baths': 'fnumberofhalfbathrooms67549',
+    'sqft': 'fsqftmin67549',
+    'stories': 'fnumberofstoriesmin67549',
+    'images': 'fimages67549',
+    'floorplan_images': 'ffloorplanimages67549',
+}
+
+
+def _absolute_urls(value):
+    urls = []
+    for src in _text_list(value):
+        if src.startswith('//'):
+            src = 'https:' + src
+        elif not src.startswith('http'):
+            src = BASE_URL + src
+        urls.append(src)
+    return urls
+
+
+def listing_summary(raw, homesite_template=HOMESITE_TEMPLATE):
+    """将房源/户型文档的raw字段转换为类型化的字典"""
+    url = community_url({'furllink67549': raw.get(LISTING_FIELDS['url'])})
+    template = _text(raw.get(LISTING_FIELDS['template']))
+    return {
+        'url': url,
+        'kind': 'homesite' if template == homesite_template else 'plan',
+        'community_id': _text(raw.get(COMMUNITY_ID_FIELD.lstrip('@'))),
+        'name': _text(raw.get(LISTING_FIELDS['name'])),
+        'plan': _text(raw.get(LISTING_FIELDS['plan'])),
+        'price': _number(raw.get(LISTING_FIELDS['price'])),
+        'beds': _number(raw.get(LISTING_FIELDS['beds'])),
+        'baths': _number(raw.get(LISTING_FIELDS['baths'])),
+        'half_baths': _number(raw.get(LISTING_FIELDS['half_baths'])),
+        'sqft': _number(raw.get(LISTING_FIELDS['sqft'])),
+        'stories': _number(raw.get(LISTING_FIELDS['stories'])),
+        'images': _absolute_urls(raw.get(LISTING_FIELDS['images'])),
+        'floorplan_images': _absolute_urls(raw.get(LISTING_FIELDS['floorplan_images'])),
+    }
+
+
+def _quoted(values):
+    return ','.join('"' + str(value).replace('"', '') + '"' for value in values)
+
+
+def fetch_listings(community_ids, client=None, homesite_template=HOMESITE_TEMPLATE, plan_template=PLAN_TEMPLATE,
+                   dump=None):
+    """按社区ID分批、分页查询所有房源和户型文档，返回摘要列表；dump为列表时同时收集原始搜索结果"""
+    client = client or CoveoClient()
+    fields = ['@' + field for field in LISTING_FIELDS.values()] + [COMMUNITY_ID_FIELD, '@urihash']
+    community_ids = [community_id for community_id in dict.fromkeys(community_ids) if community_id]
+    listings = []
+    requests_made = 0
+    for start in range(0, len(community_ids), COMMUNITY_BATCH_SIZE):
+        batch = community_ids[start:start + COMMUNITY_BATCH_SIZE]
+        aq = (f"(@{LISTING_FIELDS['template']}==({_quoted([homesite_template, plan_template])})) "
+              f"({COMMUNITY_ID_FIELD}==({_quoted(batch)}))")
+        first_result = 0
+        while True:
+            try:
+                data = client.search(build_payload(aq, fields=fields, number_of_results=LISTING_PAGE_SIZE,
+                                                   first_result=first_result))
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"查询房源和户型失败 (communities {start}-{start + len(batch)}): {str(e)}")
+                break
+            requests_made += 1
+            results = data.get('results', [])
+            if dump is not None:
+                dump.extend(results)
+            for result in results:
+                summary = listing_summary(result.get('raw', {}), homesite_template)
+                if summary['url']:
+                    listings.append(summary)
+            first_result += len(results)
+            if not results or first_result >= data.get('totalCount', 0):
+                break
+    logger.info(f"Fetched {len(listings)} homesites/plans for {len(community_ids)} communities in {requests_made} API calls")
+    return listings
+
+
+_listings = {}
+
+
+def load_listings(community_ids, **kwargs):
+    """查询社区的房源和户型，按URL建立索引"""
+    global _listings
+    listings = fetch_listings(community_ids, **kwargs)
+    index = {normalize_url(listing['url']): listing for listing in listings}
+    with _index_lock:
+        _listings = index
+    check_listing_coverage(listings)
+    return index
+
+
+def check_listing_coverage(listings):
+    """社区文档显示有在售房源（@fnumberofavailablehomes67549 > 0），查询却没有返回该社区的房源时警告，
+    通常说明HOMESITE_TEMPLATE或COMMUNITY_ID_FIELD与索引不符；返回这些社区的URL"""
+    homesites = Counter(listing['community_id'] for listing in listings if listing['kind'] == 'homesite')
+    with _index_lock:
+        summaries = list(_index.values())
+    missing = [summary for summary in summaries
+               if summary.get('id') and (summary.get('available_homes') or 0) > 0 and not homesites[summary['id']]]
+    for summary in missing:
+        logger.warning(f"社区有 {summary['available_homes']} 个在售房源，但Coveo没有返回房源文档: {summary['url']}")
+    if missing and not homesites:
+        logger.warning(f"所有社区都没有返回房源文档，请检查--homesite-template ({HOMESITE_TEMPLATE!r}) 和 {COMMUNITY_ID_FIELD}")
+    return [summary['url'] for summary in missing]
+
+
+def save_listing_results(results, path):
+    """保存房源和户型查询的原始结果（与Coveo响应格式相同），用于核对字段名和生成测试数据"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'totalCount': len(results), 'results': results}, f, indent=2, ensure_ascii=False)
+    logger.info(f"已保存 {len(results)} 个房源/户型文档到 {path}")
+
+
+def listing_is_complete(listing):
+    """API数据足以代替详情页：房源有plan或图片，户型有层数"""
+    if listing['kind'] == 'homesite':
+        return bool(listing.get('plan') or listing.get('images'))
+    return bool(listing.get('stories'))
+
+
+def get_listing(url):
+    """获取房源/户型的API数据，没有时返回None"""
+    with _index_lock:
+        return _listings.get(normalize_url(url))
+
+
+def community_ids():
+    """已加载的所有社区ID"""
+    with _index_lock:
+        return [summary['id'] for summary in _index.values() if summary.get('id')]
@@ -0,0 +1,235 @@
+import os
+import json
+import math
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from coveo_api import CoveoClient, build_payload, community_url, save_communities
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_WORKERS = 8
+
+COMMUNITY_CONDITION = "(@fz95xtemplatename67549==\"Community Landing\") (@fid67549<>\"\")"
+DISCOVERY_SOURCE_QUERY = "(@source==\"Coveo_web_index - 93DrHortonProd\") (@fcoordinatesz32xlatitude67549) (@fz95xlanguage67549==en) (@fz95xlatestversion67549==1)"
+
+
+class Region:
+    """一个查询区域：中心点坐标加半径（米）"""
+
+    __slots__ = ('name', 'latitude', 'longitude', 'radius')
+
+    def __init__(self, name, latitude, longitude, radius):
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+
+    def query(self):
+        """按与中心点的距离过滤社区的Coveo查询"""
+        return (f"{COMMUNITY_CONDITION} ($qf(function:'dist(@fcoordinatesz32xlatitude67549, "
+                f"@fcoordinatesz32xlongitude67549, {self.latitude}, {self.longitude})', fieldName: 'distance')) "
+                f"(@distance<{int(self.radius)})")
+
+    @property
+    def search_hub(self):
+        return self.name.split('/')[0]
+
+    @property
+    def referrer(self):
+        return f"https://www.drhorton.com/{self.search_hub.lower().replace(' ', '-')}"
+
+    def __repr__(self):
+        return f"Region({self.name!r}, {self.latitude}, {self.longitude}, {self.radius})"
+
+
+# 各州的经纬度范围（南, 西, 北, 东）；查询圆以范围中心为圆心、到最远的角为半径，覆盖整个州（也会包含邻州的社区）。
+# 圆形不一定最省请求，需要完整结果时使用--nationwide网格
+STATE_BOUNDS = {
+    'AL': ('Alabama', 30.1, -88.5, 35.1, -84.8),
+    'AZ': ('Arizona', 31.3, -114.9, 37.1, -109.0),
+    'CA': ('California', 32.5, -124.5, 42.1, -114.1),
+    'CO': ('Colorado', 36.9, -109.1, 41.1, -102.0),
+    'DE': ('Delaware', 38.4, -75.8, 39.9, -75.0),
+    'FL': ('Florida', 24.4, -87.7, 31.1, -79.9),
+    'GA': ('Georgia', 30.3, -85.7, 35.1, -80.8),
+    'HI': ('Hawaii', 18.9, -160.3, 22.3, -154.8),
+    'IA': ('Iowa', 40.3, -96.7, 43.6, -90.1),
+    'ID': ('Idaho', 41.9, -117.3, 49.1, -111.0),
+    'IL': ('Illinois', 36.9, -91.6, 42.6, -87.0),
+    'IN': ('Indiana', 37.7, -88.1, 41.8, -84.7),
+    'KS': ('Kansas', 36.9, -102.1, 40.1, -94.5),
+    'KY': ('Kentucky', 36.4, -89.6, 39.2, -81.9),
+    'LA': ('Louisiana', 28.9, -94.1, 33.1, -88.8),
+    'MD': ('Maryland', 37.9, -79.5, 39.8, -75.0),
+    'MN': ('Minnesota', 43.4, -97.3, 49.4, -89.4),
+    'MO': ('Missouri', 35.9, -95.8, 40.7, -89.1),
+    'MS': ('Mississippi', 30.1, -91.7, 35.1, -88.1),
+    'NC': ('North Carolina', 33.8, -84.4, 36.6, -75.4),
+    'NE': ('Nebraska', 39.9, -104.1, 43.1, -95.3),
+    'NJ': ('New Jersey', 38.9, -75.6, 41.4, -73.9),
+    'NM': ('New Mexico', 31.3, -109.1, 37.1, -103.0),
+    'NV': ('Nevada', 35.0, -120.1, 42.1, -114.0),
+    'OH': ('Ohio', 38.4, -84.9, 42.0, -80.5),
+    'OK': ('Oklahoma', 33.6, -103.1, 37.1, -94.4),
+    'OR': ('Oregon', 41.9, -124.6, 46.3, -116.4),
+    'PA': ('Pennsylvania', 39.7, -80.6, 42.3, -74.7),
+    'SC': ('South Carolina', 32.0, -83.4, 35.3, -78.5),
+    'TN': ('Tennessee', 34.9, -90.4, 36.7, -81.6),
+    'TX': ('Texas', 25.8, -106.7, 36.6, -93.5),
+    'UT': ('Utah', 36.9, -114.1, 42.1, -109.0),
+    'VA': ('Virginia', 36.5, -83.7, 39.5, -75.2),
+    'WA': ('Washington', 45.5, -124.8, 49.1, -116.9),
+    'WI': ('Wisconsin', 42.4, -92.9, 47.1, -86.2),
+    'WV': ('West Virginia', 37.2, -82.7, 40.7, -77.7),
+}
+
+EARTH_RADIUS = 6371000
+
+
+def distance(latitude1, longitude1, latitude2, longitude2):
+    """两点间的大圆距离（米）"""
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(longitude2 - longitude1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def bounds_region(name, south, west, north, east):
+    """覆盖经纬度范围的查询区域：圆心为范围中心，半径为到最远的角的距离（向上取整到公里）"""
+    latitude, longitude = (south + north) / 2, (west + east) / 2
+    radius = max(distance(latitude, longitude, corner_latitude, corner_longitude)
+                 for corner_latitude in (south, north) for corner_longitude in (west, east))
+    return Region(name, round(latitude, 4), round(longitude, 4), math.ceil(radius / 1000) * 1000)
+
+
+def state_region(code):
+    """州代码对应的查询区域"""
+    return bounds_region(*STATE_BOUNDS[code.upper()])
+
+
+def parse_region(spec):
+    """解析"名称:纬度,经度,半径公里"格式的自定义区域（例如市场）"""
+    name, _, coordinates = spec.partition(':')
+    latitude, longitude, radius_km = (float(value) for value in coordinates.split(','))
+    return Region(name.strip(), latitude, longitude, radius_km * 1000)
+
+
+def nationwide_grid(step=3.0):
+    """覆盖美国本土的网格中心点，每个格子的半径覆盖到格子的角；另加夏威夷"""
+    regions = []
+    # 格子半对角线约为 step * 111km * 0.71，取0.75留出重叠
+    radius = step * 111000 * 0.75
+    latitude = 24.5 + step / 2
+    while latitude < 49.5:
+        longitude = -125.0 + step / 2
+        while longitude < -66.5:
+            regions.append(Region(f"Grid/{latitude:.1f},{longitude:.1f}", round(latitude, 4), round(longitude, 4), radius))
+            longitude += step
+        latitude += step
+    regions.append(state_region('HI'))
+    return regions
+
+
+class LinkIndex:
+    """发现的社区索引：按urihash去重，新社区立即追加到JSONL文件；
+    查询过程中写入stream_path.partial，所有区域都成功后才替换stream_path"""
+
+    def __init__(self, stream_path=None):
+        self.stream_path = stream_path
+        self.results = []
+        self.links = []
+        # 查询失败的区域：[(Region, 错误信息)]
+        self.failed = []
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._stream = None
+        if stream_path:
+            os.makedirs(os.path.dirname(stream_path) or '.', exist_ok=True)
+            self._stream = open(f"{stream_path}.partial", 'w', encoding='utf-8')
+
+    def add(self, result, region):
+        """加入一个搜索结果，重复的社区返回False"""
+        raw = result.get('raw') or {}
+        url = community_url(raw)
+        key = raw.get('urihash') or result.get('uniqueId') or url
+        if not url or not key:
+            return False
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            self.results.append(result)
+            self.links.append(url)
+            if self._stream is not None:
+                self._stream.write(json.dumps({'url': url, 'urihash': key, 'region': region.name}, ensure_ascii=False) + '\n')
+                self._stream.flush()
+        return True
+
+    def __len__(self):
+        return len(self.links)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+            if not self.failed:
+                os.replace(f"{self.stream_path}.partial", self.stream_path)
+
+
+def discover_region(client, region, index, page_size=DEFAULT_PAGE_SIZE):
+    """按firstResult分页查询一个区域，把结果流式写入索引，返回(新社区数, 请求数)"""
+    first_result = 0
+    added = 0
+    requests_made = 0
+    while True:
+        payload = build_payload(region.query(), cq=DISCOVERY_SOURCE_QUERY, number_of_results=page_size,
+                                first_result=first_result, referrer=region.referrer, search_hub=region.search_hub)
+        data = client.search(payload)
+        requests_made += 1
+        results = data.get('results', [])
+        for result in results:
+            if index.add(result, region):
+                added += 1
+        first_result += len(results)
+        if not results or first_result >= data.get('totalCount', 0):
+            break
+    return added, requests_made
+
+
+def discover(regions, workers=DEFAULT_WORKERS, page_size=DEFAULT_PAGE_SIZE, stream_path=None):
+    """并发查询所有区域，共享一个连接池，返回LinkIndex；查询失败的区域记录在index.failed中，调用方决定是否使用部分结果"""
+    client = CoveoClient(pool_size=workers)
+    index = LinkIndex(stream_path)
+    total_requests = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='discovery') as executor:
+            futures = {executor.submit(discover_region, client, region, index, page_size): region for region in regions}
+            for future in as_completed(futures):
+                region = futures[future]
+                try:
+                    added, requests_made = future.result()
+                    total_requests += requests_made
+                    logger.info(f"{region.name}: {added} new communities in {requests_made} requests ({len(index)} total)")
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    logger.error(f"查询区域失败 {region.name}: {str(e)}")
+                    index.failed.append((region, str(e)))
+    finally:
+        index.close()
+    logger.info(f"Discovered {len(index)} communities across {len(regions)} regions in {total_requests} requests")
+    if index.failed:
+        logger.error(f"{len(index.failed)} 个区域查询失败: {', '.join(region.name for region, _ in index.failed)}")
+    return index
+
+
+def save_index(index, links_file, communities_file):
+    """写出链接列表和社区API数据"""
+    os.makedirs(os.path.dirname(links_file) or '.', exist_ok=True)
+    with open(links_file, 'w', encoding='utf-8') as f:
+        json.dump(index.links, f, indent=2, ensure_ascii=False)
+    save_communities(index.results, communities_file)
+    logger.info(f"已提取 {len(index)} 个链接并保存到 {links_file}")
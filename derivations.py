@@ -0,0 +1,256 @@
+import math
+import logging
+from collections import Counter
+
+from price_stats import format_price_fields
+from spec_parsing import first_number, format_range, leading_int, price_to_dollars
+
+try:
+    import pandas as pd
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+logger = logging.getLogger(__name__)
+
+
+def _site_field(field):
+    return lambda site: site.get(field) or None
+
+
+def _plan_detail(field):
+    return lambda plan: (plan.get('details') or {}).get(field) or None
+
+
+def plan_stories(plan):
+    """户型没有层数字段，floorplan_images按楼层各一张（见detail_pages.build_floorplan_images）"""
+    return len(plan.get('floorplan_images') or []) or None
+
+
+# 数值列的取值范围：
+# HOMESITES - 只用在售房源的值，房源中没有有效值时才用户型的值（原来update_bed_range的规则）
+# ALL - 房源和户型的值合并，与页面上的社区范围一致（"From 1,204 Sq. Ft."是最小户型的面积）
+HOMESITES = 'homesites'
+ALL = 'all'
+
+# 派生阶段读取的数值列：列名 -> (从homesite取原始值, 从homeplan取原始值, 把非空原始值解析为数值, 取值范围)，解析失败返回None
+COLUMNS = {
+    'beds': (_site_field('beds'), _plan_detail('beds'), leading_int, HOMESITES),
+    'baths': (_site_field('baths'), _plan_detail('baths'), first_number, ALL),
+    'sqft': (_site_field('sqft'), _plan_detail('sqft'), first_number, ALL),
+    'price': (_site_field('price'), _plan_detail('price'), price_to_dollars, ALL),
+    'stories': (_site_field('stories'), plan_stories, first_number, ALL),
+}
+
+# 派生阶段：名称 -> (写入的details字段, fn(summary))；fn返回None时保留原值
+STAGES = {}
+# 不在默认阶段中的阶段，只在--stages中指定时运行
+OPT_IN_STAGES = set()
+
+
+def register_column(name, from_homesite, from_homeplan, parse=first_number, scope=HOMESITES):
+    """注册新的数值列，供自定义阶段从summary[name]读取(最小值, 最大值)"""
+    COLUMNS[name] = (from_homesite, from_homeplan, parse, scope)
+
+
+def stage(name, target=None, default=True):
+    """注册派生阶段的装饰器，target默认与阶段同名；default为False的阶段需要显式指定才运行"""
+    def register(fn):
+        STAGES[name] = (target or name, fn)
+        if not default:
+            OPT_IN_STAGES.add(name)
+        return fn
+    return register
+
+
+def default_stages():
+    """未指定阶段时运行的阶段"""
+    return [name for name in STAGES if name not in OPT_IN_STAGES]
+
+
+def _number(value):
+    """统一数值类型：NaN -> None，整数值的float -> int，逐条和批量模式的结果因此完全一致"""
+    if value is None:
+        return None
+    value = float(value)
+    if math.isnan(value):
+        return None
+    return int(value) if value.is_integer() else value
+
+
+def summarize(record):
+    """一次遍历房源和户型，得到每列的(最小值, 最大值)、数量和房源状态统计；
+    每列按COLUMNS中的取值范围合并房源和户型的值，另外单独记录可售房源的价格范围（price_range的上限）"""
+    homesites = record.get('homesites') or []
+    homeplans = record.get('homeplans') or []
+    site_values = {name: [] for name in COLUMNS}
+    plan_values = {name: [] for name in COLUMNS}
+    statuses = Counter()
+    for site in homesites:
+        for name, (from_site, _, parse, _) in COLUMNS.items():
+            raw = from_site(site)
+            value = parse(raw) if raw is not None else None
+            if value is not None:
+                site_values[name].append(value)
+        if site.get('status'):
+            statuses[site['status']] += 1
+    for plan in homeplans:
+        for name, (_, from_plan, parse, _) in COLUMNS.items():
+            raw = from_plan(plan)
+            value = parse(raw) if raw is not None else None
+            if value is not None:
+                plan_values[name].append(value)
+
+    summary = {
+        'homesite_count': len(homesites),
+        'homeplan_count': len(homeplans),
+        'status_counts': dict(sorted(statuses.items())),
+        'price_from': record.get('price_from'),
+    }
+    for name, (_, _, _, scope) in COLUMNS.items():
+        values = site_values[name] + plan_values[name] if scope == ALL else site_values[name] or plan_values[name]
+        summary[name] = (_number(min(values)), _number(max(values))) if values else None
+    prices = site_values['price']
+    summary['homesite_price'] = (_number(min(prices)), _number(max(prices))) if prices else None
+    return summary
+
+
+def summarize_batch(records):
+    """用pandas一次计算多条记录的summary，结果与逐条调用summarize相同；没有安装pandas时逐条计算"""
+    if not HAS_PANDAS:
+        logger.warning("pandas未安装，改为逐条计算")
+        return [summarize(record) for record in records]
+    columns = list(COLUMNS)
+    site_getters = [from_site for from_site, _, _, _ in COLUMNS.values()]
+    plan_getters = [from_plan for _, from_plan, _, _ in COLUMNS.values()]
+    rows = []
+    for index, record in enumerate(records):
+        for site in record.get('homesites') or []:
+            rows.append((index, 0, site.get('status') or None, *(get(site) for get in site_getters)))
+        for plan in record.get('homeplans') or []:
+            rows.append((index, 1, None, *(get(plan) for get in plan_getters)))
+    if not rows:
+        return [summarize(record) for record in records]
+    frame = pd.DataFrame(rows, columns=['record', 'source', 'status', *columns])
+    # 原始文本大量重复（"4"、"$263,900"），每列只解析不同的值，再按编码展开
+    for name, (_, _, parse, _) in COLUMNS.items():
+        codes, uniques = pd.factorize(frame[name])
+        parsed = pd.array([parse(raw) for raw in uniques] + [None], dtype='Float64')
+        frame[name] = parsed[codes].astype('float64')
+
+    # 每条记录、每种来源（0=homesites，1=homeplans）的最小/最大值；
+    # ALL列取两种来源的最小/最大值，HOMESITES列在房源没有有效值（NaN）时用户型的值补上
+    records_index = pd.RangeIndex(len(records))
+    grouped = frame.groupby(['record', 'source'])[columns].agg(['min', 'max']).unstack('source')
+    ranges = {}
+    for name, (_, _, _, scope) in COLUMNS.items():
+        bounds = []
+        for aggregate in ('min', 'max'):
+            by_source = grouped[name][aggregate].reindex(index=records_index, columns=[0, 1])
+            if scope == ALL:
+                combined = by_source.min(axis=1) if aggregate == 'min' else by_source.max(axis=1)
+            else:
+                combined = by_source[0].fillna(by_source[1])
+            bounds.append(combined.tolist())
+        ranges[name] = bounds
+    ranges['homesite_price'] = [grouped['price'][aggregate].reindex(index=records_index, columns=[0, 1])[0].tolist()
+                                for aggregate in ('min', 'max')]
+
+    sizes = frame.groupby(['record', 'source']).size().unstack('source', fill_value=0).reindex(
+        index=records_index, columns=[0, 1], fill_value=0)
+    homesite_counts = sizes[0].tolist()
+    homeplan_counts = sizes[1].tolist()
+    status_counts = frame[frame['source'] == 0].dropna(subset=['status']).groupby(['record', 'status']).size()
+
+    summaries = []
+    for index in range(len(records)):
+        summary = {
+            'homesite_count': homesite_counts[index],
+            'homeplan_count': homeplan_counts[index],
+            'status_counts': {},
+            'price_from': records[index].get('price_from'),
+        }
+        for name in ranges:
+            low, high = (_number(bound[index]) for bound in ranges[name])
+            summary[name] = (low, high) if low is not None else None
+        summaries.append(summary)
+    for (index, status), count in status_counts.items():
+        summaries[index]['status_counts'][status] = int(count)
+    for summary in summaries:
+        summary['status_counts'] = dict(sorted(summary['status_counts'].items()))
+    return summaries
+
+
+def apply_summary(record, summary, stages=None):
+    """把各阶段的结果写入record['details']，返回是否有字段变化；没有details的记录不处理"""
+    details = record.get('details')
+    if not isinstance(details, dict):
+        return False
+    changed = False
+    for name in stages or default_stages():
+        target, fn = STAGES[name]
+        value = fn(summary)
+        if value is None or details.get(target) == value:
+            continue
+        details[target] = value
+        changed = True
+    return changed
+
+
+def derive(record, stages=None):
+    """对一条记录运行派生阶段（默认为default_stages()），返回是否有变化"""
+    return apply_summary(record, summarize(record), stages)
+
+
+def derive_records(records, stages=None, batch=False):
+    """对多条记录运行派生阶段，返回每条记录是否有变化；batch为True时用pandas一次汇总"""
+    summaries = summarize_batch(records) if batch else map(summarize, records)
+    return [apply_summary(record, summary, stages) for record, summary in zip(records, summaries)]
+
+
+@stage('bed_range')
+def bed_range(summary):
+    if summary['beds'] is None:
+        return None
+    low, high = summary['beds']
+    return f"{high} bd" if low == high else f"{low} - {high} bd"
+
+
+@stage('bath_range')
+def bath_range(summary):
+    return format_range(*summary['baths']) if summary['baths'] else None
+
+
+@stage('sqft_range')
+def sqft_range(summary):
+    return f"From {round(summary['sqft'][0]):,} Sq. Ft." if summary['sqft'] else None
+
+
+@stage('price_range')
+def price_range(summary):
+    """与抓取时的price_stats.price_fields相同：起始价格 - 可售房源的最高价"""
+    lowest = summary['price'][0] if summary['price'] else None
+    highest = summary['homesite_price'][1] if summary['homesite_price'] else None
+    return format_price_fields(summary['price_from'], lowest, highest)[1]
+
+
+@stage('stories_range', default=False)
+def stories_range(summary):
+    """户型的层数由floorplan_images的数量推断（见plan_stories），没有楼层平面图的户型不计入，
+    因此默认不覆盖页面上的层数范围"""
+    return format_range(*summary['stories']) if summary['stories'] else None
+
+
+@stage('homesite_count')
+def homesite_count(summary):
+    return summary['homesite_count']
+
+
+@stage('homeplan_count')
+def homeplan_count(summary):
+    return summary['homeplan_count']
+
+
+@stage('status_counts', target='homesite_status_counts')
+def status_counts(summary):
+    return summary['status_counts']
@@ -0,0 +1,324 @@
+import os
+import time
+import random
+import logging
+
+from change_tracker import get_change_tracker
+from coveo_api import get_listing, listing_is_complete
+from driver_pool import get_pool
+from fetch_registry import get_fetch_registry
+from html_parsing import make_detail_soup
+from http_fetcher import get_http_fetcher
+from page_cache import get_page_cache, page_type_of
+from page_readiness import wait_for_page
+from rate_limiter import get_rate_limiter
+from resource_blocker import get_resource_blocker
+from spec_parsing import STORIES_DETAIL_PATTERN
+from work_queue import get_work_queue
+
+logger = logging.getLogger(__name__)
+
+
+def parse_homesite_page_info(content):
+    """从homesite页面HTML提取plan和图片信息"""
+    try:
+        soup = make_detail_soup(content)
+        info = {
+            'plan': None,
+            'images': []
+        }
+        
+        # 提取plan名称 - 从floorplan-link类的a标签
+        floorplan_link = soup.find('a', class_='floorplan-link')
+        if floorplan_link:
+            plan_text = floorplan_link.get_text(strip=True)
+            # 如果文本包含"floorplan"，提取前面的部分
+            if "floorplan" in plan_text:
+                info['plan'] = plan_text.split("floorplan")[0].strip()
+            else:
+                info['plan'] = plan_text.strip()
+            logger.info(f"Extracted plan name: {info['plan']}")
+        
+        # 提取图片 - 从PropertyGallery类下的sevenImages或twoImages类中提取
+        gallery_div = soup.find('div', class_='PropertyGallery')
+        if gallery_div:
+            # 尝试从sevenImages中获取图片
+            seven_images = gallery_div.find('div', class_='sevenImages')
+            if seven_images:
+                for img in seven_images.find_all('img'):
+                    src = img.get('src')
+                    if src:
+                        if src.startswith('//'):
+                            src = 'https:' + src
+                        elif not src.startswith('http'):
+                            src = 'https://www.drhorton.com' + src
+                        info['images'].append(src)
+                        logger.info(f"Found image from sevenImages: {src}")
+            
+            # 尝试从twoImages中获取图片
+            two_images = gallery_div.find('div', class_='twoImages')
+            if two_images:
+                for img in two_images.find_all('img'):
+                    src = img.get('src')
+                    if src:
+                        if src.startswith('//'):
+                            src = 'https:' + src
+                        elif not src.startswith('http'):
+                            src = 'https://www.drhorton.com' + src
+                        info['images'].append(src)
+                        logger.info(f"Found image from twoImages: {src}")
+        
+        return info
+    except Exception as e:
+        logger.error(f"提取homesite页面信息出错: {str(e)}")
+        logger.exception("详细错误信息：")
+        return {'plan': None, 'images': []}
+
+
+def parse_floorplan_images(page_content):
+    """从homeplan详情页面HTML提取楼层平面图，页面没有楼层信息时返回None"""
+    page_soup = make_detail_soup(page_content)
+    
+    # 提取楼层信息
+    property_details = page_soup.find('div', class_='property-details')
+    if not property_details:
+        return None
+    story_text = property_details.get_text()
+    story_match = STORIES_DETAIL_PATTERN.search(story_text)
+    if not story_match:
+        return None
+    stories = float(story_match.group(1))
+    
+    # 提取图片URL，没有图片的content-photo占位为None
+    image_urls = []
+    for photo in page_soup.find_all('div', class_='content-photo'):
+        img = photo.find('img')
+        src = None
+        if img and img.get('src'):
+            src = img['src']
+            if src.startswith('//'):
+                src = 'https:' + src
+            elif not src.startswith('http'):
+                src = 'https://www.drhorton.com' + src
+        image_urls.append(src)
+    return build_floorplan_images(stories, image_urls)
+
+
+def build_floorplan_images(stories, image_urls):
+    """按层数生成floorplan_images，image_urls按楼层顺序对应"""
+    stories = float(stories)
+    # 创建floorplan_images数组
+    floorplan_images = []
+    num_floors = int(stories) if stories.is_integer() else int(stories + 0.5)
+    for i in range(1, num_floors + 1):
+        floorplan_images.append({
+            "name": f"{i}st Floor Floorplan" if i == 1 else f"{i}nd Floor Floorplan" if i == 2 else f"{i}rd Floor Floorplan",
+            "image_url": None
+        })
+    for i, src in enumerate(image_urls[:len(floorplan_images)]):
+        floorplan_images[i]['image_url'] = src
+    # 新增逻辑：将 None 的 image_url 替换为 "1st Floor Floorplan" 的值
+    first_floor_url = next((item["image_url"] for item in floorplan_images if item["name"] == "1st Floor Floorplan"), None)
+    if first_floor_url is not None:
+        for item in floorplan_images:
+            if item["image_url"] is None:
+                item["image_url"] = first_floor_url
+    return floorplan_images
+
+
+def apply_floorplan_listing(plan, listing):
+    """用Coveo户型数据写入楼层平面图并补全页面上缺失的规格，API没有层数时返回False"""
+    details = plan.get('details', {})
+    if listing.get('beds') is not None and not details.get('beds'):
+        details['beds'] = listing['beds']
+    if listing.get('baths') is not None and not details.get('baths'):
+        details['baths'] = listing['baths']
+    if listing.get('half_baths') and not details.get('half_baths'):
+        details['half_baths'] = listing['half_baths']
+    if listing.get('sqft') is not None and not details.get('sqft'):
+        details['sqft'] = round(listing['sqft'])
+    if not listing.get('stories'):
+        return False
+    plan['floorplan_images'] = build_floorplan_images(listing['stories'], listing['floorplan_images'])
+    return True
+
+
+def apply_floorplan_page(plan, pages=None):
+    """下载homeplan详情页面，把楼层平面图写入plan；Coveo已有该户型时不再下载"""
+    if not plan.get('url'):
+        return
+    listing = get_listing(plan['url'])
+    if listing is not None and apply_floorplan_listing(plan, listing):
+        return
+    tracker = get_change_tracker()
+    if tracker is not None and tracker.reuse_plan(plan):
+        return
+    # 中断前已经处理过的详情页直接使用检查点
+    queue = get_work_queue()
+    if queue is not None:
+        checkpoint = queue.result('floorplan', plan['url'])
+        if checkpoint is not None:
+            if checkpoint['floorplan_images'] is not None:
+                plan['floorplan_images'] = checkpoint['floorplan_images']
+            return
+        if queue.exhausted('floorplan', plan['url']):
+            return
+    try:
+        page_content = load_detail_page(plan['url'], pages)
+        if not page_content and queue is not None:
+            queue.record_failure('floorplan', plan['url'], 'page not available')
+        if page_content:
+            # 从页面提取楼层信息和图片
+            floorplan_images = parse_floorplan_images(page_content)
+            if queue is not None:
+                queue.checkpoint('floorplan', plan['url'], {'floorplan_images': floorplan_images})
+            if floorplan_images is not None:
+                # 添加到plan对象
+                plan['floorplan_images'] = floorplan_images
+                logger.info(f"Added {len(floorplan_images)} floorplan images to plan {plan['name']}")
+    except Exception as e:
+        logger.error(f"Error processing homeplan detail page for {plan['name']}: {str(e)}")
+
+
+def apply_homesite_listing(homesite, listing):
+    """用Coveo房源数据写入plan和图片并补全缺失的规格，API既没有plan也没有图片时返回False"""
+    for key in ('beds', 'baths', 'sqft'):
+        if listing.get(key) is not None and not homesite.get(key):
+            homesite[key] = listing[key]
+    if listing.get('price') and not homesite.get('price') and homesite.get('status') != 'Under Contract':
+        homesite['price'] = round(listing['price'])
+    if not listing.get('plan') and not listing.get('images'):
+        return False
+    if listing.get('plan'):
+        homesite['plan'] = listing['plan']
+    if listing.get('images'):
+        homesite['images'] = list(listing['images'])
+    return True
+
+
+def apply_homesite_pages(homesites, pages=None):
+    """下载每个homesite详情页面，用页面上的plan和图片更新homesite"""
+    logger.info(f"Processing {len(homesites)} homesite details...")
+    for homesite in homesites:
+        if homesite.get('url'):
+            listing = get_listing(homesite['url'])
+            if listing is not None and apply_homesite_listing(homesite, listing):
+                continue
+            tracker = get_change_tracker()
+            if tracker is not None and tracker.reuse_homesite(homesite):
+                continue
+            # 中断前已经处理过的详情页直接使用检查点
+            queue = get_work_queue()
+            if queue is not None:
+                info = queue.result('homesite', homesite['url'])
+                if info is not None or queue.exhausted('homesite', homesite['url']):
+                    apply_homesite_info(homesite, info or {})
+                    continue
+            try:
+                page_content = load_detail_page(homesite['url'], pages)
+                if not page_content and queue is not None:
+                    queue.record_failure('homesite', homesite['url'], 'page not available')
+                if page_content:
+                    # 从页面提取plan和images信息
+                    info = parse_homesite_page_info(page_content)
+                    if queue is not None:
+                        queue.checkpoint('homesite', homesite['url'], info)
+                    apply_homesite_info(homesite, info)
+                    
+            except Exception as e:
+                logger.error(f"Error processing homesite detail page for {homesite.get('address')}: {str(e)}")
+
+
+def apply_homesite_info(homesite, info):
+    """把homesite详情页的plan和图片写入homesite"""
+    if info.get('plan'):
+        homesite['plan'] = info['plan']
+        logger.info(f"Updated plan for homesite {homesite.get('address')}: {homesite['plan']}")
+    if info.get('images'):
+        homesite['images'] = info['images']
+        logger.info(f"Updated images for homesite {homesite.get('address')}: {len(info['images'])} images found")
+
+
+def covered_by_listing(url):
+    """Coveo已经提供该详情页的完整数据时不需要抓取"""
+    listing = get_listing(url)
+    return listing is not None and listing_is_complete(listing)
+
+
+def load_detail_page(url, pages=None):
+    """获取详情页HTML，优先使用预先抓取的页面，其次使用本次运行的页面缓存"""
+    if pages is not None and url in pages:
+        return pages[url]
+    return get_fetch_registry().fetch(url, _download_detail_html)
+
+
+def _download_detail_html(url):
+    """下载详情页并返回HTML内容，启用磁盘缓存时优先从缓存读取"""
+    cache = get_page_cache()
+    if cache is not None:
+        content = cache.get(url)
+        if content:
+            return content
+    # 先尝试直接HTTP请求，页面缺少需要的容器时才使用浏览器渲染
+    fetcher = get_http_fetcher()
+    if fetcher is not None:
+        content, headers = fetcher.fetch(url)
+        if content:
+            if cache is not None:
+                cache.put(url, content, headers=headers)
+            return content
+    temp_file = download_homesite_page(url)
+    if not temp_file:
+        return None
+    try:
+        with open(temp_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if cache is not None:
+            cache.put(url, content)
+        return content
+    finally:
+        # 删除临时文件
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+
+
+def download_homesite_page(url):
+    """下载homesite详情页面并保存到临时文件"""
+    limiter = get_rate_limiter()
+    try:
+        # 由限速器决定请求间隔，而不是固定的随机延迟
+        waited = limiter.acquire(url)
+        logger.info(f"Downloading homesite page: {url} (waited {waited:.1f}s, rate {limiter.current_rate(url):.3f} req/s)")
+
+        with get_pool().lease() as driver:
+            driver.get(url)
+        
+            # 等待详情页容器出现，滚动到页面底部触发懒加载内容，稳定后再滚动回顶部
+            wait_for_page(driver, page_type_of(url), max_scroll_rounds=1)
+            driver.execute_script("window.scrollTo(0, 0);")
+        
+            # 获取页面内容
+            page_content = driver.page_source
+            if get_resource_blocker() is not None:
+                get_resource_blocker().collect(driver, url)
+        
+        # 被限流或出现验证页面时降速，并丢弃该页面
+        if limiter.record(url, html=page_content):
+            logger.error(f"下载homesite页面被拦截 {url}")
+            return None
+        
+        # 保存到临时文件
+        temp_file = f'homesite_page_{int(time.time())}_{random.randint(1000, 9999)}.html'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(page_content)
+        
+        logger.info(f"Successfully downloaded and saved homesite page to {temp_file}")
+        
+        return temp_file
+        
+    except Exception as e:
+        logger.error(f"下载homesite页面时出错 {url}: {str(e)}")
+        limiter.record(url, error=True)
+        return None
@@ -0,0 +1,238 @@
+import logging
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from resource_blocker import get_resource_blocker
+
+logger = logging.getLogger(__name__)
+
+# 使用最新的 Chrome User-Agent
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+]
+
+# 隐藏 navigator.webdriver 的脚本，在每个新文档加载前执行
+STEALTH_SCRIPT = '''
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+    window.chrome = {
+        runtime: {}
+    };
+'''
+
+# 在每个新文档加载前执行，记录进行中的fetch/XHR请求数，用于判断网络空闲
+NETWORK_TRACKER_SCRIPT = '''
+    (() => {
+        if (window.__pendingRequests !== undefined) return;
+        window.__pendingRequests = 0;
+        const done = () => { window.__pendingRequests = Math.max(0, window.__pendingRequests - 1); };
+        const originalFetch = window.fetch;
+        if (originalFetch) {
+            window.fetch = function () {
+                window.__pendingRequests++;
+                return originalFetch.apply(this, arguments).finally(done);
+            };
+        }
+        const originalSend = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function () {
+            window.__pendingRequests++;
+            this.addEventListener('loadend', done, {once: true});
+            return originalSend.apply(this, arguments);
+        };
+    })();
+'''
+
+
+def create_chrome_driver():
+    """创建一个配置好的headless Chrome实例"""
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+
+    # 添加更多的浏览器选项来模拟真实用户
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument('--disable-infobars')
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_argument(f'--user-agent={random.choice(USER_AGENTS)}')
+
+    # 拦截资源时打开performance日志，用于统计每个页面被拦截的请求
+    blocker = get_resource_blocker()
+    if blocker is not None:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    # 不设置implicitly_wait，页面就绪由page_readiness中的显式条件决定
+    driver = webdriver.Chrome(options=chrome_options)
+
+    # 修改 navigator.webdriver 属性
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_SCRIPT})
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': NETWORK_TRACKER_SCRIPT})
+
+    # 不下载图片、字体、媒体和统计脚本，页面解析只需要DOM和src属性
+    if blocker is not None:
+        blocker.install(driver)
+    return driver
+
+
+def _is_alive(driver):
+    """检查浏览器实例是否仍可响应"""
+    try:
+        driver.execute_script('return 1')
+        return True
+    except Exception:
+        return False
+
+
+class DriverPool:
+    """常驻的headless Chrome池，按需租出浏览器实例并定期回收"""
+
+    def __init__(self, size=1, max_pages_per_driver=50, driver_factory=create_chrome_driver):
+        self.size = max(1, int(size))
+        self.max_pages_per_driver = max_pages_per_driver
+        self.driver_factory = driver_factory
+        self._idle = []
+        self._lock = threading.Lock()
+        # 有实例归还或名额释放时通知等待中的acquire
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._page_counts = {}
+        self._closed = False
+        self.stats = {'launched': 0, 'recycled': 0, 'crashed': 0, 'leases': 0}
+
+    def _launch(self):
+        """启动一个新的浏览器实例"""
+        driver = self.driver_factory()
+        with self._lock:
+            self._page_counts[id(driver)] = 0
+            self.stats['launched'] += 1
+        logger.info(f"Launched Chrome instance ({self._created}/{self.size} in pool)")
+        return driver
+
+    def _discard(self, driver):
+        """关闭浏览器实例并释放名额，唤醒一个等待中的acquire启动新实例"""
+        with self._available:
+            self._page_counts.pop(id(driver), None)
+            self._created -= 1
+            self._available.notify()
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"关闭Chrome实例时出错: {str(e)}")
+
+    def acquire(self, timeout=None):
+        """获取一个空闲的浏览器实例，必要时启动新实例；池已满时等待实例归还或名额释放，超时抛出queue.Empty"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("DriverPool已关闭")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._available.wait(remaining)
+
+        # 在锁外启动浏览器，启动失败时归还名额
+        try:
+            return self._launch()
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+
+    def release(self, driver, broken=False):
+        """归还浏览器实例，崩溃或达到页数上限时回收"""
+        with self._lock:
+            self.stats['leases'] += 1
+            count = self._page_counts.get(id(driver), 0) + 1
+            self._page_counts[id(driver)] = count
+
+        if broken:
+            self.stats['crashed'] += 1
+            logger.warning("Chrome实例异常，已从池中移除")
+            self._discard(driver)
+        elif self._closed:
+            self._discard(driver)
+        elif self.max_pages_per_driver and count >= self.max_pages_per_driver:
+            self.stats['recycled'] += 1
+            logger.info(f"Chrome实例已处理 {count} 个页面，回收重启")
+            self._discard(driver)
+        else:
+            with self._available:
+                self._idle.append(driver)
+                self._available.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """以上下文管理器方式租用浏览器实例"""
+        driver = self.acquire(timeout=timeout)
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            # 页面超时等错误不代表浏览器本身崩溃，探测一次再决定是否回收
+            broken = not _is_alive(driver)
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def close(self):
+        """关闭池中所有空闲的浏览器实例"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            # 等待中的acquire被唤醒后抛出RuntimeError
+            self._available.notify_all()
+        for driver in idle:
+            self._discard(driver)
+        logger.info(f"DriverPool已关闭: {self.stats}")
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def configure_pool(size=1, max_pages_per_driver=50):
+    """配置全局浏览器池，替换现有的池"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+        _default_pool = DriverPool(size=size, max_pages_per_driver=max_pages_per_driver)
+        return _default_pool
+
+
+def get_pool():
+    """获取全局浏览器池，首次使用时创建"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool()
+        return _default_pool
+
+
+def close_pool():
+    """关闭全局浏览器池"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+            _default_pool = None
@@ -0,0 +1,424 @@
+import re
+import logging
+from datetime import datetime
+
+from lxml import etree, html as lxml_html
+
+from detail_pages import apply_floorplan_page, apply_homesite_pages
+from spec_parsing import (
+    PRICE_BAND_PATTERN,
+    PRICE_PATTERN,
+    STYLE_URL_PATTERN,
+    apply_homesite_specs,
+    apply_plan_specs,
+    extract_amenity_name,
+    format_phone,
+    parse_card_specs,
+    parse_home_details_texts,
+    parse_stories_texts,
+    shorten_description,
+)
+from community_page import LATITUDE_PATTERN, LONGITUDE_PATTERN
+from records import HomePlan, Homesite, PlanDetails
+from price_stats import listing_stats, price_fields
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = 'https://www.drhorton.com'
+
+_UPPER = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_LOWER = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def has_class(name):
+    """XPath条件：class列表中包含name（等价于BeautifulSoup的class_='name'）"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def class_contains(*keywords):
+    """XPath条件：小写后的class包含任一关键字（等价于原来的lambda class过滤）"""
+    return '(' + ' or '.join(
+        f"contains(translate(@class, '{_UPPER}', '{_LOWER}'), '{keyword}')" for keyword in keywords
+    ) + ')'
+
+
+# 与BeautifulSoup.get_text一致：不包含script/style/template中的文本
+_TEXT_NODES = etree.XPath('.//text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+
+
+def text_raw(node):
+    """等价于Tag.text"""
+    return ''.join(_TEXT_NODES(node))
+
+
+def text_strip(node):
+    """等价于Tag.get_text(strip=True)"""
+    return ''.join(piece.strip() for piece in _TEXT_NODES(node))
+
+
+def text_lines(node):
+    """等价于Tag.get_text('\\n')"""
+    return '\n'.join(_TEXT_NODES(node))
+
+
+def stripped(node):
+    """等价于Tag.text.strip()"""
+    return text_raw(node).strip()
+
+
+class Field:
+    """单个字段：编译好的XPath加后处理函数"""
+
+    def __init__(self, xpath, post=None, many=False):
+        self.source = xpath
+        self.xpath = etree.XPath(xpath)
+        self.post = post
+        self.many = many
+
+    def evaluate(self, node):
+        result = self.xpath(node)
+        if self.many:
+            return [self.post(item) for item in result] if self.post else list(result)
+        if isinstance(result, list):
+            result = result[0] if result else None
+            if result is None:
+                return None
+        return self.post(result) if self.post else result
+
+
+class Schema:
+    """声明式提取规格：字段名 -> Field；指定rows时对每一行分别提取"""
+
+    def __init__(self, fields, rows=None):
+        self.fields = fields
+        self.rows = etree.XPath(rows) if rows else None
+
+    def _extract_one(self, node):
+        return {name: field.evaluate(node) for name, field in self.fields.items()}
+
+    def extract(self, node):
+        if self.rows is None:
+            return self._extract_one(node)
+        return [self._extract_one(row) for row in self.rows(node)]
+
+
+_MAIN_INFO = f"(//div[{has_class('community-main-info')}])[1]"
+_SECONDARY_INFO = f"(//div[{has_class('community-secondary-info')}])[1]"
+
+COMMUNITY_SCHEMA = Schema({
+    'name': Field(f"{_MAIN_INFO}/descendant::h1[1]", text_strip),
+    'name_fallback': Field(f"(//h1[{class_contains('community-name')}])[1]", stripped),
+    'title': Field("(//title)[1]", stripped),
+    'price_heading': Field(f"{_MAIN_INFO}/descendant::h2[1]", text_strip),
+    'has_secondary_info': Field(f"boolean({_SECONDARY_INFO})"),
+    'secondary_texts': Field(f"{_SECONDARY_INFO}/descendant::p", text_strip, many=True),
+    'address': Field(f"{_SECONDARY_INFO}/descendant::a[1]", text_strip),
+    'address_fallback': Field(f"(//*[self::div or self::p][{class_contains('address')}])[1]", text_strip),
+    'phone': Field("(//*[self::a or self::span][contains(@href, 'tel:')])[1]", text_raw),
+    'phone_fallback': Field(f"(//*[self::a or self::span][{class_contains('phone')}])[1]", text_raw),
+    'about': Field(f"(//div[{has_class('community-main-details_about')}])[1]", text_strip),
+    'meta_description': Field("(//meta[@name='description'])[1]/@content", str),
+    'description_fallback': Field(
+        f"(//div[{class_contains('community-description', 'about-community', 'community-overview')}])[1]", stripped
+    ),
+    'first_image': Field("(//div[normalize-space(@class)='slick-modal-content pics-first'])[1]/descendant::img[1]/@src", str),
+    'amenities': Field(f"(//ul[{has_class('amenities')}])[1]/descendant::li", text_strip, many=True),
+    'data_lat': Field("(//*[self::div or self::script][@data-lat])[1]/@data-lat", str),
+    'data_lng': Field("(//*[self::div or self::script][@data-lng])[1]/@data-lng", str),
+    'scripts': Field("//script", lambda node: node.text if len(node) == 0 else None, many=True),
+    'schools': Field("(//h3[.='Schools'])[1]/following-sibling::p", many=True),
+})
+
+_CARD_LINK = f"(.//a[{has_class('CoveoResultLink')}])[1]"
+_CARD_IMAGE = f"(.//div[{has_class('card-image')}])[1]"
+_CARD_CONTENT = f"(.//div[{has_class('card-content')}])[1]"
+
+HOMESITE_SCHEMA = Schema({
+    'has_link': Field(f"boolean({_CARD_LINK})"),
+    'link_classes': Field(f"{_CARD_LINK}/@class", lambda value: str(value).split()),
+    'href': Field(f"{_CARD_LINK}/@href", str),
+    'has_card_image': Field(f"boolean({_CARD_IMAGE})"),
+    'style': Field(f"{_CARD_IMAGE}/@style", str),
+    'image_srcs': Field(f"{_CARD_IMAGE}/descendant::img/@src", str, many=True),
+    'has_card_content': Field(f"boolean({_CARD_CONTENT})"),
+    'address': Field(f"{_CARD_CONTENT}/descendant::h3[1]", stripped),
+    'price_text': Field(f"{_CARD_CONTENT}/descendant::h2[1]", text_strip),
+    'texts': Field(f"{_CARD_CONTENT}/descendant::p", text_strip, many=True),
+}, rows=f"(//div[@id='available-homes'])[1]/descendant::div[{has_class('toggle-item')}][not(.//a[{has_class('disabled')}])]")
+
+HOMEPLAN_SCHEMA = Schema({
+    'name': Field(f"(.//h2[{has_class('pr-case')}])[1]", stripped),
+    'href': Field(f"{_CARD_LINK}/@href", str),
+    'has_card_content': Field(f"boolean({_CARD_CONTENT})"),
+    'price_text': Field(f"{_CARD_CONTENT}/descendant::h3[1]", stripped),
+    'texts': Field(f"{_CARD_CONTENT}/descendant::p", stripped, many=True),
+    'style': Field(f"{_CARD_IMAGE}/@style", str),
+    'features_section': Field(
+        f"(.//*[self::div or self::section][{class_contains('included-features', 'features-list', 'home-features')}])[1]"
+    ),
+}, rows=f"//div[{has_class('toggle-item')}]")
+
+_FEATURE_GROUPS = etree.XPath(f".//*[self::div or self::ul][{class_contains('feature-group')}]")
+_FEATURES = etree.XPath(f".//*[self::li or self::div][{class_contains('feature')}]")
+_FEATURE_ITEMS = etree.XPath(".//li")
+_DISTANCE_SPAN = etree.XPath(f"(.//span[{has_class('distance')}])[1]")
+
+
+def parse_tree(html):
+    """用lxml解析HTML文档"""
+    return lxml_html.document_fromstring(html)
+
+
+def _absolute(src, media_only=False):
+    """补全图片地址；media_only为True时其他相对路径保持原样（社区首图，与extract_community_images一致）"""
+    if src.startswith('/-/'):
+        return BASE_URL + src
+    if src.startswith('//'):
+        return 'https:' + src
+    if not media_only and not src.startswith('http'):
+        return BASE_URL + src
+    return src
+
+
+def _coordinate(value, scripts, pattern):
+    if value is not None:
+        return float(value)
+    for script in scripts:
+        if script:
+            match = pattern.search(script)
+            if match:
+                return float(match.group(1))
+    return 0
+
+
+def build_homesite(row, latitude, longitude):
+    """将HOMESITE_SCHEMA的一行结果转换为homesite字典，与extract_homesite_details一致"""
+    homesite = Homesite(latitude=latitude, longitude=longitude)
+    if row['has_link']:
+        homesite['status'] = 'Under Contract' if 'disabled' in (row['link_classes'] or []) else 'Available'
+        href = row['href']
+        if href is not None:
+            homesite['url'] = BASE_URL + href if href.startswith('/') else href
+            parts = href.split('/')
+            if len(parts) >= 2:
+                id_match = re.search(r'^(\d+)', parts[-1])
+                if id_match:
+                    homesite['id'] = id_match.group(1)
+
+    if row['has_card_image']:
+        if row['style'] is not None:
+            url_match = STYLE_URL_PATTERN.search(row['style'])
+            if url_match:
+                image_url = _absolute(url_match.group(1))
+                homesite['image_url'] = image_url
+                homesite['images'].append(image_url)
+        for src in row['image_srcs']:
+            if src:
+                src = _absolute(src)
+                if src not in homesite['images']:
+                    homesite['images'].append(src)
+
+    if row['has_card_content']:
+        if row['address'] is not None:
+            homesite['address'] = row['address']
+            if not homesite['name']:
+                homesite['name'] = row['address']
+        price_text = row['price_text']
+        if price_text is not None:
+            if 'Under Contract' in price_text:
+                homesite['status'] = 'Under Contract'
+            else:
+                price_match = PRICE_PATTERN.search(price_text)
+                if price_match:
+                    homesite['price'] = price_match.group(0)
+        for text in row['texts']:
+            apply_homesite_specs(homesite, parse_card_specs(text))
+    return homesite
+
+
+def _included_features(section):
+    included_features = []
+    if section is None:
+        return included_features
+    feature_groups = _FEATURE_GROUPS(section) or [section]
+    for idx, group in enumerate(feature_groups):
+        features = _FEATURES(group) or _FEATURE_ITEMS(group)
+        for feature in features:
+            feature_text = text_strip(feature)
+            if feature_text:
+                included_features.append({
+                    "section_index": str(idx),
+                    "description": feature_text
+                })
+    return included_features
+
+
+def build_homeplan(row):
+    """将HOMEPLAN_SCHEMA的一行结果转换为plan字典，与extract_home_plans一致；没有名称时返回None"""
+    if row['name'] is None:
+        return None
+    plan = HomePlan(name=row['name'])
+    if row['href']:
+        href = row['href']
+        plan['url'] = href if href.startswith('http') else BASE_URL + href
+
+    details = PlanDetails()
+    if row['has_card_content']:
+        price_text = row['price_text']
+        if price_text and 'Starting in the' in price_text:
+            price_match = PRICE_BAND_PATTERN.search(price_text)
+            if price_match:
+                details['price'] = f"From {price_match.group()}"
+        for text in row['texts']:
+            apply_plan_specs(details, parse_card_specs(text))
+
+    if row['style'] is not None:
+        url_match = STYLE_URL_PATTERN.search(row['style'])
+        if url_match:
+            image_url = url_match.group(1)
+            if not image_url.startswith('http'):
+                image_url = BASE_URL + image_url
+            details['image_url'] = image_url
+    plan['details'] = details
+
+    included_features = _included_features(row['features_section'])
+    if included_features:
+        plan['includedFeatures'] = included_features
+    return plan
+
+
+def _description(fields):
+    description = None
+    if fields['about'] is not None:
+        description = shorten_description(fields['about'])
+    if not description and fields['meta_description'] is not None:
+        description = fields['meta_description']
+        if description and description.startswith("About our community"):
+            description = description[len("About our community"):].strip()
+    if not description and fields['description_fallback'] is not None:
+        description = fields['description_fallback']
+        if description.startswith("About our community"):
+            description = description[len("About our community"):].strip()
+    return description
+
+
+def _community_name(fields):
+    if fields['name'] is not None:
+        return fields['name']
+    if fields['name_fallback'] is not None:
+        return fields['name_fallback']
+    if fields['title'] is not None:
+        title = fields['title']
+        if ' | D.R. Horton' in title:
+            return title.split(' | D.R. Horton')[0]
+        return title
+    return "Unknown Community"
+
+
+def _nearby_schools(paragraphs):
+    schools = []
+    for p in paragraphs:
+        school_text = text_lines(p).strip().split('\n')
+        if school_text:
+            school_name = school_text[0].strip()
+            school_type = school_text[1].strip() if len(school_text) > 1 else ""
+            grades = ""
+            for text in school_text:
+                if any(grade in text for grade in ['K-', 'PK-', '-5', '-8', '-12']):
+                    grades = text.strip()
+                    break
+            schools.append({
+                "name": school_name,
+                "type_and_grades": f"{school_type} {grades}".strip(),
+                "district": "Wake County Public Schools",
+                "grade": None,
+                "ranking": None,
+                "niche_link": None
+            })
+    return schools
+
+
+def extract_community_info_xpath(html, url=None, pages=None):
+    """使用编译好的XPath规格提取社区信息，输出与extract_community_info一致"""
+    tree = parse_tree(html)
+    fields = COMMUNITY_SCHEMA.extract(tree)
+
+    latitude = _coordinate(fields['data_lat'], fields['scripts'], LATITUDE_PATTERN)
+    longitude = _coordinate(fields['data_lng'], fields['scripts'], LONGITUDE_PATTERN)
+
+    price_from = "$0"
+    if fields['price_heading'] is not None:
+        price_match = PRICE_PATTERN.search(fields['price_heading'])
+        if price_match:
+            price_from = price_match.group(0)
+
+    home_details = {'sqft_range': None, 'bed_range': None, 'bath_range': None}
+    stories_range = "2"
+    if fields['has_secondary_info']:
+        home_details = parse_home_details_texts(fields['secondary_texts'])
+        stories_range = parse_stories_texts(fields['secondary_texts'])
+
+    homesites = [build_homesite(row, latitude, longitude) for row in HOMESITE_SCHEMA.extract(tree)]
+    homesites = [homesite for homesite in homesites if homesite['address'] or homesite['name']]
+    apply_homesite_pages(homesites, pages)
+
+    amenities = [
+        {'name': extract_amenity_name(text), 'description': text, 'icon_url': None}
+        for text in fields['amenities'] if text
+    ]
+
+    images = [_absolute(fields['first_image'], media_only=True)] if fields['first_image'] else []
+
+    address = fields['address'] if fields['address'] is not None else (fields['address_fallback'] or "")
+    phone_text = fields['phone'] if fields['phone'] is not None else fields['phone_fallback']
+
+    homeplans = []
+    for row in HOMEPLAN_SCHEMA.extract(tree):
+        plan = build_homeplan(row)
+        if plan is not None:
+            apply_floorplan_page(plan, pages)
+            homeplans.append(plan)
+
+    price_from, price_range = price_fields(price_from, listing_stats(homesites, homeplans))
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "name": _community_name(fields),
+        "url": url,
+        "status": None,
+        "price_from": f"{price_from}",
+        "address": address,
+        "phone": format_phone(phone_text) if phone_text is not None else "",
+        "description": _description(fields),
+        "images": images,
+        "location": {
+            "latitude": latitude,
+            "longitude": longitude,
+            "address": {
+                "city": None,
+                "state": None,
+                "market": None
+            }
+        },
+        "details": {
+            "price_range": price_range,
+            "sqft_range": home_details['sqft_range'],
+            "bed_range": home_details['bed_range'],
+            "bath_range": home_details['bath_range'],
+            "stories_range": stories_range,
+            "community_count": 1
+        },
+        "amenities": amenities,
+        "homeplans": homeplans,
+        "homesites": homesites,
+        # extract_nearby_places目前总是返回空列表，这里不再读取周边设施
+        "nearbyplaces": [],
+        "collections": [
+            {
+                "name": "Main Collection",
+                "id": "0",
+                "isActive": True,
+                "nearbySchools": _nearby_schools(fields['schools'])
+            }
+        ]
+    }
@@ -0,0 +1,94 @@
+import zlib
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_url(url):
+    """规范化URL：小写协议和主机、去掉锚点和末尾斜杠、排序查询参数"""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'https').lower()
+    netloc = parts.netloc.lower()
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+class FetchRegistry:
+    """单次运行内的页面缓存，保证同一个URL最多只下载一次"""
+
+    def __init__(self):
+        self._pages = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_saved': 0, 'bytes_fetched': 0}
+
+    def fetch(self, url, fetcher):
+        """返回URL对应的HTML，未缓存时调用fetcher(url)下载；下载失败不缓存"""
+        key = normalize_url(url)
+        while True:
+            with self._lock:
+                if key in self._pages:
+                    content = zlib.decompress(self._pages[key]).decode('utf-8')
+                    self.stats['hits'] += 1
+                    self.stats['bytes_saved'] += len(content)
+                    logger.info(f"Page cache hit: {url}")
+                    return content
+                event = self._inflight.get(key)
+                if event is None:
+                    # 由当前线程负责下载，其他线程等待结果
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    self.stats['misses'] += 1
+                    break
+            event.wait()
+            with self._lock:
+                if key not in self._pages:
+                    # 另一个线程下载失败，由调用方自己处理
+                    return None
+
+        content = None
+        try:
+            content = fetcher(url)
+        finally:
+            with self._lock:
+                if content:
+                    # 压缩后保存，整轮运行的页面都留在内存里
+                    self._pages[key] = zlib.compress(content.encode('utf-8'), 1)
+                    self.stats['bytes_fetched'] += len(content)
+                self._inflight.pop(key).set()
+        return content
+
+    def __contains__(self, url):
+        with self._lock:
+            return normalize_url(url) in self._pages
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pages)
+
+    def report(self):
+        """输出缓存命中统计"""
+        logger.info(
+            f"Page cache: {self.stats['hits']} hits, {self.stats['misses']} misses, "
+            f"{self.stats['bytes_saved'] / 1024:.1f} KB saved, "
+            f"{self.stats['bytes_fetched'] / 1024:.1f} KB fetched"
+        )
+        return dict(self.stats)
+
+
+_default_registry = FetchRegistry()
+
+
+def get_fetch_registry():
+    """获取本次运行的页面缓存"""
+    return _default_registry
+
+
+def reset_fetch_registry():
+    """开始新一轮运行时清空页面缓存"""
+    global _default_registry
+    _default_registry = FetchRegistry()
+    return _default_registry
@@ -2,6 +2,19 @@ import requests
 import json
 import logging
 import os
+import sys
+import argparse
+
+from coveo_api import DEFAULT_COMMUNITIES_FILE
+from coveo_discovery import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_WORKERS,
+    discover,
+    nationwide_grid,
+    parse_region,
+    save_index,
+    state_region,
+)
 
 # 配置日志
 logging.basicConfig(
@@ -10,139 +23,93 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def fetch_api_data():
-    """从API获取数据"""
-    url = "https://www.drhorton.com/coveo/rest/search/v2"
-    
-    # 设置请求头
-    headers = {
-        "Accept": "application/json, text/plain, */*",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Content-Type": "application/json",
-        "Origin": "https://www.drhorton.com",
-        "Referer": "https://www.drhorton.com/florida",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+DEFAULT_OUTPUT_DIR = 'data/drhorton'
+
 
-    # 设置请求体
-    payload = {
-        "actionsHistory": [],
-        "referrer": "https://www.drhorton.com/florida",
-        "analytics": {
-            "clientId": "d5e8ca30-409c-0df0-07e8-d3f83de1c009",
-            "documentLocation": "https://www.drhorton.com/florida",
-            "documentReferrer": "https://www.drhorton.com/florida",
-            "pageId": ""
-        },
-        "visitorId": "d5e8ca30-409c-0df0-07e8-d3f83de1c009",
-        "isGuestUser": False,
-        "aq": "(@fz95xtemplatename67549==\"Community Landing\") (@fid67549<>\"\") ($qf(function:'dist(@fcoordinatesz32xlatitude67549, @fcoordinatesz32xlongitude67549, 27.90688, -84.07391)', fieldName: 'distance')) (@distance<450000)",
-        "cq": "(@source==\"Coveo_web_index - 93DrHortonProd\") (@fcoordinatesz32xlatitude67549) (@fz95xlanguage67549==en) (@fz95xlatestversion67549==1)",
-        "queryFunctions": [],
-        "numberOfResults": 5000,
-        "fieldsToInclude": [
-            "@fcommunitythumbnail67549",
-            "@factivationstate67549",
-            "@factivationstatehez120x67549",
-            "@faddress167549",
-            "@famenitylist67549",
-            "@famenitylistfordisplay67549",
-            "@fbrand67549",
-            "@fbrandlogo67549",
-            "@fbrandlogoalt67549",
-            "@fcallforprice67549",
-            "@fcity67549",
-            "fcoordinatesz32xlatitude67549",
-            "@fcoordinatesz32xlongitude67549",
-            "@fid67549",
-            "@fismultigen67549",
-            "@fmarketingname67549",
-            "@fnumberofavailablehomes67549",
-            "@fnumberofbathroomsmaz120x67549",
-            "@fnumberofbathroomsmin67549",
-            "@fnumberofbedroomsmaz120x67549",
-            "@fnumberofbedroomsmin67549",
-            "@fnumberofgaragesmaz120x67549",
-            "@fnumberofgaragesmin67549",
-            "@fnumberofstoriesmaz120x67549",
-            "@fnumberofstoriesmin67549",
-            "@fpricemin67549",
-            "@flongprice67549",
-            "@fpropertytype67549",
-            "fsqftmaz120x67549",
-            "@fsqftmin67549",
-            "@fstate67549",
-            "@fsysuri67549",
-            "@furllink67549",
-            "@fz122xip67549",
-            "@fsalesofficephone67549",
-            "fnumberofbathroomsmin67549",
-            "@source",
-            "@collection",
-            "@urihash"
-        ],
-        "pipeline": "allresults",
-        "searchHub": "Florida",
-        "term": ""
-    }
+def default_output_files(args):
+    """按查询范围命名输出文件：只查询Florida时沿用florida_links.json/florida_communities.json，
+    --nationwide为nationwide_*，其他为州代码（自定义区域为regions），例如fl_ga_tx_links.json"""
+    if args.nationwide:
+        label = 'nationwide'
+    else:
+        label = '_'.join(code.lower() for code in args.states or []) or 'fl'
+        if args.region:
+            label = 'regions' if not args.states else f"{label}_regions"
+    if label == 'fl':
+        return os.path.join(DEFAULT_OUTPUT_DIR, 'florida_links.json'), DEFAULT_COMMUNITIES_FILE
+    return (os.path.join(DEFAULT_OUTPUT_DIR, f'{label}_links.json'),
+            os.path.join(DEFAULT_OUTPUT_DIR, f'{label}_communities.json'))
+
+
+def fetch_api_data(regions=None, workers=DEFAULT_WORKERS, page_size=DEFAULT_PAGE_SIZE,
+                   output_file='data/drhorton/florida_links.json', communities_file=DEFAULT_COMMUNITIES_FILE):
+    """从API获取数据，默认只查询Florida；有区域查询失败时不写出文件并返回None"""
+    if regions is None:
+        regions = [state_region('FL')]
     
     try:
-        # 发送POST请求
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()  # 检查响应状态
-        
-        # 解析JSON响应
-        data = response.json()
+        # 各区域并发分页查询，按urihash去重后写入同一个索引
+        index = discover(regions, workers=workers, page_size=page_size, stream_path=os.path.splitext(output_file)[0] + '.jsonl')
+        if index.failed:
+            # 部分结果会覆盖上次完整的链接列表，不写出
+            logger.error(f"有区域查询失败，未写出 {output_file}")
+            return None
+        for url in index.links:
+            logger.info(f"Found link: {url}")
         
-        # 提取链接
-        links = []
-        if 'results' in data:
-            for result in data['results']:
-                if 'raw' in result:
-                    # 查找furllink67549字段
-                    url_link = result['raw'].get('furllink67549')
-                    if url_link:
-                        full_url = f"https://www.drhorton.com{url_link}"
-                        links.append(full_url)
-                        logger.info(f"Found Florida link: {full_url}")
+        # 保存结果到JSON文件，同时保存完整的社区字段
+        save_index(index, output_file, communities_file)
         
-        # 去重
-        unique_links = list(set(links))
-        
-        # 保存结果到JSON文件
-        os.makedirs('data/drhorton', exist_ok=True)
-        output_file = 'data/drhorton/florida_links.json'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(unique_links, f, indent=2, ensure_ascii=False)
-        
-        logger.info(f"已提取 {len(unique_links)} 个Florida链接并保存到 {output_file}")
-        
-        return unique_links
+        return index.links
         
     except requests.exceptions.RequestException as e:
         logger.error(f"API请求失败: {str(e)}")
-        return []
+        return None
     except json.JSONDecodeError as e:
         logger.error(f"JSON解析失败: {str(e)}")
-        return []
+        return None
     except Exception as e:
         logger.error(f"发生未知错误: {str(e)}")
-        return []
+        return None
 
 def main():
-    """主函数"""
+    """主函数，有区域查询失败时以状态码1退出"""
     try:
+        parser = argparse.ArgumentParser(description='Discover D.R. Horton community links through the Coveo search API')
+        parser.add_argument('--states', nargs='*', default=None, help='State codes to query, e.g. FL GA TX (default: FL)')
+        parser.add_argument('--region', action='append', default=[], help='Extra region as "name:lat,lng,radius_km", e.g. a market')
+        parser.add_argument('--nationwide', action='store_true', help='Query a grid of centroids covering the whole country; use this for a complete crawl (--states circles cover each state\'s bounding box)')
+        parser.add_argument('--grid-step', type=float, default=3.0, help='Grid spacing in degrees for --nationwide')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Regions queried concurrently')
+        parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help='Results per Coveo request')
+        parser.add_argument('--output', help='JSON list of discovered community URLs (default: data/drhorton/<scope>_links.json, florida_links.json for FL)')
+        parser.add_argument('--communities-file', help='Coveo community records (default: data/drhorton/<scope>_communities.json, florida_communities.json for FL)')
+        args = parser.parse_args()
+        
+        regions = []
+        if args.nationwide:
+            regions.extend(nationwide_grid(args.grid_step))
+        for code in args.states or []:
+            regions.append(state_region(code))
+        regions.extend(parse_region(spec) for spec in args.region)
+        
+        output_file, communities_file = default_output_files(args)
+        
         # 获取并处理API数据
-        links = fetch_api_data()
+        links = fetch_api_data(regions or None, workers=args.workers, page_size=args.page_size,
+                               output_file=args.output or output_file, communities_file=args.communities_file or communities_file)
         
+        if links is None:
+            sys.exit(1)
         if links:
-            logger.info("成功获取Florida链接列表")
-            logger.info(f"总共获取到 {len(links)} 个Florida链接")
+            logger.info("成功获取链接列表")
+            logger.info(f"总共获取到 {len(links)} 个链接")
         else:
-            logger.warning("未能获取到任何Florida链接")
+            logger.warning("未能获取到任何链接")
         
     except Exception as e:
         logger.error(f"主程序执行错误: {str(e)}")
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -3,24 +3,69 @@ import json
 import logging
 from datetime import datetime
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 import re
 import argparse
-import random
-global_url=""
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from driver_pool import configure_pool, get_pool, close_pool
+from rate_limiter import configure_rate_limiter, get_rate_limiter
+from fetch_registry import get_fetch_registry
+from page_cache import DEFAULT_CACHE_DIR, configure_page_cache, get_page_cache
+from http_fetcher import configure_http_fetcher, get_http_fetcher
+from page_readiness import wait_for_page
+from resource_blocker import DEFAULT_CATEGORIES, RESOURCE_CATEGORIES, configure_resource_blocker, get_resource_blocker
+from catalog import DEFAULT_CATALOG_FILE, configure_catalog, get_catalog
+from record_store import COMPRESSIONS, DEFAULT_SHARD_BYTES, DEFAULT_STORE_DIR, configure_record_store, get_record_store
+from work_queue import DEFAULT_QUEUE_FILE, DONE, FAILED, configure_work_queue, get_work_queue, worker_id
+from change_tracker import (
+    DEFAULT_STATE_FILE,
+    community_fingerprint,
+    configure_change_tracker,
+    get_change_tracker,
+    listing_fingerprint,
+)
+from coveo_api import (
+    DEFAULT_COMMUNITIES_FILE,
+    HOMESITE_TEMPLATE,
+    PLAN_TEMPLATE,
+    community_ids,
+    get_community_summary,
+    load_community_index,
+    load_listings,
+    save_listing_results,
+)
+from community_page import as_community_page, soup_of
+from community_records import community_record_exists, load_community_record, save_community_record
+from detail_pages import apply_floorplan_page, apply_homesite_pages, covered_by_listing, parse_homesite_page_info
+from html_parsing import make_soup, set_parser_backend
+from records import AvailableHome, HomePlan, Homesite, PlanDetails, to_json
+from price_stats import listing_stats, price_fields
+from spec_parsing import (
+    PRICE_BAND_PATTERN,
+    PRICE_PATTERN,
+    STYLE_URL_PATTERN,
+    apply_homesite_specs,
+    apply_plan_specs,
+    extract_amenity_name,
+    format_phone,
+    format_range,
+    parse_card_specs,
+    parse_home_details_texts,
+    parse_loose_specs,
+    parse_stories_texts,
+    shorten_description,
 )
+global_url=""
+# 社区页面提取方式：soup（BeautifulSoup）或 xpath（extraction_spec中编译好的XPath规格）
+EXTRACTOR = 'soup'
 logger = logging.getLogger(__name__)
 
 def extract_available_homes(soup):
+    """提取可用房屋信息，同一个页面只计算一次"""
+    page = as_community_page(soup)
+    return page.memoize('available_homes', lambda: _extract_available_homes(page.soup))
+
+def _extract_available_homes(soup):
     """提取可用房屋信息"""
     available_homes = []
     try:
@@ -28,12 +73,10 @@ def extract_available_homes(soup):
         home_items = soup.find_all(['div', 'article'], class_=lambda x: x and any(keyword in str(x).lower() for keyword in ['home-item', 'quick-move', 'available-home', 'plan-item', 'floor-plan']))
         
         for item in home_items:
-            home_info = {}
-            
             # 提取名称
             name_elem = item.find(['h3', 'h4', 'div'], class_=lambda x: x and 'name' in str(x).lower())
             if name_elem:
-                home_info['name'] = name_elem.text.strip()
+                home_info = AvailableHome(name_elem.text.strip())
             else:
                 continue  # 如果没有名称，跳过这个房屋
             
@@ -41,33 +84,24 @@ def extract_available_homes(soup):
             price_elem = item.find(['div', 'span'], class_=lambda x: x and 'price' in str(x).lower())
             if price_elem:
                 price_text = price_elem.text
-                price_match = re.search(r'\$[\d,]+', price_text)
+                price_match = PRICE_PATTERN.search(price_text)
                 if price_match:
-                    home_info['price'] = int(price_match.group().replace('$', '').replace(',', ''))
+                    home_info.price = int(price_match.group().replace('$', '').replace(',', ''))
             
-            # 提取详情
+            # 提取详情（卧室、浴室、面积一次扫描）
             details_elem = item.find(['div', 'ul'], class_=lambda x: x and any(keyword in str(x).lower() for keyword in ['details', 'specs', 'features', 'info']))
             if details_elem:
-                text = details_elem.text.lower()
-                
-                # 提取卧室数量
-                beds_match = re.search(r'(\d+)\s*(?:bed|bedroom)', text)
-                if beds_match:
-                    home_info['beds'] = int(beds_match.group(1))
-                
-                # 提取浴室数量
-                baths_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:bath|bathroom)', text)
-                if baths_match:
-                    home_info['baths'] = float(baths_match.group(1))
-                
-                # 提取面积
-                sqft_match = re.search(r'(\d+(?:,\d+)?)\s*sq\s*ft', text.replace(',', ''))
-                if sqft_match:
-                    home_info['sqft'] = int(sqft_match.group(1))
+                specs = parse_loose_specs(details_elem.text)
+                if specs.beds is not None:
+                    home_info.beds = specs.beds
+                if specs.baths is not None:
+                    home_info.baths = specs.baths
+                if specs.sqft is not None:
+                    home_info.sqft = specs.sqft
             
             # 提取地址
             address_elem = item.find(['address', 'div'], class_=lambda x: x and 'address' in str(x).lower())
-            home_info['address'] = address_elem.text.strip() if address_elem else ''
+            home_info.address = address_elem.text.strip() if address_elem else ''
             
             # 提取缩略图
             img_elem = item.find('img')
@@ -75,7 +109,7 @@ def extract_available_homes(soup):
                 src = img_elem['src']
                 if src.startswith('//'):
                     src = 'https:' + src
-                home_info['thumbnail'] = src
+                home_info.thumbnail = src
             
             # 提取链接
             link_elem = item.find('a')
@@ -83,46 +117,25 @@ def extract_available_homes(soup):
                 href = link_elem['href']
                 if not href.startswith('http'):
                     href = 'https://www.drhorton.com' + href
-                home_info['url'] = href
+                home_info.url = href
             
-            # 添加默认值
-            home_info.setdefault('price', 0)
-            home_info.setdefault('beds', 0)
-            home_info.setdefault('baths', 0)
-            home_info.setdefault('sqft', 0)
-            home_info.setdefault('address', '')
-            home_info.setdefault('thumbnail', '')
-            home_info.setdefault('url', '')
-            home_info.setdefault('stories', 2)  # 默认为2层
-            
-            if home_info:  # 只有当有基本信息时才添加
-                available_homes.append(home_info)
+            available_homes.append(home_info)
         
         # 如果没有找到任何房屋，添加示例数据
         if not available_homes:
             available_homes = [
-                {
-                    "name": "The Arlington",
-                    "price": 450000,
-                    "beds": 3,
-                    "baths": 2.5,
-                    "sqft": 2100,
-                    "address": "1234 Main St, Apex, NC 27502",
-                    "thumbnail": "https://www.drhorton.com/images/default-home.jpg",
-                    "url": "https://www.drhorton.com/north-carolina/raleigh-durham/apex/the-townes-at-horton-park/arlington",
-                    "stories": 2
-                },
-                {
-                    "name": "The Bradford",
-                    "price": 475000,
-                    "beds": 4,
-                    "baths": 3,
-                    "sqft": 2400,
-                    "address": "1236 Main St, Apex, NC 27502",
-                    "thumbnail": "https://www.drhorton.com/images/default-home.jpg",
-                    "url": "https://www.drhorton.com/north-carolina/raleigh-durham/apex/the-townes-at-horton-park/bradford",
-                    "stories": 2
-                }
+                AvailableHome(
+                    "The Arlington", price=450000, beds=3, baths=2.5, sqft=2100,
+                    address="1234 Main St, Apex, NC 27502",
+                    thumbnail="https://www.drhorton.com/images/default-home.jpg",
+                    url="https://www.drhorton.com/north-carolina/raleigh-durham/apex/the-townes-at-horton-park/arlington",
+                ),
+                AvailableHome(
+                    "The Bradford", price=475000, beds=4, baths=3, sqft=2400,
+                    address="1236 Main St, Apex, NC 27502",
+                    thumbnail="https://www.drhorton.com/images/default-home.jpg",
+                    url="https://www.drhorton.com/north-carolina/raleigh-durham/apex/the-townes-at-horton-park/bradford",
+                ),
             ]
     except Exception as e:
         logger.error(f"提取可用房屋信息时出错: {str(e)}")
@@ -132,31 +145,14 @@ def extract_available_homes(soup):
 def extract_description(soup):
     """提取社区描述信息"""
     description = None
+    page = as_community_page(soup)
+    soup = page.soup
     try:
         # 首先尝试从 community-main-details_about 类获取描述
-        about_section = soup.find('div', class_='community-main-details_about')
+        about_section = page.about_section
         if about_section:
             # 获取文本内容并清理
-            description = about_section.get_text(strip=True)
-            
-            # 移除"About our community"前缀
-            if description.startswith("About our community"):
-                description = description[len("About our community"):].strip()
-            
-            # 如果内容太长，截取前200个字符，并在最后一个句号处截断
-            if len(description) > 200:
-                # 找到200字符内的最后一个句号
-                short_desc = description[:200]
-                last_period = short_desc.rfind('.')
-                if last_period > 0:
-                    description = description[:last_period + 1]
-                else:
-                    # 如果没有找到句号，就在最近的空格处截断
-                    last_space = short_desc.rfind(' ')
-                    if last_space > 0:
-                        description = description[:last_space] + '...'
-                    else:
-                        description = short_desc + '...'
+            description = shorten_description(about_section.get_text(strip=True))
             
             logger.info(f"从community-main-details_about提取的描述: {description}")
         
@@ -187,9 +183,10 @@ def extract_description(soup):
 def extract_images(soup):
     """提取社区和房屋图片"""
     images = []
+    page = as_community_page(soup)
     try:
         # 查找 slick-modal-content pics-first 元素
-        slick_content = soup.find('div', class_='slick-modal-content pics-first')
+        slick_content = page.slick_content
         if slick_content:
             # 获取第一个img元素
             first_img = slick_content.find('img')
@@ -210,39 +207,10 @@ def extract_amenities(soup):
     """提取社区配套设施"""
     amenities = []
     
-    def extract_amenity_name(description):
-        """从描述中提取简短的设施名称"""
-        # 移除常见的修饰词和连接词
-        remove_words = ['featuring', 'including', 'with', 'and', 'the', 'a', 'an', 'to', 'for', 'in', 'on', 'at', 'of']
-        
-        # 处理特殊格式的描述
-        if ':' in description:
-            # 如果描述中包含冒号，使用冒号前的部分
-            return description.split(':')[0].strip()
-        elif '-' in description:
-            # 如果描述中包含破折号，使用破折号前的部分
-            return description.split('-')[0].strip()
-        else:
-            # 将描述分割成单词
-            words = description.split()
-            # 找到第一个不在移除列表中的单词开始
-            start_idx = 0
-            while start_idx < len(words) and words[start_idx].lower() in remove_words:
-                start_idx += 1
-            
-            # 取前3-4个有意义的单词作为名称
-            meaningful_words = []
-            for word in words[start_idx:]:
-                if word.lower() not in remove_words:
-                    meaningful_words.append(word)
-                if len(meaningful_words) >= 4:
-                    break
-            
-            return ' '.join(meaningful_words) if meaningful_words else description
-    
+    page = as_community_page(soup)
     try:
         # 查找class为amenities的标签
-        amenities_div = soup.find('ul', class_='amenities')
+        amenities_div = page.amenities_list
         if amenities_div:
             # 获取所有li标签
             amenities_list = amenities_div.find_all('li')
@@ -263,13 +231,14 @@ def extract_amenities(soup):
 
 def extract_price_from(soup):
     """提取起始价格"""
+    page = as_community_page(soup)
     try:
-        main_info = soup.find('div', class_='community-main-info')
+        main_info = page.main_info
         if main_info:
             h2_tag = main_info.find('h2')
             if h2_tag:
                 price_text = h2_tag.get_text(strip=True)
-                price_match = re.search(r'\$[\d,]+', price_text)
+                price_match = PRICE_PATTERN.search(price_text)
                 if price_match:
                     return price_match.group(0)
     except Exception as e:
@@ -283,53 +252,20 @@ def extract_home_details(soup):
         'bed_range': None,
         'bath_range': None
     }
+    page = as_community_page(soup)
     try:
-        secondary_info = soup.find('div', class_='community-secondary-info')
-        if secondary_info:
-            # 获取所有p标签
-            p_tags = secondary_info.find_all('p')
-            for p in p_tags:
-                text = p.get_text(strip=True)
-                
-                # 提取卧室数量 (3 - 5 Bed)
-                bed_match = re.search(r'(\d+)\s*-\s*(\d+)\s*Bed', text)
-                if bed_match:
-                    details['bed_range'] = f"{bed_match.group(1)} - {bed_match.group(2)}"
-                
-                # 提取浴室数量，先尝试范围格式 (2.5 - 4 Bath)，如果没有则尝试单个数值
-                bath_range_match = re.search(r'([\d.]+)\s*-\s*([\d.]+)\s*Bath', text)
-                if bath_range_match:
-                    details['bath_range'] = f"{bath_range_match.group(1)} - {bath_range_match.group(2)}"
-                else:
-                    # 尝试匹配单个数值 (3 Bath)
-                    bath_single_match = re.search(r'([\d.]+)\s*Bath', text)
-                    if bath_single_match:
-                        details['bath_range'] = bath_single_match.group(1)
-                
-                # 提取面积 (From 1,989 Sq. Ft.)
-                sqft_match = re.search(r'From\s+([\d,]+)\s*Sq\.\s*Ft\.', text)
-                if sqft_match:
-                    details['sqft_range'] = f"From {sqft_match.group(1)} Sq. Ft."
-                
+        if page.secondary_info:
+            details.update(parse_home_details_texts(page.secondary_texts))
     except Exception as e:
         print(f"提取房屋详细信息时出错: {str(e)}")
     return details
 
 def extract_stories_range(soup):
     """提取层数信息"""
+    page = as_community_page(soup)
     try:
-        secondary_info = soup.find('div', class_='community-secondary-info')
-        if secondary_info:
-            for p in secondary_info.find_all('p'):
-                text = p.get_text(strip=True)
-                # 匹配 "1 - 2 Story" 格式
-                story_match = re.search(r'(\d+)\s*-\s*(\d+)\s*Story', text)
-                if story_match:
-                    return f"{story_match.group(1)} - {story_match.group(2)}"
-                # 匹配单个数字的 "2 Story" 格式
-                single_story_match = re.search(r'(\d+)\s*Story', text)
-                if single_story_match:
-                    return single_story_match.group(1)
+        if page.secondary_info:
+            return parse_stories_texts(page.secondary_texts)
     except Exception as e:
         print(f"提取层数信息时出错: {str(e)}")
     return "2"  # 默认值
@@ -337,8 +273,9 @@ def extract_stories_range(soup):
 def extract_nearby_places(soup):
     """提取周边设施"""
     nearby_places = []
+    page = as_community_page(soup)
     try:
-        amenities_div = soup.find('div', class_='amenitiesDiv')
+        amenities_div = page.amenities_div
         if amenities_div:
             items = amenities_div.find_all('li')
             for item in items:
@@ -390,6 +327,7 @@ def categorize_place(place_name):
 def extract_schools(soup):
     """提取周边学校信息"""
     schools = []
+    soup = soup_of(soup)
     try:
         # 查找学校部分
         schools_section = soup.find('div', class_=lambda x: x and 'schools' in x.lower())
@@ -413,15 +351,16 @@ def extract_community_count(soup):
     """提取社区房屋总数"""
     return 1  # 按要求固定返回1
 
-def extract_home_plans(soup):
+def extract_home_plans(soup, pages=None):
     """提取房屋计划信息"""
     home_plans = []
+    page = as_community_page(soup)
     try:
         # 查找所有toggle-item div
-        plan_items = soup.find_all('div', class_='toggle-item')
+        plan_items = page.toggle_items
         
         for item in plan_items:
-            plan = {}
+            plan = HomePlan()
             
             # 提取名称 - 从pr-case的h2标签
             name_elem = item.find('h2', class_='pr-case')
@@ -438,16 +377,7 @@ def extract_home_plans(soup):
                     href = 'https://www.drhorton.com' + href
                 plan['url'] = href
             
-            # 初始化details字典
-            details = {
-                'price': None,
-                'beds': None,
-                'baths': None,
-                'half_baths': None,  # 默认为None
-                'sqft': None,
-                'status': "Actively selling",
-                'image_url': None
-            }
+            details = PlanDetails()
             
             # 提取card-content中的信息
             card_content = item.find('div', class_='card-content')
@@ -457,39 +387,19 @@ def extract_home_plans(soup):
                 if price_elem:
                     price_text = price_elem.text.strip()
                     if 'Starting in the' in price_text:
-                        price_match = re.search(r'\$\d+s', price_text)
+                        price_match = PRICE_BAND_PATTERN.search(price_text)
                         if price_match:
                             details['price'] = f"From {price_match.group()}"
                 
-                # 提取beds, baths, sqft信息
+                # 提取beds, baths, sqft信息，每个p标签只扫描一次
                 for p in card_content.find_all('p'):
-                    text = p.text.strip()
-                    
-                    # 提取beds
-                    beds_match = re.search(r'(\d+)\s*Bed', text)
-                    if beds_match:
-                        details['beds'] = f"{beds_match.group(1)} bd"
-                    
-                    # 提取baths和half baths
-                    baths_match = re.search(r'(\d+(?:\.\d+)?)\s*Bath', text)
-                    if baths_match:
-                        details['baths'] = f"{baths_match.group(1)} ba"
-                        
-                        # 检查是否有half bath
-                        half_bath_match = re.search(r'(\d+)\s*Half\s*Bath', text, re.IGNORECASE)
-                        if half_bath_match:
-                            details['half_baths'] = f"{half_bath_match.group(1)} half ba"
-                    
-                    # 提取sqft
-                    sqft_match = re.search(r'(\d+(?:,\d+)?)\s*Sq\.\s*Ft\.', text)
-                    if sqft_match:
-                        details['sqft'] = f"{sqft_match.group(1)} ft²"
+                    apply_plan_specs(details, parse_card_specs(p.text.strip()))
             
             # 提取image_url
             card_image = item.find('div', class_='card-image')
             if card_image and 'style' in card_image.attrs:
                 style = card_image['style']
-                url_match = re.search(r'url\(["\']?(.*?)["\']?\)', style)
+                url_match = STYLE_URL_PATTERN.search(style)
                 if url_match:
                     image_url = url_match.group(1)
                     if not image_url.startswith('http'):
@@ -525,66 +435,7 @@ def extract_home_plans(soup):
                 plan['includedFeatures'] = included_features
             
             # 下载并处理homeplan详情页面
-            if plan.get('url'):
-                try:
-                    # 下载homeplan页面
-                    homeplan_page = download_homesite_page(plan['url'])
-                    if homeplan_page:
-                        # 从页面提取楼层信息和图片
-                        with open(homeplan_page, 'r', encoding='utf-8') as f:
-                            page_content = f.read()
-                        page_soup = BeautifulSoup(page_content, 'html.parser')
-                        
-                        # 提取楼层信息
-                        property_details = page_soup.find('div', class_='property-details')
-                        if property_details:
-                            story_text = property_details.get_text()
-                            story_match = re.search(r'(\d+(?:\.5)?)\s*Story', story_text)
-                            if story_match:
-                                stories = float(story_match.group(1))
-                                # 创建floorplan_images数组
-                                floorplan_images = []
-                                num_floors = int(stories) if stories.is_integer() else int(stories + 0.5)
-                                for i in range(1, num_floors + 1):
-                                    floorplan_images.append({
-                                        "name": f"{i}st Floor Floorplan" if i == 1 else f"{i}nd Floor Floorplan" if i == 2 else f"{i}rd Floor Floorplan",
-                                        "image_url": None
-                                    })
-                                
-                                # 提取图片URL
-                                content_photos = page_soup.find_all('div', class_='content-photo')
-                                for i, photo in enumerate(content_photos):
-                                    if i < len(floorplan_images):
-                                        img = photo.find('img')
-                                        if img and img.get('src'):
-                                            src = img['src']
-                                            if src.startswith('//'):
-                                                src = 'https:' + src
-                                            elif not src.startswith('http'):
-                                                src = 'https://www.drhorton.com' + src
-                                            floorplan_images[i]['image_url'] = src
-                                # 新增逻辑：将 None 的 image_url 替换为 "1st Floor Floorplan" 的值
-                                first_floor_url = next((item["image_url"] for item in floorplan_images if item["name"] == "1st Floor Floorplan"), None)
-                                if first_floor_url is not None:
-                                    for item in floorplan_images:
-                                        if item["image_url"] is None:
-                                            item["image_url"] = first_floor_url
-                                
-                                # 添加到plan对象
-                                plan['floorplan_images'] = floorplan_images
-                                logger.info(f"Added {len(floorplan_images)} floorplan images to plan {plan['name']}")
-                        
-                        # 删除临时文件
-                        try:
-                            os.remove(homeplan_page)
-                        except:
-                            pass
-                        
-                        # 添加延迟，避免请求过于频繁
-                        time.sleep(random.uniform(2, 5))
-                        
-                except Exception as e:
-                    logger.error(f"Error processing homeplan detail page for {plan['name']}: {str(e)}")
+            apply_floorplan_page(plan, pages)
             
             home_plans.append(plan)
             logger.info(f"Added home plan: {plan['name']}")
@@ -598,6 +449,7 @@ def extract_home_plans(soup):
 def extract_nearby_schools(soup):
     """提取附近学校信息"""
     schools = []
+    soup = soup_of(soup)
     try:
         # 查找Schools标题
         schools_h3 = soup.find('h3', string='Schools')
@@ -643,9 +495,10 @@ def extract_nearby_schools(soup):
 def extract_homesites(soup):
     """提取可用房屋信息，格式与everbe.json一致"""
     homesites = []
+    page = as_community_page(soup)
     try:
         # 查找 relatedmovein div
-        related_movein = soup.find('div', id='relatedmovein')
+        related_movein = page.related_movein
         if related_movein:
             # 查找所有可用房屋
             available_homes = related_movein.find('div', id='available-homes')
@@ -661,7 +514,7 @@ def extract_homesites(soup):
                     price_elem = item.find(['div', 'span'], class_=lambda x: x and 'price' in str(x).lower())
                     price = None
                     if price_elem:
-                        price_match = re.search(r'\$[\d,]+', price_elem.text)
+                        price_match = PRICE_PATTERN.search(price_elem.text)
                         if price_match:
                             price = price_match.group()
                     
@@ -669,18 +522,10 @@ def extract_homesites(soup):
                     details_elem = item.find(['div', 'ul'], class_=lambda x: x and any(keyword in str(x).lower() for keyword in ['details', 'specs', 'features']))
                     beds = baths = sqft = None
                     if details_elem:
-                        text = details_elem.text.lower()
-                        beds_match = re.search(r'(\d+)\s*(?:bed|bedroom)', text)
-                        if beds_match:
-                            beds = beds_match.group(1)
-                        
-                        baths_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:bath|bathroom)', text)
-                        if baths_match:
-                            baths = float(baths_match.group(1))
-                        
-                        sqft_match = re.search(r'(\d+(?:,\d+)?)\s*sq\s*ft', text.replace(',', ''))
-                        if sqft_match:
-                            sqft = sqft_match.group(1)
+                        specs = parse_loose_specs(details_elem.text)
+                        beds = specs.raw.get('beds')
+                        baths = specs.baths
+                        sqft = specs.raw.get('sqft')
                     
                     # 提取地址
                     address_elem = item.find(['address', 'div'], class_=lambda x: x and 'address' in str(x).lower())
@@ -704,23 +549,19 @@ def extract_homesites(soup):
                             images.append(src)
                     
                     # 创建 homesite 对象
-                    homesite = {
-                        "name": None,
-                        "plan": plan_name,
-                        "id": str(hash(address))[:10] if address else None,
-                        "address": address,
-                        "price": price,
-                        "beds": beds,
-                        "baths": baths,
-                        "sqft": sqft,
-                        "status": None,
-                        "image_url": None,
-                        "url": url,
-                        "latitude": extract_latitude(soup),
-                        "longitude": extract_longitude(soup),
-                        "overview": "This beautiful new construction home features an open concept floor plan with modern finishes throughout.",
-                        "images": images
-                    }
+                    homesite = Homesite(
+                        plan=plan_name,
+                        id=str(hash(address))[:10] if address else None,
+                        address=address,
+                        price=price,
+                        beds=beds,
+                        baths=baths,
+                        sqft=sqft,
+                        url=url,
+                        latitude=extract_latitude(page),
+                        longitude=extract_longitude(page),
+                        images=images,
+                    )
                     homesites.append(homesite)
                     logger.info(f"Added homesite: {homesite}")
                 
@@ -731,81 +572,53 @@ def extract_homesites(soup):
         logger.exception("详细错误信息：")
     return homesites
 
-def extract_community_info(soup):
+def extract_community_info(soup, url=None, pages=None):
     """提取社区信息，确保数据结构与everbe.json一致"""
+    # 解析一次页面，所有extract_*函数共享定位到的容器和派生值
+    page = as_community_page(soup)
+
     # 获取可用房屋信息
-    available_homes = extract_available_homes(soup)
+    available_homes = extract_available_homes(page)
  
     # 提取基本信息
-    price_from = extract_price_from(soup)
-    home_details = extract_home_details(soup)
-    stories_range = extract_stories_range(soup)
+    price_from = extract_price_from(page)
+    home_details = extract_home_details(page)
+    stories_range = extract_stories_range(page)
 
     # 提取 homesites 和 nearbyplaces
-    homesites = extract_homesite_details(soup)
+    homesites = extract_homesite_details(page)
     
     # 在获取完整的homesites列表后，处理每个homesite的详情页面
-    logger.info(f"Processing {len(homesites)} homesite details...")
-    for homesite in homesites:
-        if homesite.get('url'):
-            try:
-                # 下载homesite页面
-                homesite_page = download_homesite_page(homesite['url'])
-                if homesite_page:
-                    # 从页面提取plan和images信息
-                    info = extract_homesite_page_info(homesite_page)
-                    if info.get('plan'):
-                        homesite['plan'] = info['plan']
-                        logger.info(f"Updated plan for homesite {homesite.get('address')}: {homesite['plan']}")
-                    if info.get('images'):
-                        homesite['images'] = info['images']
-                        logger.info(f"Updated images for homesite {homesite.get('address')}: {len(info['images'])} images found")
-                    
-                    # 删除临时文件
-                    try:
-                        os.remove(homesite_page)
-                    except:
-                        pass
-                    
-                    # 添加延迟，避免请求过于频繁
-                    time.sleep(random.uniform(2, 5))
-                    
-            except Exception as e:
-                logger.error(f"Error processing homesite detail page for {homesite.get('address')}: {str(e)}")
+    apply_homesite_pages(homesites, pages)
     
-    nearby_places = extract_nearby_places(soup)
+    nearby_places = extract_nearby_places(page)
 
     # 提取设施信息
-    amenities_list = extract_amenities(soup)
+    amenities_list = extract_amenities(page)
     logger.info(f"Extracted amenities: {amenities_list}")
 
     # 提取学校信息
-    nearby_schools = extract_nearby_schools(soup)
+    nearby_schools = extract_nearby_schools(page)
     
-    # 更新price_range
-    max_price = None
-    for homesite in homesites:
-        if homesite.get('price'):
-            price_match = re.search(r'\$[\d,]+', str(homesite['price']))
-            if price_match:
-                current_price = price_match.group(0)
-                if not max_price or current_price > max_price:
-                    max_price = current_price
-                    logger.info(f"max_price-------------------: {max_price}")
+    homeplans = extract_home_plans(page, pages)
+
+    # 按数值统计房源和户型的价格，得到price_from和price_range
+    price_from, price_range = price_fields(price_from, listing_stats(homesites, homeplans))
+    logger.info(f"price_range-------------------: {price_range}")
     
     community_info = {
         "timestamp": datetime.now().isoformat(),
-        "name": extract_community_name(soup),
-        "url": global_url,
+        "name": extract_community_name(page),
+        "url": url if url is not None else global_url,
         "status": None,
         "price_from": f"{price_from}",
-        "address": extract_address(soup),
-        "phone": extract_phone(soup),
-        "description": extract_description(soup),
-        "images": extract_images(soup),
+        "address": extract_address(page),
+        "phone": extract_phone(page),
+        "description": extract_description(page),
+        "images": extract_images(page),
         "location": {
-            "latitude": extract_latitude(soup),
-            "longitude": extract_longitude(soup),
+            "latitude": extract_latitude(page),
+            "longitude": extract_longitude(page),
             "address": {
                 "city": None,
                 "state": None,
@@ -813,15 +626,15 @@ def extract_community_info(soup):
             }
         },
         "details": {
-            "price_range": f"{price_from} - {max_price}" if max_price else price_from,
+            "price_range": price_range,
             "sqft_range": home_details['sqft_range'],
             "bed_range": home_details['bed_range'],
             "bath_range": home_details['bath_range'],
             "stories_range": stories_range,
-            "community_count": extract_community_count(soup)
+            "community_count": extract_community_count(page)
         },
         "amenities": amenities_list,
-        "homeplans": extract_home_plans(soup),
+        "homeplans": homeplans,
         "homesites": homesites,
         "nearbyplaces": nearby_places,
         "collections": [
@@ -836,11 +649,63 @@ def extract_community_info(soup):
 
     return community_info
 
+def market_from_url(url):
+    """从社区URL中取出市场名称，例如/georgia/southern-georgia/... -> Southern Georgia"""
+    parts = [part for part in url.split('://', 1)[-1].split('/')[1:] if part]
+    if len(parts) < 4:
+        return None
+    return parts[1].replace('-', ' ').title()
+
+def apply_coveo_summary(community_info, summary):
+    """用Coveo API的社区字段覆盖页面提取的details/location/phone/price_from/amenities，API缺失的字段保留页面值"""
+    if summary.get('price_min'):
+        price_from = f"${summary['price_min']:,.0f}"
+        # price_range的上限仍来自页面上的可售房源
+        price_range = community_info['details'].get('price_range') or ''
+        upper = price_range.split(' - ', 1)[1] if ' - ' in price_range else None
+        community_info['price_from'] = price_from
+        community_info['details']['price_range'] = f"{price_from} - {upper}" if upper else price_from
+
+    if summary.get('phone'):
+        community_info['phone'] = format_phone(summary['phone'])
+    if summary.get('street') and summary.get('city'):
+        community_info['address'] = f"{summary['street']}, {summary['city']}, {summary['state'] or ''} {summary['zip'] or ''}".strip()
+
+    location = community_info['location']
+    if summary.get('latitude') and summary.get('longitude'):
+        location['latitude'] = summary['latitude']
+        location['longitude'] = summary['longitude']
+    location['address'] = {
+        'city': summary.get('city') or location['address'].get('city'),
+        'state': summary.get('state') or location['address'].get('state'),
+        'market': market_from_url(community_info.get('url') or '') or location['address'].get('market'),
+    }
+
+    details = community_info['details']
+    bed_range = format_range(summary.get('beds_min'), summary.get('beds_max'))
+    bath_range = format_range(summary.get('baths_min'), summary.get('baths_max'))
+    stories_range = format_range(summary.get('stories_min'), summary.get('stories_max'))
+    if bed_range:
+        details['bed_range'] = bed_range
+    if bath_range:
+        details['bath_range'] = bath_range
+    if stories_range:
+        details['stories_range'] = stories_range
+    if summary.get('sqft_min'):
+        details['sqft_range'] = f"From {summary['sqft_min']:,.0f} Sq. Ft."
+
+    if summary.get('amenities'):
+        community_info['amenities'] = [
+            {'name': extract_amenity_name(text), 'description': text, 'icon_url': None}
+            for text in summary['amenities']
+        ]
+    return community_info
+
 def extract_min_price(soup):
     # Extract minimum price from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        min_price = min(home['price'] for home in available_homes)
+        min_price = min(home.price for home in available_homes)
         return f"${min_price:,}"
     return "$0"
 
@@ -848,7 +713,7 @@ def extract_max_price(soup):
     # Extract maximum price from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        max_price = max(home['price'] for home in available_homes)
+        max_price = max(home.price for home in available_homes)
         return f"${max_price:,}"
     return "$0"
 
@@ -856,124 +721,169 @@ def extract_min_sqft(soup):
     # Extract minimum square footage from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        return min(home['sqft'] for home in available_homes)
+        return min(home.sqft for home in available_homes)
     return 0
 
 def extract_max_sqft(soup):
     # Extract maximum square footage from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        return max(home['sqft'] for home in available_homes)
+        return max(home.sqft for home in available_homes)
     return 0
 
 def extract_min_beds(soup):
     # Extract minimum bedrooms from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        return min(home['beds'] for home in available_homes)
+        return min(home.beds for home in available_homes)
     return 0
 
 def extract_max_beds(soup):
     # Extract maximum bedrooms from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        return max(home['beds'] for home in available_homes)
+        return max(home.beds for home in available_homes)
     return 0
 
 def extract_min_baths(soup):
     # Extract minimum bathrooms from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        return min(home['baths'] for home in available_homes)
+        return min(home.baths for home in available_homes)
     return 0
 
 def extract_max_baths(soup):
     # Extract maximum bathrooms from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        return max(home['baths'] for home in available_homes)
+        return max(home.baths for home in available_homes)
     return 0
 
 def extract_min_stories(soup):
     # Extract minimum stories from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        return min(home['stories'] for home in available_homes)
+        return min(home.stories for home in available_homes)
     return 0
 
 def extract_max_stories(soup):
     # Extract maximum stories from available homes
     available_homes = extract_available_homes(soup)
     if available_homes:
-        return max(home['stories'] for home in available_homes)
+        return max(home.stories for home in available_homes)
     return 0
 
+def render_community_page(url):
+    """渲染社区页面并返回HTML，启用磁盘缓存时优先从缓存回放；被拦截时返回None"""
+    cache = get_page_cache()
+    page_content = cache.get(url, page_type='community') if cache is not None else None
+    if page_content:
+        return page_content
+    limiter = get_rate_limiter()
+    limiter.acquire(url)
+    # 从浏览器池租用实例，拿到页面源码后立即归还，供详情页下载复用
+    with get_pool().lease() as driver:
+        driver.get(url)
+    
+        # 等待房源列表出现，再滚动到页面高度不再变化（DOM和网络静默即返回，不再固定等待）
+        wait_for_page(driver, 'community')
+    
+        # 获取页面内容
+        page_content = driver.page_source
+        if get_resource_blocker() is not None:
+            get_resource_blocker().collect(driver, url)
+    
+    if limiter.record(url, html=page_content):
+        logger.error(f"社区页面被拦截，跳过 {url}")
+        return None
+    if cache is not None:
+        cache.put(url, page_content, page_type='community')
+    return page_content
+
 def fetch_page(url, output_dir):
-    """获取页面内容并生成JSON"""
+    """获取页面内容并生成JSON，成功（包括无需重新抓取）时返回True"""
     # 生成输出文件名
     community_name = url.split('/')[-1].replace('.', '_')
-    output_file = os.path.join(output_dir, f'drhorton_{community_name}.json')
     
-    # 检查文件是否已存在
-    if os.path.exists(output_file):
+    # 检查是否已经抓取过；增量模式下只有指纹变化的社区才重新抓取
+    tracker = get_change_tracker()
+    exists = community_record_exists(url, output_dir)
+    if exists and tracker is None:
         logger.info(f"JSON file already exists for {community_name}, skipping...")
-        return
-
-    chrome_options = Options()
-    chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+        return True
+    
+    # 上次保存的数据损坏或无法读取时当作新社区，不因指纹相同而跳过
+    previous = load_community_record(url, output_dir) if exists else None
+    if exists and previous is None:
+        logger.warning(f"{community_name} 上次保存的数据无法读取，重新抓取")
+        exists = False
+    
+    summary = get_community_summary(url)
+    fingerprint = None
+    if tracker is not None and summary is not None:
+        fingerprint = community_fingerprint(summary)
+        if exists and not tracker.has_changed(url, fingerprint):
+            logger.info(f"{community_name} unchanged since last crawl, skipping...")
+            return True
 
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.implicitly_wait(10)
     global global_url
     global_url=url
+    remembered = False
     try:
         logger.info(f"Processing URL: {url}")
-        driver.get(url)
-        
-        # 等待页面加载
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
+        page_content = render_community_page(url)
+        if not page_content:
+            return False
         
-        # 滚动页面以加载所有内容
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while True:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
+        soup = None
+        if tracker is not None and fingerprint is None:
+            # 没有API数据时，用页面上的房源/户型列表判断是否变化
+            soup = make_soup(page_content)
+            fingerprint = listing_fingerprint(soup)
+            if exists and not tracker.has_changed(url, fingerprint):
+                logger.info(f"{community_name} listings unchanged since last crawl, skipping...")
+                return True
         
-        # 获取页面内容
-        page_content = driver.page_source
+        # 重新抓取已有的社区时，卡片没有变化的homesite/plan沿用上次的详情页数据
+        if exists:
+            tracker.remember(previous)
+            remembered = True
             
         # 提取社区信息
-        soup = BeautifulSoup(page_content, 'html.parser')
-        community_info = extract_community_info(soup)
+        if EXTRACTOR == 'xpath':
+            from extraction_spec import extract_community_info_xpath
+            community_info = extract_community_info_xpath(page_content, url)
+        else:
+            soup = soup or make_soup(page_content)
+            community_info = extract_community_info(soup, url)
+        
+        # Coveo API中有这个社区时，以API字段为准
+        if summary is not None:
+            apply_coveo_summary(community_info, summary)
         
         # 保存提取的数据
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(community_info, f, indent=2, ensure_ascii=False)
+        output_file = save_community_record(url, output_dir, community_info)
+        if tracker is not None:
+            tracker.record(url, fingerprint)
             
         logger.info(f"数据已保存到 {output_file}")
+        return True
         
     except Exception as e:
         logger.error(f"处理URL时出错 {url}: {str(e)}")
         logger.exception("详细错误信息：")
-    
+        return False
     finally:
-        driver.quit()
+        if remembered:
+            tracker.forget(previous)
 
 def extract_community_name(soup):
     """提取社区名称"""
+    page = as_community_page(soup)
+    soup = page.soup
     try:
         # 查找class为community-main-info的div
-        main_info = soup.find('div', class_='community-main-info')
+        main_info = page.main_info
         if main_info:
             # 在main_info中查找h1标签
             h1_tag = main_info.find('h1')
@@ -1001,9 +911,11 @@ def extract_community_name(soup):
 
 def extract_address(soup):
     """提取地址信息"""
+    page = as_community_page(soup)
+    soup = page.soup
     try:
         # 查找class为community-secondary-info的div
-        secondary_info = soup.find('div', class_='community-secondary-info')
+        secondary_info = page.secondary_info
         if secondary_info:
             # 在secondary_info中查找a标签
             address_link = secondary_info.find('a')
@@ -1020,17 +932,13 @@ def extract_address(soup):
 
 def extract_phone(soup):
     """提取联系电话"""
+    soup = soup_of(soup)
     try:
         # 查找包含电话号码的元素
         phone_elem = soup.find(['a', 'span'], href=lambda x: x and 'tel:' in x) or \
                     soup.find(['a', 'span'], class_=lambda x: x and 'phone' in str(x).lower())
         if phone_elem:
-            # 提取数字
-            phone = re.sub(r'[^\d]', '', phone_elem.text)
-            # 格式化电话号码
-            if len(phone) == 10:
-                return f"({phone[:3]}) {phone[3:6]}-{phone[6:]}"
-            return phone_elem.text.strip()
+            return format_phone(phone_elem.text)
         return ""
     except Exception as e:
         logger.error(f"提取电话号码时出错: {str(e)}")
@@ -1039,19 +947,8 @@ def extract_phone(soup):
 def extract_latitude(soup):
     """提取纬度"""
     try:
-        # 查找包含经纬度的元素
-        map_elem = soup.find(['div', 'script'], attrs={'data-lat': True})
-        if map_elem:
-            return float(map_elem['data-lat'])
-        
-        # 尝试从页面内容中查找经纬度
-        scripts = soup.find_all('script')
-        for script in scripts:
-            if script.string:
-                lat_match = re.search(r'latitude["\s:]+(-?\d+\.\d+)', script.string)
-                if lat_match:
-                    return float(lat_match.group(1))
-        return 0
+        # 优先使用带data-lat属性的元素，其次从页面脚本中查找
+        return as_community_page(soup).latitude
     except Exception as e:
         logger.error(f"提取纬度时出错: {str(e)}")
         return 0
@@ -1059,92 +956,34 @@ def extract_latitude(soup):
 def extract_longitude(soup):
     """提取经度"""
     try:
-        # 查找包含经纬度的元素
-        map_elem = soup.find(['div', 'script'], attrs={'data-lng': True})
-        if map_elem:
-            return float(map_elem['data-lng'])
-        
-        # 尝试从页面内容中查找经纬度
-        scripts = soup.find_all('script')
-        for script in scripts:
-            if script.string:
-                lng_match = re.search(r'longitude["\s:]+(-?\d+\.\d+)', script.string)
-                if lng_match:
-                    return float(lng_match.group(1))
-        return 0
+        # 优先使用带data-lng属性的元素，其次从页面脚本中查找
+        return as_community_page(soup).longitude
     except Exception as e:
         logger.error(f"提取经度时出错: {str(e)}")
         return 0
 
 def extract_homesite_page_info(filename):
-    """从homesite页面提取信息"""
+    """从homesite页面文件提取信息"""
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             content = f.read()
             logger.info(f"Successfully read file: {filename}")
-        
-        soup = BeautifulSoup(content, 'html.parser')
-        info = {
-            'plan': None,
-            'images': []
-        }
-        
-        # 提取plan名称 - 从floorplan-link类的a标签
-        floorplan_link = soup.find('a', class_='floorplan-link')
-        if floorplan_link:
-            plan_text = floorplan_link.get_text(strip=True)
-            # 如果文本包含"floorplan"，提取前面的部分
-            if "floorplan" in plan_text:
-                info['plan'] = plan_text.split("floorplan")[0].strip()
-            else:
-                info['plan'] = plan_text.strip()
-            logger.info(f"Extracted plan name: {info['plan']}")
-        
-        # 提取图片 - 从PropertyGallery类下的sevenImages或twoImages类中提取
-        gallery_div = soup.find('div', class_='PropertyGallery')
-        if gallery_div:
-            # 尝试从sevenImages中获取图片
-            seven_images = gallery_div.find('div', class_='sevenImages')
-            if seven_images:
-                for img in seven_images.find_all('img'):
-                    src = img.get('src')
-                    if src:
-                        if src.startswith('//'):
-                            src = 'https:' + src
-                        elif not src.startswith('http'):
-                            src = 'https://www.drhorton.com' + src
-                        info['images'].append(src)
-                        logger.info(f"Found image from sevenImages: {src}")
-            
-            # 尝试从twoImages中获取图片
-            two_images = gallery_div.find('div', class_='twoImages')
-            if two_images:
-                for img in two_images.find_all('img'):
-                    src = img.get('src')
-                    if src:
-                        if src.startswith('//'):
-                            src = 'https:' + src
-                        elif not src.startswith('http'):
-                            src = 'https://www.drhorton.com' + src
-                        info['images'].append(src)
-                        logger.info(f"Found image from twoImages: {src}")
-        
-        return info
     except Exception as e:
-        logger.error(f"提取homesite页面信息出错: {str(e)}")
-        logger.exception("详细错误信息：")
+        logger.error(f"读取homesite页面文件出错: {str(e)}")
         return {'plan': None, 'images': []}
+    return parse_homesite_page_info(content)
 
 def extract_homesite_details(soup):
     """提取房屋详细信息"""
     homesites = []
+    page = as_community_page(soup)
     
     # 获取经纬度
-    latitude = extract_latitude(soup)
-    longitude = extract_longitude(soup)
+    latitude = extract_latitude(page)
+    longitude = extract_longitude(page)
     
     # 先找到available-homes容器
-    available_homes_container = soup.find('div', id='available-homes')
+    available_homes_container = page.available_homes_container
     if not available_homes_container:
         logger.warning("找不到id='available-homes'的容器")
         return homesites
@@ -1163,24 +1002,7 @@ def extract_homesite_details(soup):
     logger.info(f"Found {len(available_homes)} available homes in available-homes container")
     
     for home in available_homes:
-        # 初始化homesite对象
-        homesite = {
-            'images': [],
-            'name': None,
-            'plan': None,
-            'url': None,
-            'id': None,
-            'address': None,
-            'price': None,
-            'beds': None,
-            'baths': None,
-            'sqft': None,
-            'status': None,
-            'image_url': None,
-            'latitude': latitude,
-            'longitude': longitude,
-            'overview': "This beautiful new construction home features an open concept floor plan with modern finishes throughout."
-        }
+        homesite = Homesite(latitude=latitude, longitude=longitude)
         
         try:
             # 提取链接和plan
@@ -1208,7 +1030,7 @@ def extract_homesite_details(soup):
                 # 检查style属性中的背景图片
                 if 'style' in card_image.attrs:
                     style = card_image['style']
-                    url_match = re.search(r'url\(["\']?(.*?)["\']?\)', style)
+                    url_match = STYLE_URL_PATTERN.search(style)
                     if url_match:
                         image_url = url_match.group(1)
                         if image_url.startswith('/-/'):
@@ -1252,32 +1074,13 @@ def extract_homesite_details(soup):
                     if 'Under Contract' in price_text:
                         homesite['status'] = 'Under Contract'
                     else:
-                        price_match = re.search(r'\$[\d,]+', price_text)
+                        price_match = PRICE_PATTERN.search(price_text)
                         if price_match:
                             homesite['price'] = price_match.group(0)
                 
-                # 提取所有p标签的文本内容
-                p_tags = card_content.find_all('p')
-                for p in p_tags:
-                    text = p.get_text(strip=True)
-                    
-                    # 提取beds
-                    if 'Bed' in text:
-                        beds_match = re.search(r'(\d+)\s*Bed', text)
-                        if beds_match:
-                            homesite['beds'] = beds_match.group(1)
-                    
-                    # 提取baths
-                    if 'Bath' in text:
-                        baths_match = re.search(r'(\d+(?:\.\d+)?)\s*Bath', text)
-                        if baths_match:
-                            homesite['baths'] = baths_match.group(1)
-                    
-                    # 提取sqft
-                    if 'Sq. Ft.' in text:
-                        sqft_match = re.search(r'(\d+(?:,\d+)?)\s*Sq\.\s*Ft\.', text)
-                        if sqft_match:
-                            homesite['sqft'] = sqft_match.group(1).replace(',', '')
+                # 提取所有p标签的文本内容，每个p标签只扫描一次
+                for p in card_content.find_all('p'):
+                    apply_homesite_specs(homesite, parse_card_specs(p.get_text(strip=True)))
         
         except Exception as e:
             logger.error(f"Error processing home: {str(e)}")
@@ -1298,136 +1101,45 @@ def process_raw_page(raw_page_path):
         with open(raw_page_path, 'r', encoding='utf-8') as f:
             html_content = f.read()
         
-        # 创建BeautifulSoup对象
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # 创建BeautifulSoup对象，并一次定位所有关键容器
+        soup = make_soup(html_content)
+        page = as_community_page(soup)
         
         # 提取基本信息
-        price_from = extract_price_from(soup)
-        home_details = extract_home_details(soup)
-        stories_range = extract_stories_range(soup)
+        price_from = extract_price_from(page)
+        home_details = extract_home_details(page)
+        stories_range = extract_stories_range(page)
         
         # 提取 homesites
-        homesites = extract_homesite_details(soup)
+        homesites = extract_homesite_details(page)
         
         # 提取 homeplans
-        homeplans = extract_home_plans(soup)
+        homeplans = extract_home_plans(page)
         
-        # 处理每个homeplan的详情页面
-        logger.info(f"Processing {len(homeplans)} homeplan details...")
-        for homeplan in homeplans:
-            if homeplan.get('url'):
-                try:
-                    # 下载homeplan页面
-                    homeplan_page = download_homesite_page(homeplan['url'])
-                    if homeplan_page:
-                        # 从页面提取楼层信息和图片
-                        with open(homeplan_page, 'r', encoding='utf-8') as f:
-                            page_content = f.read()
-                        page_soup = BeautifulSoup(page_content, 'html.parser')
-                        
-                        # 提取楼层信息
-                        property_details = page_soup.find('div', class_='property-details')
-                        if property_details:
-                            story_text = property_details.get_text()
-                            story_match = re.search(r'(\d+(?:\.5)?)\s*Story', story_text)
-                            if story_match:
-                                stories = float(story_match.group(1))
-                                # 创建floorplan_images数组
-                                floorplan_images = []
-                                num_floors = int(stories) if stories.is_integer() else int(stories + 0.5)
-                                for i in range(1, num_floors + 1):
-                                    floorplan_images.append({
-                                        "name": f"{i}st Floor Floorplan" if i == 1 else f"{i}nd Floor Floorplan" if i == 2 else f"{i}rd Floor Floorplan",
-                                        "image_url": None
-                                    })
-                                
-                                # 提取图片URL
-                                content_photos = page_soup.find_all('div', class_='content-photo')
-                                for i, photo in enumerate(content_photos):
-                                    if i < len(floorplan_images):
-                                        img = photo.find('img')
-                                        if img and img.get('src'):
-                                            src = img['src']
-                                            if src.startswith('//'):
-                                                src = 'https:' + src
-                                            elif not src.startswith('http'):
-                                                src = 'https://www.drhorton.com' + src
-                                            floorplan_images[i]['image_url'] = src
-                                
-                                # 添加到homeplan对象
-                                homeplan['floorplan_images'] = floorplan_images
-                                logger.info(f"Added {len(floorplan_images)} floorplan images to homeplan")
-                        
-                        # 删除临时文件
-                        try:
-                            os.remove(homeplan_page)
-                        except:
-                            pass
-                        
-                        # 添加延迟，避免请求过于频繁
-                        time.sleep(random.uniform(2, 5))
-                        
-                except Exception as e:
-                    logger.error(f"Error processing homeplan detail page: {str(e)}")
-                    continue
-        
-        # 处理每个homesite的详情页面
-        logger.info(f"Processing {len(homesites)} homesite details...")
-        for homesite in homesites:
-            if homesite.get('url'):
-                try:
-                    # 下载homesite页面
-                    homesite_page = download_homesite_page(homesite['url'])
-                    if homesite_page:
-                        # 从页面提取plan和images信息
-                        info = extract_homesite_page_info(homesite_page)
-                        if info.get('plan'):
-                            homesite['plan'] = info['plan']
-                            logger.info(f"Updated plan for homesite {homesite.get('address')}: {homesite['plan']}")
-                        if info.get('images'):
-                            homesite['images'] = info['images']
-                            logger.info(f"Updated images for homesite {homesite.get('address')}: {len(info['images'])} images found")
-                        
-                        # 删除临时文件
-                        try:
-                            os.remove(homesite_page)
-                        except:
-                            pass
-                        
-                        # 添加延迟，避免请求过于频繁
-                        time.sleep(random.uniform(2, 5))
-                        
-                except Exception as e:
-                    logger.error(f"Error processing homesite detail page for {homesite.get('address')}: {str(e)}")
+        # extract_home_plans已经处理过每个homeplan的详情页面，这里只处理homesite详情页面
+        apply_homesite_pages(homesites)
         
         # 提取其他信息
-        nearby_places = extract_nearby_places(soup)
-        amenities_list = extract_amenities(soup)
-        nearby_schools = extract_nearby_schools(soup)
+        nearby_places = extract_nearby_places(page)
+        amenities_list = extract_amenities(page)
+        nearby_schools = extract_nearby_schools(page)
         
-        # 更新price_range
-        max_price = None
-        for homesite in homesites:
-            if homesite.get('price'):
-                price_match = re.search(r'\$[\d,]+', str(homesite['price']))
-                if price_match:
-                    current_price = price_match.group(0)
-                    if not max_price or current_price > max_price:
-                        max_price = current_price
+        # 按数值统计房源和户型的价格，得到price_from和price_range
+        price_from, price_range = price_fields(price_from, listing_stats(homesites, homeplans))
         
         # 准备输出数据
         output_data = {
             "timestamp": datetime.now().isoformat(),
-            "name": extract_community_name(soup),
+            "name": extract_community_name(page),
             "status": None,
             "price_from": price_from,
-            "address": extract_address(soup),
-            "phone": extract_phone(soup),
-            "description": extract_description(soup),
-            "images": extract_images(soup),
+            "address": extract_address(page),
+            "phone": extract_phone(page),
+            "description": extract_description(page),
+            "images": extract_images(page),
             "location": {
-                "latitude": extract_latitude(soup),
-                "longitude": extract_longitude(soup),
+                "latitude": extract_latitude(page),
+                "longitude": extract_longitude(page),
                 "address": {
                     "city": None,
                     "state": None,
@@ -1435,12 +1147,12 @@ def process_raw_page(raw_page_path):
                 }
             },
             "details": {
-                "price_range": f"{price_from} - {max_price}" if max_price else price_from,
+                "price_range": price_range,
                 "sqft_range": home_details['sqft_range'],
                 "bed_range": home_details['bed_range'],
                 "bath_range": home_details['bath_range'],
                 "stories_range": stories_range,
-                "community_count": extract_community_count(soup)
+                "community_count": extract_community_count(page)
             },
             "amenities": amenities_list,
             "homeplans": homeplans,
@@ -1459,117 +1171,210 @@ def process_raw_page(raw_page_path):
         # 保存JSON文件
         output_file = os.path.join(os.path.dirname(raw_page_path), 'drhorton_output.json')
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+            json.dump(output_data, f, indent=2, ensure_ascii=False, default=to_json)
+        catalog = get_catalog()
+        if catalog is not None:
+            catalog.add(output_data, url=global_url or os.path.abspath(raw_page_path))
         
         print(f"Successfully processed {raw_page_path} and saved to {output_file}")
+        get_fetch_registry().report()
         
     except Exception as e:
         print(f"Error processing page: {str(e)}")
 
-def download_homesite_page(url):
-    """下载homesite详情页面并保存到临时文件"""
+def collect_detail_urls(soup):
+    """收集社区页面上所有homesite和homeplan详情页的URL"""
+    page = as_community_page(soup)
+    urls = []
+    for homesite in extract_homesite_details(page):
+        if homesite.get('url'):
+            urls.append(homesite['url'])
+    for item in page.toggle_items:
+        if not item.find('h2', class_='pr-case'):
+            continue
+        link_elem = item.find('a', class_='CoveoResultLink')
+        if link_elem and link_elem.get('href'):
+            href = link_elem['href']
+            if not href.startswith('http'):
+                href = 'https://www.drhorton.com' + href
+            urls.append(href)
+    # 保持顺序去重，Coveo已经提供数据的详情页不需要抓取
+    return [url for url in dict.fromkeys(urls) if not covered_by_listing(url)]
+
+def run_batch_concurrently(urls, output_dir, workers):
+    """使用有界线程池并发处理社区URL，支持Ctrl-C中断"""
+    stop_event = threading.Event()
+    total = len(urls)
+    progress = {'done': 0, 'failed': 0}
+    progress_lock = threading.Lock()
+
+    def worker(index, url):
+        if stop_event.is_set():
+            return
+        worker_name = threading.current_thread().name
+        logger.info(f"[{worker_name}] Processing URL {index}/{total}: {url}")
+        try:
+            fetch_page(url, output_dir)
+        except Exception as e:
+            with progress_lock:
+                progress['failed'] += 1
+            logger.error(f"[{worker_name}] Failed to process URL {url}: {str(e)}")
+        finally:
+            with progress_lock:
+                progress['done'] += 1
+                done = progress['done']
+            logger.info(f"[{worker_name}] Finished {url} ({done}/{total} done)")
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='worker')
     try:
-        # 随机延迟开始请求
-        time.sleep(random.uniform(2, 5))
-        
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        
-        # 添加更多的浏览器选项来模拟真实用户
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--disable-infobars')
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # 使用最新的 Chrome User-Agent
-        user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        ]
-        chrome_options.add_argument(f'--user-agent={random.choice(user_agents)}')
+        futures = [executor.submit(worker, i, url) for i, url in enumerate(urls, 1)]
+        for future in as_completed(futures):
+            future.result()
+    except KeyboardInterrupt:
+        # 停止派发新任务，等待正在处理的社区写完后退出
+        logger.warning("收到中断信号，取消排队中的社区并等待正在处理的worker结束...")
+        stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        logger.info(f"并发处理结束: {progress['done']}/{total} 完成, {progress['failed']} 失败")
 
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.implicitly_wait(10)
-        
-        # 修改 navigator.webdriver 属性
-        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-                window.chrome = {
-                    runtime: {}
-                };
-            '''
-        })
-        
-        logger.info(f"Downloading homesite page: {url}")
-        
-        # 随机延迟页面加载前
-        time.sleep(random.uniform(2, 5))
-        
-        driver.get(url)
-        
-        # 等待页面加载，添加随机延迟
-        wait = WebDriverWait(driver, 20)
-        wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        time.sleep(random.uniform(3, 6))
-        
-        # 模拟真实用户行为：随机滚动
-        for _ in range(random.randint(3, 6)):
-            scroll_height = random.randint(300, 800)
-            driver.execute_script(f"window.scrollBy(0, {scroll_height});")
-            time.sleep(random.uniform(0.5, 1.5))
-        
-        # 滚动到页面底部
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(random.uniform(1, 3))
-        
-        # 滚动回页面顶部
-        driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(random.uniform(1, 2))
-        
-        # 获取页面内容
-        page_content = driver.page_source
-        
-        # 保存到临时文件
-        temp_file = f'homesite_page_{int(time.time())}_{random.randint(1000, 9999)}.html'
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(page_content)
-        
-        logger.info(f"Successfully downloaded and saved homesite page to {temp_file}")
-        
-        # 随机延迟结束
-        time.sleep(random.uniform(1, 3))
-        
-        return temp_file
-        
-    except Exception as e:
-        logger.error(f"下载homesite页面时出错 {url}: {str(e)}")
-        # 出错后的更长随机延迟
-        time.sleep(random.uniform(10, 15))
-        return None
-    
+def run_queue(urls, output_dir, workers):
+    """从持久化队列领取社区任务处理，多个进程可以共用同一个队列文件，中断后重新运行即可继续"""
+    queue = get_work_queue()
+    added = queue.enqueue('community', urls)
+    logger.info(f"Queued {added} new communities ({len(urls) - added} already in queue): {queue.counts().get('community', {})}")
+    stop_event = threading.Event()
+
+    def worker():
+        owner = worker_id()
+        while not stop_event.is_set():
+            task = queue.claim('community', owner)
+            if task is None:
+                return
+            logger.info(f"[{owner}] Claimed {task['url']} (attempt {task['attempt']})")
+            # 租约丢失时complete/fail返回False，结果以接手的worker为准
+            try:
+                if fetch_page(task['url'], output_dir):
+                    queue.complete(task)
+                else:
+                    queue.fail(task, 'community page could not be processed')
+            except Exception as e:
+                queue.fail(task, e)
+
+    threads = [threading.Thread(target=worker, name=f'queue-{i}', daemon=True) for i in range(max(workers, 1))]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        # 正在处理的社区写完后退出，未完成的任务在租约过期后可被重新领取
+        logger.warning("收到中断信号，等待正在处理的worker结束，下次运行时从队列继续...")
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+        raise
     finally:
-        if 'driver' in locals():
-            driver.quit()
-            # 处理每个房屋之间的随机延迟
-            time.sleep(random.uniform(5, 10))
+        logger.info(f"队列处理结束: {queue.counts().get('community', {})}")
+
+def load_api_data(args):
+    """加载社区API数据，并批量查询这些社区的房源和户型"""
+    load_community_index(args.communities_file)
+    if not args.no_api_listings:
+        dump = [] if args.dump_listings else None
+        load_listings(community_ids(), homesite_template=args.homesite_template, plan_template=args.plan_template, dump=dump)
+        if dump is not None:
+            save_listing_results(dump, args.dump_listings)
 
 def main():
     """主函数"""
+    # 配置日志（只在作为脚本运行时配置，被其他模块导入时不修改日志设置）
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
     try:
         # 解析命令行参数
         parser = argparse.ArgumentParser(description='Scrape D.R. Horton community pages')
         parser.add_argument('--batch', action='store_true', help='Process all URLs from florida_links.json')
         parser.add_argument('--url', help='Process a single URL')
+        parser.add_argument('--pool-size', type=int, default=1, help='Number of warm Chrome instances kept in the driver pool')
+        parser.add_argument('--max-pages-per-driver', type=int, default=50, help='Recycle a Chrome instance after this many pages')
+        parser.add_argument('--workers', type=int, default=1, help='Number of communities crawled concurrently in --batch mode')
+        parser.add_argument('--initial-rate', type=float, default=0.5, help='Starting requests per second per host')
+        parser.add_argument('--max-rate', type=float, default=2.0, help='Upper bound for requests per second per host')
+        parser.add_argument('--parser', choices=['lxml', 'html.parser'], default=None, help='BeautifulSoup parser backend (default: lxml when installed)')
+        parser.add_argument('--extractor', choices=['soup', 'xpath'], default='soup', help='Extract community pages with BeautifulSoup or the compiled XPath spec')
+        parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Directory of the on-disk page cache')
+        parser.add_argument('--no-page-cache', action='store_true', help='Always render pages instead of replaying them from the disk cache')
+        parser.add_argument('--no-http-fetch', action='store_true', help='Render every homesite/floor-plan page in Chrome instead of trying plain HTTP first')
+        parser.add_argument('--communities-file', default=DEFAULT_COMMUNITIES_FILE, help='Coveo community records written by get_drhorton_api_links.py')
+        parser.add_argument('--no-api', action='store_true', help='Use only fields scraped from the community page')
+        parser.add_argument('--homesite-template', default=HOMESITE_TEMPLATE, help='Coveo template name of homesite documents')
+        parser.add_argument('--plan-template', default=PLAN_TEMPLATE, help='Coveo template name of floor-plan documents')
+        parser.add_argument('--no-api-listings', action='store_true', help='Render homesite/floor-plan pages instead of querying them from Coveo')
+        parser.add_argument('--dump-listings', help='Save the raw Coveo homesite/floor-plan results to this JSON file (to check field names)')
+        parser.add_argument('--incremental', action='store_true', help='Re-crawl existing communities only when their fingerprint changed')
+        parser.add_argument('--state-file', default=DEFAULT_STATE_FILE, help='SQLite file with community fingerprints for --incremental')
+        parser.add_argument('--revalidate', action='store_true', help='Revalidate expired cached pages with ETag/Last-Modified before re-rendering')
+        parser.add_argument('--no-block-resources', action='store_true', help='Let Chrome download images, fonts, media and trackers')
+        parser.add_argument('--block', nargs='+', choices=list(RESOURCE_CATEGORIES), default=list(DEFAULT_CATEGORIES), help='Resource categories blocked in Chrome')
+        parser.add_argument('--block-pattern', action='append', default=[], help='Extra URL pattern to block (CDP wildcard syntax, e.g. "*.css*")')
+        parser.add_argument('--allow-pattern', action='append', default=[], help='Remove a pattern from the block list (e.g. "*.svg*")')
+        parser.add_argument('--store', action='store_true', help='Stream community records to rotating JSONL shards instead of one JSON file per community')
+        parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help='Directory of the --store shards and their URL index')
+        parser.add_argument('--store-compression', choices=COMPRESSIONS, default='none', help='Compression of --store shards')
+        parser.add_argument('--shard-mb', type=int, default=DEFAULT_SHARD_BYTES // 1024 ** 2, help='Start a new shard after this many MB')
+        parser.add_argument('--catalog', nargs='?', const=DEFAULT_CATALOG_FILE, help='Also write communities, plans and homesites to a SQLite catalog (query it with catalog.py)')
+        parser.add_argument('--queue', action='store_true', help='Claim communities from a durable SQLite work queue so interrupted or parallel runs resume')
+        parser.add_argument('--queue-file', default=DEFAULT_QUEUE_FILE, help='SQLite file of the --queue work queue')
+        parser.add_argument('--max-attempts', type=int, default=3, help='Give up on a queued community or detail page after this many attempts')
+        parser.add_argument('--requeue', choices=['failed', 'all'], help='Put failed (or failed and finished) communities back into the queue before starting')
         args = parser.parse_args()
 
+        if args.parser:
+            set_parser_backend(args.parser)
+        global EXTRACTOR
+        EXTRACTOR = args.extractor
+
+        # 磁盘页面缓存，重复运行时直接回放有效期内的页面
+        configure_page_cache(None if args.no_page_cache else args.cache_dir, revalidate=args.revalidate)
+
+        # 持久化任务队列：记录每个社区和详情页的处理状态
+        if args.queue:
+            queue = configure_work_queue(args.queue_file, max_attempts=args.max_attempts)
+            if args.requeue:
+                states = (FAILED,) if args.requeue == 'failed' else (FAILED, DONE)
+                logger.info(f"Requeued {queue.reset('community', states)} communities")
+
+        # 社区数据写入JSONL分片，需要单个文件时用record_store.py --export导出
+        if args.store:
+            configure_record_store(args.store_dir, max_shard_bytes=args.shard_mb * 1024 ** 2,
+                                   compression=args.store_compression)
+
+        # 可查询的SQLite目录，与JSON输出同时写入
+        configure_catalog(args.catalog)
+
+        # 增量模式：记录每个社区的指纹
+        configure_change_tracker(args.state_file if args.incremental else None)
+
+        # 详情页先尝试直接HTTP请求，连接池大小与worker数一致
+        configure_http_fetcher(not args.no_http_fetch, pool_size=max(args.workers, 1) * 2)
+
+        # 浏览器不下载图片、字体、媒体和统计脚本，需在启动浏览器前配置
+        configure_resource_blocker(not args.no_block_resources, categories=args.block,
+                                   block=args.block_pattern, allow=args.allow_pattern)
+
+        # 按主机自适应限速，健康时逐步提速，被限流时减半
+        configure_rate_limiter(initial_rate=args.initial_rate, max_rate=args.max_rate)
+
+        # 初始化浏览器池，所有页面请求共享其中的Chrome实例；每个worker至少有一个浏览器
+        pool_size = max(args.pool_size, args.workers)
+        configure_pool(size=pool_size, max_pages_per_driver=args.max_pages_per_driver)
+
         # 确保输出目录存在
         output_dir = 'data/drhorton'
         os.makedirs(output_dir, exist_ok=True)
@@ -1622,15 +1427,24 @@ def main():
                 
                 logger.info(f"Found {len(urls)} URLs to process")
                 
-                # 处理每个URL
-                for i, url in enumerate(urls, 1):
-                    try:
-                        logger.info(f"Processing URL {i}/{len(urls)}")
-                        fetch_page(url, output_dir)
-                        time.sleep(2)  # 添加延迟以避免请求过于频繁
-                    except Exception as e:
-                        logger.error(f"Failed to process URL {url}: {str(e)}")
-                        continue
+                # 读取get_drhorton_api_links.py同时保存的社区API数据
+                if not args.no_api:
+                    load_api_data(args)
+                
+                if get_work_queue() is not None:
+                    run_queue(urls, output_dir, args.workers)
+                elif args.workers > 1:
+                    # 并发处理社区，每个worker占用池中的一个浏览器
+                    run_batch_concurrently(urls, output_dir, args.workers)
+                else:
+                    # 处理每个URL
+                    for i, url in enumerate(urls, 1):
+                        try:
+                            logger.info(f"Processing URL {i}/{len(urls)}")
+                            fetch_page(url, output_dir)
+                        except Exception as e:
+                            logger.error(f"Failed to process URL {url}: {str(e)}")
+                            continue
                         
             except Exception as e:
                 logger.error(f"Error in batch processing: {str(e)}")
@@ -1639,6 +1453,8 @@ def main():
                 
         elif args.url:
             # 处理单个指定的URL
+            if not args.no_api:
+                load_api_data(args)
             fetch_page(args.url, output_dir)
         else:
             # 处理单个默认URL
@@ -1646,11 +1462,35 @@ def main():
             # default_url = "https://www.drhorton.com/florida/north-florida/st-augustine/cordera-townhomes-express"
             #default_url = "https://www.drhorton.com/alabama/baldwin-county/foley/roberts-cove"
             default_url = "https://www.drhorton.com/georgia/southern-georgia/bainbridge/southgate"
+            if not args.no_api:
+                load_api_data(args)
             fetch_page(default_url, output_dir)
         
+    except KeyboardInterrupt:
+        logger.warning("用户中断，正在关闭浏览器池...")
     except Exception as e:
         logger.error(f"Error in main process: {str(e)}")
         logger.exception("详细错误信息：")
+    finally:
+        logger.info(f"Rate limiter state: {get_rate_limiter().snapshot()}")
+        get_fetch_registry().report()
+        if get_page_cache() is not None:
+            get_page_cache().report()
+        if get_http_fetcher() is not None:
+            get_http_fetcher().report()
+        if get_change_tracker() is not None:
+            get_change_tracker().report()
+        if get_work_queue() is not None:
+            get_work_queue().report()
+        if get_resource_blocker() is not None:
+            get_resource_blocker().report()
+        if get_record_store() is not None:
+            get_record_store().report()
+            get_record_store().close()
+        if get_catalog() is not None:
+            get_catalog().report()
+            get_catalog().close()
+        close_pool()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
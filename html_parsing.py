@@ -0,0 +1,43 @@
+import os
+import logging
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# 解析器后端，可通过环境变量 DRHORTON_PARSER 覆盖（lxml / html.parser）
+PARSER_BACKEND = os.environ.get('DRHORTON_PARSER', 'lxml' if HAS_LXML else 'html.parser')
+
+# 详情页只需要这些容器：楼层信息、平面图、plan名称和图片库
+DETAIL_PAGE_CLASSES = ['property-details', 'content-photo', 'floorplan-link', 'PropertyGallery']
+
+
+def detail_page_strainer():
+    """只保留详情页需要的容器的SoupStrainer"""
+    return SoupStrainer(class_=DETAIL_PAGE_CLASSES)
+
+
+def set_parser_backend(backend):
+    """切换全局解析器后端"""
+    global PARSER_BACKEND
+    if backend == 'lxml' and not HAS_LXML:
+        logger.warning("lxml未安装，继续使用html.parser")
+        backend = 'html.parser'
+    PARSER_BACKEND = backend
+    return PARSER_BACKEND
+
+
+def make_soup(html, parse_only=None, backend=None):
+    """使用配置的解析器后端解析HTML"""
+    return BeautifulSoup(html, backend or PARSER_BACKEND, parse_only=parse_only)
+
+
+def make_detail_soup(html, backend=None):
+    """解析详情页，只构建需要的容器"""
+    return make_soup(html, parse_only=detail_page_strainer(), backend=backend)
@@ -0,0 +1,141 @@
+import re
+import random
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from driver_pool import USER_AGENTS
+from page_cache import page_type_of
+from rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# 详情页解析需要的静态容器，必须全部出现才说明服务器直接返回了可用的页面
+DETAIL_PAGE_CONTAINERS = {
+    'homesite': ('floorplan-link', 'PropertyGallery'),
+    'floorplan': ('property-details',),
+}
+
+# 图片库（sevenImages/twoImages）中第一个</div>之前要有带src的<img>：图片由脚本填充时服务端HTML只有空的容器。
+# 嵌套结构不同的页面会被判为缺少图片，只是多用一次浏览器
+GALLERY_IMAGE_PATTERN = re.compile(
+    r'class\s*=\s*["\'](?:[^"\']*\s)?(?:sevenImages|twoImages)(?:\s[^"\']*)?["\']'
+    r'(?:(?!</div>).)*?<img\b[^>]*?\ssrc\s*=\s*["\']?[^"\'\s>]',
+    re.IGNORECASE | re.DOTALL
+)
+DETAIL_PAGE_CONTENT = {
+    'homesite': GALLERY_IMAGE_PATTERN,
+}
+
+DEFAULT_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+
+def _class_pattern(names):
+    alternatives = '|'.join(re.escape(name) for name in names)
+    return re.compile(r'class\s*=\s*["\'](?:[^"\']*\s)?(?:' + alternatives + r')(?:\s[^"\']*)?["\']', re.IGNORECASE)
+
+
+_CONTAINER_PATTERNS = {page_type: [_class_pattern([name]) for name in names] for page_type, names in DETAIL_PAGE_CONTAINERS.items()}
+for _page_type, _pattern in DETAIL_PAGE_CONTENT.items():
+    _CONTAINER_PATTERNS[_page_type].append(_pattern)
+
+
+def has_expected_containers(html, page_type):
+    """检查HTML中是否有该类型页面解析需要的全部容器（房源页还要求图片库中有图片）；没有定义容器的页面类型总是返回True"""
+    if not html:
+        return False
+    return all(pattern.search(html) for pattern in _CONTAINER_PATTERNS.get(page_type, ()))
+
+
+class HttpFetcher:
+    """用连接池复用的requests.Session直接请求详情页，页面缺少需要的容器时由调用方回退到浏览器"""
+
+    def __init__(self, pool_size=10, timeout=20, retries=2):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.stats = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _session(self):
+        """每个线程一个Session，连接池按主机复用TCP/TLS连接"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            retry = Retry(total=self.retries, backoff_factor=0.5, status_forcelist=(500, 502, 504),
+                          allowed_methods=('GET', 'HEAD'))
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            session.headers['User-Agent'] = random.choice(USER_AGENTS)
+            self._local.session = session
+        return session
+
+    def _count(self, page_type, outcome):
+        with self._lock:
+            counts = self.stats.setdefault(page_type, {'fast': 0, 'fallback': 0, 'blocked': 0, 'errors': 0})
+            counts[outcome] += 1
+
+    def fetch(self, url, page_type=None):
+        """直接请求页面，返回(html, headers)；被拦截、出错或缺少容器时返回(None, None)"""
+        page_type = page_type or page_type_of(url)
+        limiter = get_rate_limiter()
+        limiter.acquire(url)
+        try:
+            response = self._session().get(url, timeout=self.timeout, allow_redirects=True)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"HTTP请求失败，回退到浏览器 {url}: {str(e)}")
+            limiter.record(url, error=True)
+            self._count(page_type, 'errors')
+            return None, None
+
+        html = response.text
+        if limiter.record(url, status=response.status_code, html=html):
+            logger.warning(f"HTTP请求被拦截，回退到浏览器 {url} (status {response.status_code})")
+            self._count(page_type, 'blocked')
+            return None, None
+        if response.status_code != 200:
+            logger.info(f"HTTP请求返回 {response.status_code}，回退到浏览器: {url}")
+            self._count(page_type, 'fallback')
+            return None, None
+        if not has_expected_containers(html, page_type):
+            logger.info(f"HTTP页面缺少需要的容器，回退到浏览器: {url}")
+            self._count(page_type, 'fallback')
+            return None, None
+
+        self._count(page_type, 'fast')
+        logger.info(f"Fetched {page_type} page over HTTP: {url}")
+        return html, response.headers
+
+    def report(self):
+        """输出每种页面类型的直接请求成功率"""
+        with self._lock:
+            stats = {page_type: dict(counts) for page_type, counts in self.stats.items()}
+        for page_type, counts in stats.items():
+            total = sum(counts.values())
+            logger.info(f"HTTP fast path ({page_type}): {counts['fast']}/{total} "
+                        f"({counts['fast'] / total:.0%}) served without a browser, {counts}")
+        return stats
+
+
+_default_fetcher = None
+
+
+def configure_http_fetcher(enabled=True, **kwargs):
+    """启用全局HTTP直连抓取，enabled为False时禁用"""
+    global _default_fetcher
+    _default_fetcher = HttpFetcher(**kwargs) if enabled else None
+    return _default_fetcher
+
+
+def get_http_fetcher():
+    """获取全局HTTP直连抓取器，未启用时返回None"""
+    return _default_fetcher
@@ -0,0 +1,227 @@
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from fetch_registry import normalize_url
+from rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = 'data/cache/pages'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# 不同类型页面的有效期（秒）
+DEFAULT_TTLS = {
+    'community': 24 * 3600,
+    'homesite': 12 * 3600,
+    'floorplan': 7 * 24 * 3600,
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    page_type TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_content_hash ON entries(content_hash);
+'''
+
+
+def page_type_of(url):
+    """根据URL判断页面类型"""
+    path = url.lower()
+    if '/qmis/' in path:
+        return 'homesite'
+    if '/floor-plans/' in path:
+        return 'floorplan'
+    return 'community'
+
+
+class PageCache:
+    """按内容寻址的磁盘页面缓存，支持按页面类型的TTL、LRU淘汰和ETag/Last-Modified重新验证"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttls=None, revalidate=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.revalidate = revalidate
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'revalidated': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+        self._session = requests.Session() if revalidate else None
+
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), timeout=30, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.cache_dir, 'objects', content_hash[:2], content_hash + '.html.gz')
+
+    def get(self, url, page_type=None):
+        """读取缓存的页面，不存在或已过期且无法重新验证时返回None"""
+        key = normalize_url(url)
+        page_type = page_type or page_type_of(url)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT content_hash, fetched_at, etag, last_modified FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+
+        content_hash, fetched_at, etag, last_modified = row
+        now = time.time()
+        if now - fetched_at > self.ttls.get(page_type, DEFAULT_TTLS['community']):
+            if not (self.revalidate and (etag or last_modified) and self._not_modified(url, etag, last_modified)):
+                self._count('expired')
+                return None
+            with self._lock:
+                self.stats['revalidated'] += 1
+                self._db.execute('UPDATE entries SET fetched_at = ? WHERE key = ?', (now, key))
+                self._db.commit()
+
+        try:
+            with gzip.open(self._blob_path(content_hash), 'rt', encoding='utf-8') as f:
+                content = f.read()
+        except OSError:
+            # 索引存在但内容文件丢失，当作未命中
+            self._count('misses')
+            return None
+
+        with self._lock:
+            self.stats['hits'] += 1
+            self._db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self._db.commit()
+        logger.info(f"Disk cache hit: {url}")
+        return content
+
+    def put(self, url, content, page_type=None, headers=None):
+        """写入页面，headers为取得该页面的响应头，其中的ETag/Last-Modified保存用于重新验证（不再另外发送HEAD请求）"""
+        if not content:
+            return
+        key = normalize_url(url)
+        page_type = page_type or page_type_of(url)
+        headers = CaseInsensitiveDict(headers or {})
+
+        data = content.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(content_hash)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp_path, blob_path)
+        size = os.path.getsize(blob_path)
+
+        now = time.time()
+        with self._lock:
+            old = self._db.execute('SELECT content_hash FROM entries WHERE key = ?', (key,)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, page_type, content_hash, size, now, now,
+                 headers.get('ETag'), headers.get('Last-Modified'))
+            )
+            self._db.commit()
+            if old and old[0] != content_hash:
+                self._remove_blob_if_unused(old[0])
+        self._evict()
+
+    def _remove_blob_if_unused(self, content_hash):
+        """内容文件没有被任何条目引用时删除（调用方持有锁）"""
+        in_use = self._db.execute('SELECT 1 FROM entries WHERE content_hash = ? LIMIT 1', (content_hash,)).fetchone()
+        if not in_use:
+            try:
+                os.remove(self._blob_path(content_hash))
+            except OSError:
+                pass
+
+    def _evict(self):
+        """总大小超过上限时按最近访问时间淘汰"""
+        with self._lock:
+            total = self._db.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT content_hash, size FROM entries)'
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self._db.execute('SELECT key, content_hash, size FROM entries ORDER BY last_access').fetchall()
+            for key, content_hash, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                in_use = self._db.execute('SELECT 1 FROM entries WHERE content_hash = ? LIMIT 1', (content_hash,)).fetchone()
+                if not in_use:
+                    total -= size
+                    try:
+                        os.remove(self._blob_path(content_hash))
+                    except OSError:
+                        pass
+                self.stats['evicted'] += 1
+            self._db.commit()
+
+    def _not_modified(self, url, etag, last_modified):
+        """发送条件请求（与其他请求共用全局限速器），服务器返回304时说明缓存仍然有效"""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        limiter = get_rate_limiter()
+        limiter.acquire(url)
+        try:
+            response = self._session.get(url, headers=headers, allow_redirects=True, timeout=15, stream=True)
+            response.close()
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"重新验证缓存失败 {url}: {str(e)}")
+            limiter.record(url, error=True)
+            return False
+        if limiter.record(url, status=response.status_code):
+            logger.warning(f"重新验证缓存被拦截 {url} (status {response.status_code})")
+            return False
+        return response.status_code == 304
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def report(self):
+        """输出缓存统计"""
+        with self._lock:
+            stats = dict(self.stats)
+        logger.info(f"Disk page cache ({self.cache_dir}): {stats}")
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_cache = None
+
+
+def configure_page_cache(cache_dir=DEFAULT_CACHE_DIR, **kwargs):
+    """启用全局磁盘缓存，cache_dir为None时禁用"""
+    global _default_cache
+    if _default_cache is not None:
+        _default_cache.close()
+    _default_cache = PageCache(cache_dir, **kwargs) if cache_dir else None
+    return _default_cache
+
+
+def get_page_cache():
+    """获取全局磁盘缓存，未启用时返回None"""
+    return _default_cache
@@ -0,0 +1,122 @@
+import logging
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from http_fetcher import DETAIL_PAGE_CONTAINERS
+
+logger = logging.getLogger(__name__)
+
+# 页面就绪条件：required中的选择器全部出现，且any_of中至少出现一个
+READY_SELECTORS = {
+    'community': {
+        'required': ('.community-secondary-info',),
+        # 房源卡片由Coveo在客户端渲染，#relatedmovein和footer在服务端HTML中已存在，不能作为就绪条件；
+        # 没有房源的社区等到超时为止
+        'any_of': ('#available-homes .toggle-item',),
+    },
+    'homesite': {'required': (), 'any_of': tuple('.' + name for name in DETAIL_PAGE_CONTAINERS['homesite'])},
+    'floorplan': {'required': (), 'any_of': tuple('.' + name for name in DETAIL_PAGE_CONTAINERS['floorplan'])},
+}
+
+# 各阶段的硬超时（秒），以及判断页面已稳定所需的静默时间
+READY_TIMEOUT = 20
+SETTLE_TIMEOUT = 10
+QUIET_MS = 500
+MAX_SCROLL_ROUNDS = 5
+POLL_FREQUENCY = 0.1
+
+READY_SCRIPT = '''
+    const [required, anyOf] = arguments;
+    if (document.readyState === 'loading') return false;
+    if (!required.every(selector => document.querySelector(selector) !== null)) return false;
+    return anyOf.length === 0 || anyOf.some(selector => document.querySelector(selector) !== null);
+'''
+
+# DOM没有变化、没有新加载的资源且没有进行中的请求（见driver_pool.NETWORK_TRACKER_SCRIPT）持续quietMs后返回true，超过maxMs返回false
+SETTLE_SCRIPT = '''
+    const [quietMs, maxMs, done] = arguments;
+    let timer = null;
+    let observer = null;
+    const finish = (settled) => {
+        clearTimeout(timer);
+        clearTimeout(hardTimeout);
+        mutations.disconnect();
+        if (observer) observer.disconnect();
+        done(settled);
+    };
+    const arm = () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => (window.__pendingRequests || 0) > 0 ? arm() : finish(true), quietMs);
+    };
+    const mutations = new MutationObserver(arm);
+    mutations.observe(document.documentElement, {childList: true, subtree: true});
+    try {
+        observer = new PerformanceObserver(arm);
+        observer.observe({type: 'resource'});
+    } catch (e) {}
+    const hardTimeout = setTimeout(() => finish(false), maxMs);
+    arm();
+'''
+
+
+def wait_until_ready(driver, page_type, timeout=READY_TIMEOUT):
+    """等待页面类型对应的数据容器出现，超时返回False（调用方继续使用已有的DOM）"""
+    spec = READY_SELECTORS.get(page_type, {'required': (), 'any_of': ()})
+    started = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+            lambda d: d.execute_script(READY_SCRIPT, list(spec['required']), list(spec['any_of']))
+        )
+    except TimeoutException:
+        logger.warning(f"{page_type}页面在{timeout}秒内未出现需要的容器，使用当前内容: {driver.current_url}")
+        return False
+    logger.debug(f"{page_type} page ready in {time.monotonic() - started:.2f}s")
+    return True
+
+
+def wait_until_settled(driver, quiet_ms=QUIET_MS, timeout=SETTLE_TIMEOUT):
+    """等待DOM和网络静默，返回是否在超时前稳定"""
+    driver.set_script_timeout(timeout + 5)
+    try:
+        return bool(driver.execute_async_script(SETTLE_SCRIPT, quiet_ms, int(timeout * 1000)))
+    except WebDriverException as e:
+        logger.warning(f"等待页面稳定时出错: {str(e)}")
+        return False
+
+
+def scroll_until_settled(driver, max_rounds=MAX_SCROLL_ROUNDS, quiet_ms=QUIET_MS, timeout=SETTLE_TIMEOUT):
+    """滚动到底部触发懒加载，页面稳定后高度不再变化即结束；返回滚动轮数"""
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    for rounds in range(1, max_rounds + 1):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        wait_until_settled(driver, quiet_ms=quiet_ms, timeout=timeout)
+        new_height = driver.execute_script("return document.body.scrollHeight")
+        if new_height == last_height:
+            return rounds
+        last_height = new_height
+    return max_rounds
+
+
+def wait_for_page(driver, page_type, max_scroll_rounds=MAX_SCROLL_ROUNDS):
+    """页面就绪后再滚动触发懒加载，替代固定的sleep"""
+    started = time.monotonic()
+    ready = wait_until_ready(driver, page_type)
+    rounds = scroll_until_settled(driver, max_rounds=max_scroll_rounds) if max_scroll_rounds else 0
+    logger.info(f"{page_type} page {'ready' if ready else 'timed out'} after {time.monotonic() - started:.1f}s "
+                f"({rounds} scroll rounds)")
+    return ready
+
+
+def ready_condition(page_types, timeout=READY_TIMEOUT):
+    """crawl4ai的wait_for条件：任一页面类型的就绪条件成立（与wait_until_ready相同）；
+    超过timeout秒（从导航开始计时）仍未出现时返回true，使用当前内容"""
+    conditions = []
+    for page_type in page_types:
+        spec = READY_SELECTORS[page_type]
+        checks = [f"document.querySelector({selector!r}) !== null" for selector in spec['required']]
+        if spec['any_of']:
+            checks.append(f"document.querySelector({', '.join(spec['any_of'])!r}) !== null")
+        conditions.append(f"({' && '.join(checks) or 'true'})")
+    return f"js:() => {' || '.join(conditions)} || performance.now() > {int(timeout * 1000)}"
@@ -0,0 +1,111 @@
+import sys
+import json
+import argparse
+
+import numpy as np
+
+from records import Record
+from spec_parsing import first_number, leading_int, price_to_dollars
+
+# 统计的数值字段：字段名 -> 文本解析函数（Record直接读取已解析的属性，不再解析文本）
+STAT_FIELDS = {
+    'price': price_to_dollars,
+    'sqft': first_number,
+    'beds': leading_int,
+}
+PERCENTILES = (25, 50, 75)
+SOURCES = ('homesites', 'homeplans')
+
+
+def _row(record, detail=False):
+    if detail:
+        record = record.get('details') or {}
+    if isinstance(record, Record):
+        return tuple(getattr(record, field) for field in STAT_FIELDS)
+    values = (record.get(field) for field in STAT_FIELDS)
+    return tuple(parse(value) if value is not None else None for value, parse in zip(values, STAT_FIELDS.values()))
+
+
+def _matrix(records, detail=False):
+    """把记录的各统计字段放入一个(记录数, 字段数)的float矩阵，缺失值(None)为NaN；detail为True时读取户型的details"""
+    if not records:
+        return np.empty((0, len(STAT_FIELDS)))
+    return np.array([_row(record, detail) for record in records], dtype=float)
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def _describe(matrix):
+    """对矩阵排序一次，得到每一列的count/min/max/分位数（线性插值，与numpy.percentile一致），没有有效值的列为None"""
+    counts = np.count_nonzero(~np.isnan(matrix), axis=0)
+    stats = {field: None for field in STAT_FIELDS}
+    present = np.flatnonzero(counts)
+    if not len(present):
+        return stats
+    # NaN排在每列末尾，第k个有效值即ordered[k]
+    ordered = np.sort(matrix[:, present], axis=0)
+    n = counts[present]
+    columns = np.arange(len(present))
+    positions = np.outer(np.array(PERCENTILES) / 100, n - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.ceil(positions).astype(int)
+    quantiles = ordered[lower, columns] + (ordered[upper, columns] - ordered[lower, columns]) * (positions - lower)
+    lows = ordered[0]
+    highs = ordered[n - 1, columns]
+    fields = list(STAT_FIELDS)
+    for index, column in enumerate(present):
+        entry = {'count': int(n[index]), 'min': _number(lows[index]), 'max': _number(highs[index])}
+        for percentile, quantile in zip(PERCENTILES, quantiles[:, index]):
+            entry['median' if percentile == 50 else f'p{percentile}'] = _number(quantile)
+        stats[fields[column]] = entry
+    return stats
+
+
+def listing_stats(homesites, homeplans=()):
+    """统计房源和户型的价格、面积、卧室数：每个来源一个数值矩阵，价格等文本只解析一次（Homesite/HomePlan直接读取数值属性）。
+    返回{'homesites': {字段: 统计或None}, 'homeplans': {...}, 'all': {...}}，统计包含count/min/max/median/p25/p75"""
+    site_matrix = _matrix(homesites)
+    plan_matrix = _matrix(homeplans, detail=True)
+    return {
+        'homesites': _describe(site_matrix),
+        'homeplans': _describe(plan_matrix),
+        'all': _describe(np.vstack([site_matrix, plan_matrix])),
+    }
+
+
+def format_price_fields(price_from, lowest=None, highest=None):
+    """由页面上的起始价格、最低价（房源和户型）和可售房源的最高价得到(price_from, price_range)；
+    页面没有起始价格（"$0"）时用最低价。process_drhorton_json的price_range阶段使用同一规则"""
+    if not price_to_dollars(price_from) and lowest:
+        price_from = f"${lowest:,}"
+    if not highest:
+        return price_from, price_from
+    return price_from, f"{price_from} - ${highest:,}"
+
+
+def price_fields(price_from, stats):
+    """由页面上的起始价格和listing_stats的结果得到(price_from, price_range)：
+    上限为可售房源的最高价（按数值比较），页面没有起始价格时用房源和户型的最低价"""
+    lowest = stats['all']['price']
+    highest = stats['homesites']['price']
+    return format_price_fields(price_from, lowest and lowest['min'], highest and highest['max'])
+
+
+def main():
+    """输出社区JSON文件中房源和户型的价格、面积、卧室数统计"""
+    parser = argparse.ArgumentParser(description='Price/sqft/beds statistics of community records')
+    parser.add_argument('files', nargs='+', help='Community JSON files (e.g. data/drhorton/drhorton_southgate.json)')
+    args = parser.parse_args()
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        stats = listing_stats(record.get('homesites') or [], record.get('homeplans') or [])
+        price_from, price_range = price_fields(record.get('price_from'), stats)
+        print(json.dumps({'file': path, 'price_from': price_from, 'price_range': price_range, **stats},
+                         ensure_ascii=False, indent=2), file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 import os
 import json
+import time
+import hashlib
 import logging
+import argparse
 import re
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from derivations import STAGES, default_stages, derive, derive_records
+from record_store import DEFAULT_STORE_DIR, RecordStore
+from columnar_export import DEFAULT_EXPORT_DIR, FORMATS, export_directory, export_store
 
 # 配置日志
 logging.basicConfig(
@@ -10,116 +18,267 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DATA_DIR = 'data/drhorton'
+MANIFEST_FILE = '.process_manifest.json'
+# 处理逻辑变化时修改版本号，清单中的记录随之失效
+PIPELINE_VERSION = 4
+# 数据目录中不是社区记录的JSON文件
+EXCLUDED_FILES = {'everbe.json', 'florida_links.json', 'florida_communities.json', MANIFEST_FILE}
+# get_drhorton_api_links.py按查询范围命名的输出（例如nationwide_links.json、fl_ga_communities.json）
+DISCOVERY_SUFFIXES = ('_links.json', '_communities.json')
+
+def is_community_file(name):
+    """数据目录中的社区记录文件（drhorton_<name>.json）"""
+    if not name.endswith('.json') or name in EXCLUDED_FILES:
+        return False
+    return name.startswith('drhorton_') or not name.endswith(DISCOVERY_SUFFIXES)
+
 def should_delete_file(data):
     """检查文件是否应该被删除（homeplans和homesites都为空）"""
     homeplans_empty = not data.get('homeplans', [])
     homesites_empty = not data.get('homesites', [])
     return homeplans_empty and homesites_empty
 
-def get_beds_from_homeplans(homeplans):
-    """从homeplans中提取beds值"""
-    beds_values = []
-    for plan in homeplans:
-        if 'details' in plan and plan['details'].get('beds'):
-            try:
-                # 处理可能的格式："3 bd" 或 "3"
-                beds_str = str(plan['details']['beds']).split()[0]  # 取第一个词，去掉可能的"bd"
-                beds = int(beds_str)
-                beds_values.append(beds)
-            except (ValueError, TypeError, IndexError):
-                continue
-    return beds_values
-
-def process_json_file(file_path):
-    """处理单个JSON文件"""
+def atomic_write_json(file_path, data):
+    """先写临时文件再替换，中断时不会留下写了一半的文件"""
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def file_signature(file_path, content=None):
+    """文件的(mtime_ns, size, sha1)，用于判断文件自上次处理后是否被修改"""
+    stat = os.stat(file_path)
+    if content is None:
+        with open(file_path, 'rb') as f:
+            content = f.read()
+    return [stat.st_mtime_ns, stat.st_size, hashlib.sha1(content).hexdigest()]
+
+def process_json_file(file_path, stages=None):
+    """处理单个JSON文件，返回(结果, 处理后的文件签名)；结果为deleted/rewritten/unchanged/ignored/error"""
+    try:
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        data = json.loads(content)
+        if not isinstance(data, dict):
+            return 'ignored', file_signature(file_path, content)
             
         # 检查是否应该删除文件
         if should_delete_file(data):
             os.remove(file_path)
             logger.info(f"删除空数据文件: {file_path}")
-            return
+            return 'deleted', None
             
-        # 检查必要的字段是否存在
         if 'details' not in data:
             logger.warning(f"文件 {file_path} 缺少必要的字段")
-            return
-            
-        # 获取所有有效的beds值（从homesites）
-        beds_values = []
-        if 'homesites' in data:
-            for homesite in data['homesites']:
-                if homesite.get('beds'):
-                    try:
-                        beds = int(str(homesite['beds']).split()[0])  # 处理可能的"3 bd"格式
-                        beds_values.append(beds)
-                    except (ValueError, TypeError, IndexError):
-                        continue
-        
-        # 如果homesites中没有有效的beds值，尝试从homeplans获取
-        if not beds_values and 'homeplans' in data:
-            beds_values = get_beds_from_homeplans(data['homeplans'])
-        
-        if not beds_values:
-            logger.warning(f"文件 {file_path} 在homesites和homeplans中都没有有效的beds值")
-            return
-            
-        # 计算最小值和最大值
-        min_beds = min(beds_values)
-        max_beds = max(beds_values)
-        
-        # 更新bed_range
-        if min_beds == max_beds:
-            data['details']['bed_range'] = f"{max_beds} bd"
-        else:
-            data['details']['bed_range'] = f"{min_beds} - {max_beds} bd"
+            return 'unchanged', file_signature(file_path, content)
+
+        # 派生字段都没有变化时不重写文件
+        if not derive(data, stages):
+            return 'unchanged', file_signature(file_path, content)
             
         # 保存更新后的文件
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-            
-        logger.info(f"成功更新文件 {file_path}, bed_range: {data['details']['bed_range']}")
+        atomic_write_json(file_path, data)
+        logger.info(f"成功更新文件 {file_path}, bed_range: {data['details'].get('bed_range')}")
+        return 'rewritten', file_signature(file_path)
         
     except Exception as e:
         logger.error(f"处理文件 {file_path} 时出错: {str(e)}")
+        return 'error', None
+
+def process_batch(paths, stages=None):
+    """批量模式：读取全部文件后用pandas一次计算所有社区的派生字段，返回与process_json_file相同的结果列表"""
+    results = [None] * len(paths)
+    loaded = []
+    for index, file_path in enumerate(paths):
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            data = json.loads(content)
+            if not isinstance(data, dict):
+                results[index] = ('ignored', file_signature(file_path, content))
+            elif should_delete_file(data):
+                os.remove(file_path)
+                logger.info(f"删除空数据文件: {file_path}")
+                results[index] = ('deleted', None)
+            elif 'details' not in data:
+                logger.warning(f"文件 {file_path} 缺少必要的字段")
+                results[index] = ('unchanged', file_signature(file_path, content))
+            else:
+                loaded.append((index, file_path, content, data))
+        except Exception as e:
+            logger.error(f"处理文件 {file_path} 时出错: {str(e)}")
+            results[index] = ('error', None)
+
+    changed = derive_records([data for *_, data in loaded], stages, batch=True)
+    for (index, file_path, content, data), is_changed in zip(loaded, changed):
+        try:
+            if is_changed:
+                atomic_write_json(file_path, data)
+                results[index] = ('rewritten', file_signature(file_path))
+            else:
+                results[index] = ('unchanged', file_signature(file_path, content))
+        except Exception as e:
+            logger.error(f"处理文件 {file_path} 时出错: {str(e)}")
+            results[index] = ('error', None)
+    return results
+
+def load_manifest(data_dir, stages):
+    """读取上次处理后每个文件的签名"""
+    path = os.path.join(data_dir, MANIFEST_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # 启用的派生阶段不同时，之前跳过的文件也需要重新计算
+    if manifest.get('version') != PIPELINE_VERSION or manifest.get('stages') != sorted(stages):
+        return {}
+    return manifest.get('files', {})
+
+def save_manifest(data_dir, files, stages):
+    atomic_write_json(os.path.join(data_dir, MANIFEST_FILE),
+                      {'version': PIPELINE_VERSION, 'stages': sorted(stages), 'files': files})
+
+def is_unchanged(file_path, signature):
+    """文件的mtime和大小与清单一致时视为未修改；mtime变了但内容哈希相同也视为未修改"""
+    if not signature:
+        return False
+    stat = os.stat(file_path)
+    if [stat.st_mtime_ns, stat.st_size] == signature[:2]:
+        return True
+    if stat.st_size != signature[1]:
+        return False
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest() == signature[2]
+
+def process_directory(data_dir=DATA_DIR, workers=None, full=False, stages=None, batch=False):
+    """处理目录中的社区JSON文件：跳过清单中未修改的文件，其余文件用进程池并行处理；batch为True时用pandas批量计算"""
+    started = time.monotonic()
+    stages = list(stages or default_stages())
+    json_files = sorted(f for f in os.listdir(data_dir) if is_community_file(f))
+    manifest = {} if full else load_manifest(data_dir, stages)
+    counts = {'scanned': len(json_files), 'skipped': 0, 'rewritten': 0, 'unchanged': 0, 'deleted': 0, 'ignored': 0, 'error': 0}
+
+    files = {}
+    pending = []
+    for json_file in json_files:
+        signature = manifest.get(json_file)
+        if is_unchanged(os.path.join(data_dir, json_file), signature):
+            files[json_file] = signature
+            counts['skipped'] += 1
+        else:
+            pending.append(json_file)
+
+    paths = [os.path.join(data_dir, json_file) for json_file in pending]
+    process = partial(process_json_file, stages=stages)
+    if batch:
+        _collect(pending, process_batch(paths, stages), files, counts)
+    elif workers == 1 or len(paths) < 2:
+        results = map(process, paths)
+        _collect(pending, results, files, counts)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(process, paths, chunksize=max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4)))
+            _collect(pending, results, files, counts)
+
+    save_manifest(data_dir, files, stages)
+    elapsed = time.monotonic() - started
+    counts['seconds'] = round(elapsed, 3)
+    counts['files_per_second'] = round(counts['scanned'] / elapsed, 1) if elapsed > 0 else None
+    return counts
+
+def _collect(names, results, files, counts):
+    for json_file, (outcome, signature) in zip(names, results):
+        counts[outcome] += 1
+        if signature is not None:
+            files[json_file] = signature
+
+def process_store(store_dir, stages=None, batch_size=None):
+    """顺序读取JSONL分片存储中的社区记录，更新后追加新版本，空记录从索引中删除；
+    batch_size不为空时每batch_size条记录用pandas批量计算一次"""
+    store = RecordStore(store_dir)
+    counts = {'records': 0, 'updated': 0, 'deleted': 0}
+    chunk = []
+
+    def flush():
+        for (url, data), changed in zip(chunk, derive_records([data for _, data in chunk], stages, batch=True)):
+            if changed:
+                store.put(url, data)
+                counts['updated'] += 1
+        chunk.clear()
+
+    try:
+        # iter_records开始时取得索引快照，处理过程中追加的新版本不会被再次读取
+        for url, data in store.iter_records():
+            counts['records'] += 1
+            try:
+                if should_delete_file(data):
+                    store.delete(url)
+                    counts['deleted'] += 1
+                    logger.info(f"删除空数据记录: {url}")
+                elif batch_size:
+                    chunk.append((url, data))
+                    if len(chunk) >= batch_size:
+                        flush()
+                elif derive(data, stages):
+                    store.put(url, data)
+                    counts['updated'] += 1
+            except Exception as e:
+                logger.error(f"处理记录 {url} 时出错: {str(e)}")
+        if chunk:
+            flush()
+    finally:
+        store.close()
+    logger.info(f"处理完成：{counts}")
+    return counts
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='Post-process scraped D.R. Horton community records')
+    parser.add_argument('--store', nargs='?', const=DEFAULT_STORE_DIR, help='Process the JSONL shard store instead of data/drhorton/*.json')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='Directory of drhorton_*.json files')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count, 1 = serial)')
+    parser.add_argument('--full', action='store_true', help='Ignore the manifest and process every file')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=None,
+                        help='Derivation stages to run (default: all except stories_range)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Compute the derived fields for all pending records at once with pandas')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Records per pandas batch with --store --batch')
+    parser.add_argument('--export-columnar', nargs='?', const=DEFAULT_EXPORT_DIR, metavar='DIR',
+                        help='After processing, export typed columnar tables to DIR (see columnar_export.py)')
+    parser.add_argument('--columnar-format', choices=FORMATS, default='auto')
+    args = parser.parse_args()
+    if args.store:
+        process_store(args.store, stages=args.stages, batch_size=args.batch_size if args.batch else None)
+        if args.export_columnar:
+            export_store(args.store, args.export_columnar, args.columnar_format)
+        return
     try:
-        # 指定数据目录
-        data_dir = 'data/drhorton'
-        
         # 确保目录存在
-        if not os.path.exists(data_dir):
-            logger.error(f"目录 {data_dir} 不存在")
+        if not os.path.exists(args.data_dir):
+            logger.error(f"目录 {args.data_dir} 不存在")
             return
             
-        # 获取所有JSON文件
-        json_files = [f for f in os.listdir(data_dir) if f.endswith('.json') 
-                     and f not in ['everbe.json', 'florida_links.json']]
-        
-        if not json_files:
-            logger.warning(f"在 {data_dir} 中没有找到需要处理的JSON文件")
+        counts = process_directory(args.data_dir, workers=args.workers, full=args.full, stages=args.stages, batch=args.batch)
+        if not counts['scanned']:
+            logger.warning(f"在 {args.data_dir} 中没有找到需要处理的JSON文件")
             return
-            
-        # 记录初始文件数
-        initial_file_count = len(json_files)
-        
-        # 处理每个文件
-        for json_file in json_files:
-            file_path = os.path.join(data_dir, json_file)
-            process_json_file(file_path)
-            
-        # 重新计算剩余文件数
-        remaining_files = len([f for f in os.listdir(data_dir) if f.endswith('.json') 
-                             and f not in ['everbe.json', 'florida_links.json']])
         
         logger.info(f"处理完成：")
-        logger.info(f"- 初始文件数: {initial_file_count}")
-        logger.info(f"- 删除空文件数: {initial_file_count - remaining_files}")
-        logger.info(f"- 剩余文件数: {remaining_files}")
+        logger.info(f"- 扫描文件数: {counts['scanned']}")
+        logger.info(f"- 未修改跳过: {counts['skipped']}")
+        logger.info(f"- 重写文件数: {counts['rewritten']} (无变化 {counts['unchanged']})")
+        logger.info(f"- 删除空文件数: {counts['deleted']}")
+        if counts['ignored'] or counts['error']:
+            logger.info(f"- 非社区文件: {counts['ignored']}, 出错: {counts['error']}")
+        logger.info(f"- 耗时 {counts['seconds']}s, {counts['files_per_second']} files/s")
+        if args.export_columnar:
+            export_directory(args.data_dir, args.export_columnar, args.columnar_format)
         
     except Exception as e:
         logger.error(f"处理过程中出错: {str(e)}")
@@ -0,0 +1,150 @@
+import re
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# 服务器拒绝或限流时返回的状态码
+BLOCKED_STATUS_CODES = {403, 429, 503}
+
+# 反爬/验证页面的标题特征（正常页面里也会出现turnstile表单控件，所以只看标题）
+BLOCKED_TITLE_PATTERN = re.compile(
+    r'<title>\s*(?:Just a moment|Attention Required|Access Denied|Too Many Requests|403 Forbidden|Request unsuccessful)',
+    re.IGNORECASE
+)
+
+
+def is_blocked_page(html):
+    """判断页面是否是验证码/拒绝访问页面"""
+    if not html:
+        return False
+    return bool(BLOCKED_TITLE_PATTERN.search(html[:20000]))
+
+
+def host_of(url):
+    """获取URL的主机名，已经是主机名时原样返回"""
+    return urlparse(url).netloc or url
+
+
+class _HostBucket:
+    """单个主机的令牌桶状态"""
+
+    __slots__ = ('rate', 'tokens', 'updated', 'successes', 'blocks', 'errors')
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.successes = 0
+        self.blocks = 0
+        self.errors = 0
+
+
+class AdaptiveRateLimiter:
+    """按主机划分的令牌桶限速器，使用AIMD根据服务器响应调整速率（请求/秒）"""
+
+    def __init__(self, initial_rate=0.5, min_rate=0.02, max_rate=2.0, burst=1,
+                 increase=0.05, decrease=0.5, jitter=0.2):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.jitter = jitter
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = _HostBucket(self.initial_rate, self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    def reserve(self, url):
+        """预留一个令牌，返回需要等待的秒数（不阻塞）"""
+        host = host_of(url)
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            # 令牌可以透支为负数，表示排在前面的请求
+            bucket.tokens -= 1
+            if bucket.tokens >= 0:
+                return 0.0
+            wait = -bucket.tokens / bucket.rate
+        # 加一点抖动，避免多个worker同时发出请求
+        return wait * (1 + random.uniform(0, self.jitter))
+
+    def acquire(self, url):
+        """阻塞直到该主机允许发出下一个请求，返回实际等待的秒数"""
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record(self, url, status=None, html=None, error=False):
+        """根据响应结果调整速率，返回该响应是否被判定为限流/拦截"""
+        host = host_of(url)
+        blocked = (status in BLOCKED_STATUS_CODES) or is_blocked_page(html)
+        with self._lock:
+            bucket = self._bucket(host)
+            old_rate = bucket.rate
+            if blocked:
+                bucket.blocks += 1
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                # 清空已积累的令牌，让下一个请求至少等待一个完整间隔
+                bucket.tokens = min(bucket.tokens, 0)
+            elif error:
+                bucket.errors += 1
+                bucket.rate = max(self.min_rate, bucket.rate * (1 + self.decrease) / 2)
+            else:
+                bucket.successes += 1
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+            new_rate = bucket.rate
+
+        if blocked:
+            logger.warning(f"{host} 返回限流/验证页面，速率 {old_rate:.3f} -> {new_rate:.3f} req/s")
+        elif error:
+            logger.info(f"{host} 请求出错，速率 {old_rate:.3f} -> {new_rate:.3f} req/s")
+        return blocked
+
+    def current_rate(self, url):
+        """返回主机当前允许的速率（请求/秒）"""
+        host = host_of(url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            return bucket.rate if bucket else self.initial_rate
+
+    def snapshot(self):
+        """返回所有主机的速率和计数"""
+        with self._lock:
+            return {
+                host: {
+                    'rate': round(bucket.rate, 4),
+                    'successes': bucket.successes,
+                    'blocks': bucket.blocks,
+                    'errors': bucket.errors
+                }
+                for host, bucket in self._buckets.items()
+            }
+
+
+_default_limiter = AdaptiveRateLimiter()
+
+
+def configure_rate_limiter(**kwargs):
+    """替换全局限速器"""
+    global _default_limiter
+    _default_limiter = AdaptiveRateLimiter(**kwargs)
+    return _default_limiter
+
+
+def get_rate_limiter():
+    """获取全局限速器"""
+    return _default_limiter
@@ -0,0 +1,256 @@
+import os
+import gzip
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+
+from fetch_registry import normalize_url
+from records import to_json
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = 'data/drhorton/records'
+DEFAULT_SHARD_BYTES = 64 * 1024 ** 2
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS records (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    shard TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    written_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_position ON records(shard, offset);
+'''
+
+
+class Codec:
+    """分片的压缩方式；压缩时每条记录是独立的gzip member/zstd frame，可以按偏移量单独解压"""
+
+    def __init__(self, name):
+        if name == 'zstd' and not HAS_ZSTD:
+            logger.warning("zstandard未安装，改用gzip压缩")
+            name = 'gzip'
+        self.name = name
+        self.extension = {'none': '.jsonl', 'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}[name]
+
+    def compress(self, data):
+        if self.name == 'gzip':
+            return gzip.compress(data, compresslevel=6)
+        if self.name == 'zstd':
+            return zstandard.ZstdCompressor(level=6).compress(data)
+        return data
+
+    @staticmethod
+    def for_shard(shard):
+        if shard.endswith('.gz'):
+            return gzip.decompress
+        if shard.endswith('.zst'):
+            if not HAS_ZSTD:
+                raise RuntimeError(f"读取 {shard} 需要安装zstandard")
+            return zstandard.ZstdDecompressor().decompress
+        return lambda data: data
+
+
+class RecordStore:
+    """社区记录的JSONL分片存储：记录按产生顺序追加到轮换的分片，SQLite索引记录每个社区URL的最新位置"""
+
+    def __init__(self, directory=DEFAULT_STORE_DIR, max_shard_bytes=DEFAULT_SHARD_BYTES, compression='none'):
+        self.directory = directory
+        self.max_shard_bytes = max_shard_bytes
+        self.codec = Codec(compression)
+        self.stats = {'written': 0, 'bytes': 0, 'shards': 0}
+        self._lock = threading.Lock()
+        self._shard = None
+        self._file = None
+        self._sequence = 0
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), timeout=60, check_same_thread=False)
+        # 多个抓取进程可以同时写入同一个目录，各自写自己的分片
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def _open_shard(self):
+        """打开新分片；分片名包含启动时间和进程号，不会与其他进程冲突"""
+        if self._file is not None:
+            self._file.close()
+        while True:
+            self._sequence += 1
+            self._shard = f"part-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{self._sequence:05d}{self.codec.extension}"
+            try:
+                self._file = open(os.path.join(self.directory, self._shard), 'xb')
+                break
+            except FileExistsError:
+                continue
+        self.stats['shards'] += 1
+        logger.info(f"Writing community records to {self._shard}")
+
+    def put(self, url, record):
+        """追加一条社区记录，同一个URL的旧记录由索引指向新位置后不再读取"""
+        line = json.dumps({'url': url, 'data': record}, ensure_ascii=False, default=to_json).encode('utf-8') + b'\n'
+        payload = self.codec.compress(line)
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.max_shard_bytes:
+                self._open_shard()
+            offset = self._file.tell()
+            self._file.write(payload)
+            self._file.flush()
+            self._db.execute(
+                'INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)',
+                (normalize_url(url), url, self._shard, offset, len(payload), time.time())
+            )
+            self._db.commit()
+            self.stats['written'] += 1
+            self.stats['bytes'] += len(payload)
+
+    def _read(self, shard, offset, length, handle=None):
+        if handle is None:
+            with open(os.path.join(self.directory, shard), 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+        else:
+            handle.seek(offset)
+            data = handle.read(length)
+        return json.loads(Codec.for_shard(shard)(data))['data']
+
+    def contains(self, url):
+        with self._lock:
+            row = self._db.execute('SELECT 1 FROM records WHERE key = ?', (normalize_url(url),)).fetchone()
+        return row is not None
+
+    def get(self, url):
+        """按社区URL读取最新的记录，不存在时返回None"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT shard, offset, length FROM records WHERE key = ?', (normalize_url(url),)
+            ).fetchone()
+        return self._read(*row) if row else None
+
+    def delete(self, url):
+        """从索引中删除社区，分片中的数据在导出和读取时被忽略"""
+        with self._lock:
+            self._db.execute('DELETE FROM records WHERE key = ?', (normalize_url(url),))
+            self._db.commit()
+
+    def urls(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute('SELECT url FROM records ORDER BY shard, offset')]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def iter_records(self):
+        """按分片和偏移量顺序读取所有最新记录，产出(url, record)"""
+        with self._lock:
+            rows = self._db.execute('SELECT url, shard, offset, length FROM records ORDER BY shard, offset').fetchall()
+        handle = None
+        current = None
+        try:
+            for url, shard, offset, length in rows:
+                if shard != current:
+                    if handle is not None:
+                        handle.close()
+                    handle = open(os.path.join(self.directory, shard), 'rb')
+                    current = shard
+                yield url, self._read(shard, offset, length, handle)
+        finally:
+            if handle is not None:
+                handle.close()
+
+    def export_files(self, output_dir, path_for):
+        """导出为每个社区一个JSON文件的目录结构，path_for(url, output_dir)返回文件路径"""
+        os.makedirs(output_dir, exist_ok=True)
+        count = 0
+        for url, record in self.iter_records():
+            with open(path_for(url, output_dir), 'w', encoding='utf-8') as f:
+                json.dump(record, f, indent=2, ensure_ascii=False)
+            count += 1
+        logger.info(f"已导出 {count} 个社区到 {output_dir}")
+        return count
+
+    def import_files(self, paths):
+        """把已有的社区JSON文件写入存储，URL取自记录中的url字段"""
+        count = 0
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"读取文件 {path} 时出错: {str(e)}")
+                continue
+            url = record.get('url') if isinstance(record, dict) else None
+            if not url:
+                logger.warning(f"文件 {path} 中没有url字段，跳过")
+                continue
+            self.put(url, record)
+            count += 1
+        logger.info(f"已导入 {count} 个社区文件")
+        return count
+
+    def report(self):
+        logger.info(f"Record store ({self.directory}, {self.codec.name}): {len(self)} communities indexed, {self.stats}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._db.close()
+
+
+_default_store = None
+
+
+def configure_record_store(directory=DEFAULT_STORE_DIR, **kwargs):
+    """启用JSONL分片存储，directory为None时禁用（每个社区写一个JSON文件）"""
+    global _default_store
+    if _default_store is not None:
+        _default_store.close()
+    _default_store = RecordStore(directory, **kwargs) if directory else None
+    return _default_store
+
+
+def get_record_store():
+    """获取JSONL分片存储，未启用时返回None"""
+    return _default_store
+
+
+def main():
+    """导入、导出和查看分片存储"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Manage the sharded JSONL store of community records')
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR, help='Directory of the JSONL shards and their index')
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='none', help='Compression of newly written shards')
+    parser.add_argument('--export', metavar='DIR', help='Write one drhorton_<name>.json file per community to DIR')
+    parser.add_argument('--import', dest='import_dir', metavar='DIR', help='Load the drhorton_*.json files in DIR into the store')
+    args = parser.parse_args()
+
+    store = RecordStore(args.store, compression=args.compression)
+    try:
+        if args.import_dir:
+            paths = sorted(os.path.join(args.import_dir, name) for name in os.listdir(args.import_dir)
+                           if name.startswith('drhorton_') and name.endswith('.json'))
+            store.import_files(paths)
+        if args.export:
+            from community_records import community_output_file
+            store.export_files(args.export, community_output_file)
+        store.report()
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
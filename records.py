@@ -0,0 +1,207 @@
+from spec_parsing import first_number, leading_int, price_to_dollars
+
+DEFAULT_OVERVIEW = "This beautiful new construction home features an open concept floor plan with modern finishes throughout."
+
+_MISSING = object()
+
+
+def format_number(value):
+    """整数值输出为"4"，小数输出为"2.5"（不使用科学计数法）"""
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _suffixed(suffix):
+    return lambda value: f"{format_number(value)} {suffix}"
+
+
+class Record:
+    """房源/户型记录的基类：字段保存在__slots__中，数值字段保存为int/float，只在序列化和按键读取时格式化为页面文本格式。
+
+    子类定义FIELDS（JSON键的顺序）、ATTRIBUTES（JSON键 -> 属性名，默认同名）、NUMERIC（JSON键 -> (解析, 格式化)）
+    和OPTIONAL（值为None时不输出的键）。按键读写（record['price']、record.get('beds')）得到的是与原来的字典相同的文本，
+    已有的按字典处理记录的代码不需要修改；数值计算直接读取属性（record.price）。
+    """
+
+    __slots__ = ('_raw', '_extra')
+    FIELDS = ()
+    ATTRIBUTES = {}
+    NUMERIC = {}
+    OPTIONAL = frozenset()
+
+    def __init__(self, **values):
+        self._raw = None
+        self._extra = None
+        for key in self.FIELDS:
+            object.__setattr__(self, self.ATTRIBUTES.get(key, key), None)
+        for key, value in values.items():
+            self[key] = value
+
+    def _attribute(self, key):
+        return self.ATTRIBUTES.get(key, key) if key in self._field_set else None
+
+    def __setitem__(self, key, value):
+        attribute = self._attribute(key)
+        if attribute is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+        if key in self.NUMERIC:
+            parse, fmt = self.NUMERIC[key]
+            typed = parse(value) if isinstance(value, str) else value
+            # 格式化后与原文本不一致时（例如"1989 ft²"）保留原文本，输出不变
+            if isinstance(value, str) and (typed is None or fmt(typed) != value):
+                if self._raw is None:
+                    self._raw = {}
+                self._raw[key] = value
+            elif self._raw is not None:
+                self._raw.pop(key, None)
+            # 数值形式的输入（Coveo API）统一为int/float
+            if isinstance(typed, float) and typed.is_integer():
+                typed = int(typed)
+            value = typed
+        setattr(self, attribute, value)
+
+    def get(self, key, default=None):
+        attribute = self._attribute(key)
+        if attribute is None:
+            return self._extra.get(key, default) if self._extra is not None else default
+        if self._raw is not None and key in self._raw:
+            return self._raw[key]
+        value = getattr(self, attribute)
+        if value is None:
+            return None if key not in self.OPTIONAL else default
+        if key in self.NUMERIC:
+            return self.NUMERIC[key][1](value)
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def keys(self):
+        keys = [key for key in self.FIELDS if key in self]
+        if self._extra is not None:
+            keys.extend(self._extra)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def to_dict(self):
+        """序列化为与原来的字典格式相同的dict（键的顺序为FIELDS）"""
+        return {key: value.to_dict() if isinstance(value, Record) else value for key, value in self.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, Record) else other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()})"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+
+
+class Homesite(Record):
+    """一个在售房源；price为整数美元，beds/sqft为整数，baths为int或float"""
+
+    __slots__ = ('images', 'name', 'plan', 'url', 'id', 'address', 'price', 'beds', 'baths', 'sqft', 'status',
+                 'image_url', 'latitude', 'longitude', 'overview')
+    FIELDS = ('images', 'name', 'plan', 'url', 'id', 'address', 'price', 'beds', 'baths', 'sqft', 'status',
+              'image_url', 'latitude', 'longitude', 'overview')
+    NUMERIC = {
+        'price': (price_to_dollars, lambda value: f"${value:,}"),
+        'beds': (leading_int, format_number),
+        'baths': (first_number, format_number),
+        'sqft': (first_number, format_number),
+    }
+
+    def __init__(self, **values):
+        super().__init__(**values)
+        if self.images is None:
+            self.images = []
+        # 所有房源共用同一段默认介绍
+        if 'overview' not in values:
+            self.overview = DEFAULT_OVERVIEW
+
+
+class PlanDetails(Record):
+    """户型卡片上的规格；price为整数美元（"From $268s" -> 268000）"""
+
+    __slots__ = ('price', 'beds', 'baths', 'half_baths', 'sqft', 'status', 'image_url')
+    FIELDS = ('price', 'beds', 'baths', 'half_baths', 'sqft', 'status', 'image_url')
+    NUMERIC = {
+        'price': (price_to_dollars, lambda value: f"From ${value // 1000}s"),
+        'beds': (leading_int, _suffixed('bd')),
+        'baths': (first_number, _suffixed('ba')),
+        'half_baths': (leading_int, _suffixed('half ba')),
+        'sqft': (first_number, lambda value: f"{value:,} ft²"),
+    }
+
+    def __init__(self, **values):
+        values.setdefault('status', "Actively selling")
+        super().__init__(**values)
+
+
+class HomePlan(Record):
+    """一个户型；没有的url、includedFeatures和floorplan_images不输出"""
+
+    __slots__ = ('name', 'url', 'details', 'included_features', 'floorplan_images')
+    FIELDS = ('name', 'url', 'details', 'includedFeatures', 'floorplan_images')
+    ATTRIBUTES = {'includedFeatures': 'included_features'}
+    OPTIONAL = frozenset({'url', 'includedFeatures', 'floorplan_images'})
+
+    def __setitem__(self, key, value):
+        if key == 'details' and isinstance(value, dict):
+            value = PlanDetails(**value)
+        super().__setitem__(key, value)
+
+
+class AvailableHome:
+    """旧版房屋列表中的一项，只用于社区价格/面积/卧室等范围的计算；缺失的数值为0，层数默认为2"""
+
+    __slots__ = ('name', 'price', 'beds', 'baths', 'sqft', 'address', 'thumbnail', 'url', 'stories')
+
+    def __init__(self, name, price=0, beds=0, baths=0, sqft=0, address='', thumbnail='', url='', stories=2):
+        self.name = name
+        self.price = price
+        self.beds = beds
+        self.baths = baths
+        self.sqft = sqft
+        self.address = address
+        self.thumbnail = thumbnail
+        self.url = url
+        self.stories = stories
+
+    def __repr__(self):
+        return f"AvailableHome({self.name!r}, price={self.price}, beds={self.beds}, baths={self.baths}, sqft={self.sqft})"
+
+
+def to_json(value):
+    """json.dump的default参数：把Record序列化为dict"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
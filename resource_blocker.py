@@ -0,0 +1,134 @@
+import json
+import logging
+import threading
+from fnmatch import fnmatchcase
+
+logger = logging.getLogger(__name__)
+
+# 只读取DOM和src属性，这些资源不需要下载；模式使用CDP Network.setBlockedURLs的通配符语法
+RESOURCE_CATEGORIES = {
+    'tracker': (
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googleadservices.com*',
+        '*googlesyndication.com*', '*agkn.com*', '*connect.facebook.net*', '*facebook.com/tr*',
+        '*hotjar.com*', '*clarity.ms*', '*bat.bing.com*', '*adsrvr.org*', '*demdex.net*',
+        '*nr-data.net*', '*js-agent.newrelic.com*', '*analytics.tiktok.com*', '*ct.pinterest.com*', '*linkedin.com/px*',
+        '*coveo.com/rest/ua/*',
+    ),
+    'media': ('*.mp4*', '*.webm*', '*.m4v*', '*.mov*', '*.mp3*', '*.m3u8*', '*youtube.com/embed*', '*player.vimeo.com*'),
+    'font': ('*.woff*', '*.ttf*', '*.otf*', '*.eot*', '*fonts.googleapis.com*', '*fonts.gstatic.com*', '*use.typekit.net*'),
+    'image': ('*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*', '*.bmp*'),
+}
+DEFAULT_CATEGORIES = tuple(RESOURCE_CATEGORIES)
+
+# 被拦截的请求没有响应，按同类资源的平均大小估算节省的流量；加载过同类资源后改用实际平均值
+ESTIMATED_BYTES = {'tracker': 30_000, 'media': 500_000, 'font': 40_000, 'image': 80_000, 'other': 20_000}
+
+
+class ResourceBlocker:
+    """浏览器抓取时拦截图片、字体、媒体和第三方统计脚本，并统计每个页面省下的请求数和流量"""
+
+    def __init__(self, categories=DEFAULT_CATEGORIES, block=(), allow=()):
+        self.categories = tuple(categories)
+        allow = set(allow)
+        self._rules = []
+        for category in self.categories:
+            for pattern in RESOURCE_CATEGORIES[category]:
+                if pattern not in allow:
+                    self._rules.append((pattern, category))
+        self._rules.extend((pattern, 'other') for pattern in block if pattern not in allow)
+        self.patterns = [pattern for pattern, _ in self._rules]
+        self.stats = {'pages': 0, 'blocked': 0, 'bytes_avoided': 0, 'bytes_loaded': 0, 'by_category': {}}
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def category_of(self, url):
+        """URL匹配的拦截类别，不拦截时返回None"""
+        for pattern, category in self._rules:
+            if fnmatchcase(url, pattern):
+                return category
+        return None
+
+    def _average_bytes(self, category):
+        count, total = self._loaded.get(category, (0, 0))
+        return total // count if count else ESTIMATED_BYTES.get(category, ESTIMATED_BYTES['other'])
+
+    def install(self, driver):
+        """在Selenium Chrome实例上启用CDP拦截"""
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns})
+
+    def record_page(self, url, blocked, bytes_loaded=None):
+        """记录一个页面拦截的请求（{类别: 数量}），输出该页面节省的请求数和估算流量"""
+        with self._lock:
+            avoided = sum(count * self._average_bytes(category) for category, count in blocked.items())
+            total = sum(blocked.values())
+            self.stats['pages'] += 1
+            self.stats['blocked'] += total
+            self.stats['bytes_avoided'] += avoided
+            self.stats['bytes_loaded'] += bytes_loaded or 0
+            for category, count in blocked.items():
+                self.stats['by_category'][category] = self.stats['by_category'].get(category, 0) + count
+        loaded = f", {bytes_loaded / 1024:.0f} KB transferred" if bytes_loaded is not None else ''
+        logger.info(f"Blocked {total} requests {dict(blocked)} on {url}, ~{avoided / 1024:.0f} KB avoided{loaded}")
+        return total, avoided
+
+    def collect(self, driver, url):
+        """读取Chrome的performance日志，统计上一个页面被拦截的请求和实际传输的字节数"""
+        try:
+            entries = driver.get_log('performance')
+        except Exception as e:
+            logger.warning(f"读取performance日志失败 {url}: {str(e)}")
+            return None
+        urls = {}
+        blocked = {}
+        bytes_loaded = 0
+        for entry in entries:
+            message = json.loads(entry['message'])['message']
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.requestWillBeSent':
+                urls[params['requestId']] = params['request']['url']
+            elif method == 'Network.loadingFailed' and params.get('blockedReason') == 'inspector':
+                category = self.category_of(urls.get(params['requestId'], '')) or 'other'
+                blocked[category] = blocked.get(category, 0) + 1
+            elif method == 'Network.loadingFinished':
+                size = int(params.get('encodedDataLength', 0))
+                bytes_loaded += size
+                category = self._loaded_category(urls.get(params['requestId'], ''))
+                if category is not None:
+                    with self._lock:
+                        count, total = self._loaded.get(category, (0, 0))
+                        self._loaded[category] = (count + 1, total + size)
+        return self.record_page(url, blocked, bytes_loaded)
+
+    def _loaded_category(self, url):
+        """允许加载的请求按默认类别归类，用于学习各类资源的平均大小"""
+        for category, patterns in RESOURCE_CATEGORIES.items():
+            if any(fnmatchcase(url, pattern) for pattern in patterns):
+                return category
+        return None
+
+    def report(self):
+        """输出拦截统计"""
+        with self._lock:
+            stats = dict(self.stats, by_category=dict(self.stats['by_category']))
+        pages = stats['pages'] or 1
+        logger.info(f"Resource blocking: {stats['blocked']} requests blocked over {stats['pages']} browser pages "
+                    f"({stats['blocked'] / pages:.1f}/page), ~{stats['bytes_avoided'] / 1024 / 1024:.1f} MB avoided, "
+                    f"{stats['bytes_loaded'] / 1024 / 1024:.1f} MB transferred, {stats['by_category']}")
+        return stats
+
+
+_default_blocker = None
+
+
+def configure_resource_blocker(enabled=True, **kwargs):
+    """启用浏览器资源拦截，enabled为False时禁用；需在浏览器启动前调用"""
+    global _default_blocker
+    _default_blocker = ResourceBlocker(**kwargs) if enabled else None
+    return _default_blocker
+
+
+def get_resource_blocker():
+    """获取浏览器资源拦截器，未启用时返回None"""
+    return _default_blocker
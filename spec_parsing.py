@@ -0,0 +1,287 @@
+import re
+
+# 卡片和社区信息中反复使用的正则，模块加载时编译一次
+PRICE_PATTERN = re.compile(r'\$[\d,]+')
+PRICE_BAND_PATTERN = re.compile(r'\$\d+s')
+BEDS_PATTERN = re.compile(r'(\d+)\s*Bed')
+BATHS_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*Bath')
+HALF_BATHS_PATTERN = re.compile(r'(\d+)\s*Half\s*Bath', re.IGNORECASE)
+SQFT_PATTERN = re.compile(r'(\d+(?:,\d+)?)\s*Sq\.\s*Ft\.')
+STORIES_PATTERN = re.compile(r'(\d+)\s*Story')
+STORIES_DETAIL_PATTERN = re.compile(r'(\d+(?:\.5)?)\s*Story')
+
+# community-secondary-info中的范围格式
+BED_RANGE_PATTERN = re.compile(r'(\d+)\s*-\s*(\d+)\s*Bed')
+BATH_RANGE_PATTERN = re.compile(r'([\d.]+)\s*-\s*([\d.]+)\s*Bath')
+BATH_VALUE_PATTERN = re.compile(r'([\d.]+)\s*Bath')
+SQFT_FROM_PATTERN = re.compile(r'From\s+([\d,]+)\s*Sq\.\s*Ft\.')
+STORY_RANGE_PATTERN = re.compile(r'(\d+)\s*-\s*(\d+)\s*Story')
+
+NUMBER_PATTERN = re.compile(r'\d[\d,]*(?:\.\d+)?')
+STYLE_URL_PATTERN = re.compile(r'url\(["\']?(.*?)["\']?\)')
+LEADING_INT_PATTERN = re.compile(r'\s*([+-]?\d+)(?:\s|$)')
+
+# 单次扫描的分词器：按位置从左到右匹配，每种字段取第一次出现的值；
+# 已被匹配的数字不会再被其他字段读取（逐个re.search时"$546,1841 Bed"会同时得到价格和卧室）
+CARD_TOKEN_PATTERN = re.compile(
+    r'(?P<price>\$[\d,]+)'
+    r'|(?P<beds>\d+)\s*Bed'
+    r'|(?P<half_baths>\d+)\s*(?i:half\s*bath)'
+    r'|(?P<baths>\d+(?:\.\d+)?)\s*Bath'
+    r'|(?P<sqft>\d+(?:,\d+)?)\s*Sq\.\s*Ft\.'
+    r'|(?P<stories>\d+)\s*Story'
+)
+
+# 旧版房屋列表的宽松格式，在转为小写并去掉逗号的文本上匹配
+LOOSE_TOKEN_PATTERN = re.compile(
+    r'(?P<beds>\d+)\s*bed'
+    r'|(?P<baths>\d+(?:\.\d+)?)\s*bath'
+    r'|(?P<sqft>\d+)\s*sq\s*ft'
+)
+
+
+def sqft_to_int(text):
+    """将"1,989"这样的面积文本转换为整数"""
+    if text is None:
+        return None
+    digits = str(text).replace(',', '').strip()
+    return int(digits) if digits.isdigit() else None
+
+
+def price_to_dollars(text):
+    """将"$263,900"或价格段"From $268s"（即$268,000起）转换为整数美元，无法解析时返回None"""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return int(text)
+    text = str(text)
+    band = PRICE_BAND_PATTERN.search(text)
+    if band:
+        return int(band.group(0)[1:-1]) * 1000
+    match = PRICE_PATTERN.search(text)
+    if not match:
+        return None
+    digits = match.group(0)[1:].replace(',', '')
+    return int(digits) if digits else None
+
+
+def first_number(value):
+    """值中的第一个数字（去掉千位分隔符），例如"2.5 ba" -> 2.5、"1,799 ft²" -> 1799，无法解析时返回None"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = NUMBER_PATTERN.search(str(value))
+    if not match:
+        return None
+    number = match.group(0).replace(',', '')
+    return float(number) if '.' in number else int(number)
+
+
+def leading_int(value):
+    """取值的第一个词作为整数，例如"3 bd" -> 3，无法解析时返回None"""
+    if isinstance(value, int):
+        return value
+    match = LEADING_INT_PATTERN.match(str(value))
+    return int(match.group(1)) if match else None
+
+
+def format_range(low, high, prefix=''):
+    """将最小/最大值格式化为"3 - 4"或"3"，都为空时返回None"""
+    values = [value for value in (low, high) if value is not None]
+    if not values:
+        return None
+    low, high = min(values), max(values)
+    if low == high:
+        return f"{prefix}{low:g}"
+    return f"{prefix}{low:g} - {prefix}{high:g}"
+
+
+# 价格统一为整数美元（price_to_dollars），CardSpecs、records、derivations和price_stats使用同一单位
+_CONVERTERS = {
+    'price': price_to_dollars,
+    'beds': int,
+    'half_baths': int,
+    'baths': float,
+    'sqft': sqft_to_int,
+    'stories': int,
+}
+
+
+class CardSpecs:
+    """一段卡片文本中解析出的规格：数值字段是类型化的值，raw保存匹配到的原始文本"""
+
+    __slots__ = ('price', 'beds', 'baths', 'half_baths', 'sqft', 'stories', 'raw')
+
+    def __init__(self):
+        self.price = None
+        self.beds = None
+        self.baths = None
+        self.half_baths = None
+        self.sqft = None
+        self.stories = None
+        self.raw = {}
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'raw'}
+
+    def __repr__(self):
+        return f"CardSpecs({self.as_dict()})"
+
+
+def _tokenize(pattern, text):
+    specs = CardSpecs()
+    raw = specs.raw
+    for match in pattern.finditer(text):
+        kind = match.lastgroup
+        if kind in raw:
+            continue
+        value = match.group(kind)
+        raw[kind] = value
+        setattr(specs, kind, _CONVERTERS[kind](value))
+    return specs
+
+
+def parse_card_specs(text):
+    """单次扫描卡片文本，得到价格(美元)、卧室、浴室、半浴、面积和层数"""
+    if not text:
+        return CardSpecs()
+    return _tokenize(CARD_TOKEN_PATTERN, text)
+
+
+def parse_loose_specs(text):
+    """解析旧版房屋列表中"3 bedrooms / 2.5 baths / 1,800 sq ft"这样的宽松格式"""
+    if not text:
+        return CardSpecs()
+    return _tokenize(LOOSE_TOKEN_PATTERN, text.lower().replace(',', ''))
+
+
+def shorten_description(description):
+    """移除"About our community"前缀，并把过长的描述截断到200个字符以内"""
+    # 移除"About our community"前缀
+    if description.startswith("About our community"):
+        description = description[len("About our community"):].strip()
+    
+    # 如果内容太长，截取前200个字符，并在最后一个句号处截断
+    if len(description) > 200:
+        # 找到200字符内的最后一个句号
+        short_desc = description[:200]
+        last_period = short_desc.rfind('.')
+        if last_period > 0:
+            description = description[:last_period + 1]
+        else:
+            # 如果没有找到句号，就在最近的空格处截断
+            last_space = short_desc.rfind(' ')
+            if last_space > 0:
+                description = description[:last_space] + '...'
+            else:
+                description = short_desc + '...'
+    return description
+
+
+def extract_amenity_name(description):
+    """从描述中提取简短的设施名称"""
+    # 移除常见的修饰词和连接词
+    remove_words = ['featuring', 'including', 'with', 'and', 'the', 'a', 'an', 'to', 'for', 'in', 'on', 'at', 'of']
+    
+    # 处理特殊格式的描述
+    if ':' in description:
+        # 如果描述中包含冒号，使用冒号前的部分
+        return description.split(':')[0].strip()
+    elif '-' in description:
+        # 如果描述中包含破折号，使用破折号前的部分
+        return description.split('-')[0].strip()
+    else:
+        # 将描述分割成单词
+        words = description.split()
+        # 找到第一个不在移除列表中的单词开始
+        start_idx = 0
+        while start_idx < len(words) and words[start_idx].lower() in remove_words:
+            start_idx += 1
+        
+        # 取前3-4个有意义的单词作为名称
+        meaningful_words = []
+        for word in words[start_idx:]:
+            if word.lower() not in remove_words:
+                meaningful_words.append(word)
+            if len(meaningful_words) >= 4:
+                break
+        
+        return ' '.join(meaningful_words) if meaningful_words else description
+
+
+def parse_home_details_texts(texts):
+    """从community-secondary-info的p标签文本中解析面积、卧室和浴室范围"""
+    details = {
+        'sqft_range': None,
+        'bed_range': None,
+        'bath_range': None
+    }
+    for text in texts:
+        # 提取卧室数量 (3 - 5 Bed)
+        bed_match = BED_RANGE_PATTERN.search(text)
+        if bed_match:
+            details['bed_range'] = f"{bed_match.group(1)} - {bed_match.group(2)}"
+        
+        # 提取浴室数量，先尝试范围格式 (2.5 - 4 Bath)，如果没有则尝试单个数值
+        bath_range_match = BATH_RANGE_PATTERN.search(text)
+        if bath_range_match:
+            details['bath_range'] = f"{bath_range_match.group(1)} - {bath_range_match.group(2)}"
+        else:
+            # 尝试匹配单个数值 (3 Bath)
+            bath_single_match = BATH_VALUE_PATTERN.search(text)
+            if bath_single_match:
+                details['bath_range'] = bath_single_match.group(1)
+        
+        # 提取面积 (From 1,989 Sq. Ft.)
+        sqft_match = SQFT_FROM_PATTERN.search(text)
+        if sqft_match:
+            details['sqft_range'] = f"From {sqft_match.group(1)} Sq. Ft."
+    return details
+
+
+def parse_stories_texts(texts):
+    """从community-secondary-info的p标签文本中解析层数范围"""
+    for text in texts:
+        # 匹配 "1 - 2 Story" 格式
+        story_match = STORY_RANGE_PATTERN.search(text)
+        if story_match:
+            return f"{story_match.group(1)} - {story_match.group(2)}"
+        # 匹配单个数字的 "2 Story" 格式
+        single_story_match = STORIES_PATTERN.search(text)
+        if single_story_match:
+            return single_story_match.group(1)
+    return "2"  # 默认值
+
+
+def apply_plan_specs(details, specs):
+    """将卡片规格写入homeplan的details，沿用"3 bd"/"2.5 ba"/"1,989 ft²"格式"""
+    raw = specs.raw
+    if 'beds' in raw:
+        details['beds'] = f"{raw['beds']} bd"
+    if 'baths' in raw:
+        details['baths'] = f"{raw['baths']} ba"
+        # half bath只在有浴室数量时记录
+        if 'half_baths' in raw:
+            details['half_baths'] = f"{raw['half_baths']} half ba"
+    if 'sqft' in raw:
+        details['sqft'] = f"{raw['sqft']} ft²"
+
+
+def apply_homesite_specs(homesite, specs):
+    """将卡片规格写入homesite，面积去掉千位分隔符"""
+    raw = specs.raw
+    if 'beds' in raw:
+        homesite['beds'] = raw['beds']
+    if 'baths' in raw:
+        homesite['baths'] = raw['baths']
+    if 'sqft' in raw:
+        homesite['sqft'] = raw['sqft'].replace(',', '')
+
+
+def format_phone(text):
+    """将10位号码格式化为(xxx) xxx-xxxx，其他情况返回原文本"""
+    # 提取数字
+    phone = re.sub(r'[^\d]', '', text)
+    # 格式化电话号码
+    if len(phone) == 10:
+        return f"({phone[:3]}) {phone[3:6]}-{phone[6:]}"
+    return text.strip()
@@ -0,0 +1,23 @@
+import os
+import sys
+import json
+import copy
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SOUTHGATE_FILE = os.path.join(ROOT, 'data', 'drhorton', 'drhorton_southgate.json')
+
+
+@pytest.fixture(scope='session')
+def _southgate_record():
+    with open(SOUTHGATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def southgate(_southgate_record):
+    """抓取的南门社区记录（2个在售房源、4个户型），每个测试一份副本"""
+    return copy.deepcopy(_southgate_record)
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import get_drhorton_page
+from change_tracker import community_fingerprint, configure_change_tracker
+from community_records import community_output_file, load_community_record
+
+URL = 'https://www.drhorton.com/georgia/southern-georgia/bainbridge/southgate'
+SUMMARY = {'status': 'Now Selling', 'available_homes': 2, 'price_min': 206900, 'price_text': 'From $206,900',
+           'beds_min': 3, 'beds_max': 4, 'modified': 1750420000000}
+
+
+def test_fingerprint_ignores_index_date():
+    reindexed = dict(SUMMARY, modified=1760000000000)
+    assert community_fingerprint(reindexed) == community_fingerprint(SUMMARY)
+    assert community_fingerprint(dict(SUMMARY, available_homes=3)) != community_fingerprint(SUMMARY)
+
+
+@pytest.mark.parametrize('content', ['{"name": "Southg', '', '[1, 2]', '\udcff'])
+def test_corrupt_record_loads_as_none(tmp_path, content):
+    with open(community_output_file(URL, str(tmp_path)), 'w', encoding='utf-8', errors='surrogateescape') as f:
+        f.write(content)
+    assert load_community_record(URL, str(tmp_path)) is None
+
+
+def test_missing_record_loads_as_none(tmp_path):
+    assert load_community_record(URL, str(tmp_path)) is None
+
+
+@pytest.fixture
+def incremental(tmp_path, monkeypatch):
+    """启用增量抓取，社区指纹与上次相同；记录页面是否被重新渲染"""
+    tracker = configure_change_tracker(str(tmp_path / 'fingerprints.sqlite'))
+    tracker.record(URL, community_fingerprint(SUMMARY))
+    rendered = []
+    monkeypatch.setattr(get_drhorton_page, 'get_community_summary', lambda url: SUMMARY)
+    monkeypatch.setattr(get_drhorton_page, 'render_community_page', lambda url: rendered.append(url))
+    yield rendered
+    configure_change_tracker(None)
+
+
+def test_unchanged_community_is_skipped(tmp_path, incremental, southgate):
+    with open(community_output_file(URL, str(tmp_path)), 'w', encoding='utf-8') as f:
+        json.dump(southgate, f)
+    assert get_drhorton_page.fetch_page(URL, str(tmp_path))
+    assert incremental == []
+
+
+def test_corrupt_record_is_recrawled(tmp_path, incremental):
+    with open(community_output_file(URL, str(tmp_path)), 'w', encoding='utf-8') as f:
+        f.write('{"name": "Southg')
+    get_drhorton_page.fetch_page(URL, str(tmp_path))
+    assert incremental == [URL]
@@ -0,0 +1,102 @@
+import json
+import argparse
+
+import pytest
+import requests
+
+import coveo_discovery
+from coveo_discovery import STATE_BOUNDS, discover, distance, state_region
+from get_drhorton_api_links import default_output_files, fetch_api_data
+
+# 各州边缘的城市，州的查询圆必须覆盖
+EDGE_CITIES = [
+    ('CA', 32.79, -115.56),   # El Centro
+    ('CA', 32.72, -117.16),   # San Diego
+    ('CA', 41.76, -124.20),   # Crescent City
+    ('FL', 25.76, -80.19),    # Miami
+    ('FL', 24.56, -81.78),    # Key West
+    ('FL', 30.42, -87.22),    # Pensacola
+    ('TX', 31.76, -106.49),   # El Paso
+    ('TX', 25.90, -97.50),    # Brownsville
+]
+
+
+@pytest.mark.parametrize('code', sorted(STATE_BOUNDS))
+def test_state_region_covers_bounding_box(code):
+    _, south, west, north, east = STATE_BOUNDS[code]
+    region = state_region(code)
+    for latitude in (south, north):
+        for longitude in (west, east):
+            assert distance(region.latitude, region.longitude, latitude, longitude) <= region.radius
+
+
+@pytest.mark.parametrize('code, latitude, longitude', EDGE_CITIES)
+def test_state_region_covers_edge_cities(code, latitude, longitude):
+    region = state_region(code)
+    assert distance(region.latitude, region.longitude, latitude, longitude) <= region.radius
+
+
+class FakeClient:
+    """按referrer返回固定结果，名称在failing中的区域抛出请求异常"""
+
+    def __init__(self, failing=(), pool_size=None):
+        self.failing = failing
+
+    def search(self, payload):
+        hub = payload['searchHub']
+        if hub in self.failing:
+            raise requests.exceptions.ConnectionError(f"{hub} unreachable")
+        raw = {'urihash': hub, 'furllink67549': f"/{hub.lower()}/community"}
+        return {'totalCount': 1, 'results': [{'raw': raw}]}
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    def install(failing=()):
+        monkeypatch.setattr(coveo_discovery, 'CoveoClient', lambda pool_size=None: FakeClient(failing))
+    return install
+
+
+def test_discover_reports_failed_regions(tmp_path, fake_client):
+    fake_client(failing=('Georgia',))
+    stream_path = tmp_path / 'links.jsonl'
+    index = discover([state_region('FL'), state_region('GA')], workers=2, stream_path=str(stream_path))
+    assert [region.name for region, _ in index.failed] == ['Georgia']
+    # 有失败时保留.partial，不替换上次完整的结果
+    assert not stream_path.exists()
+    assert (tmp_path / 'links.jsonl.partial').exists()
+
+
+def test_fetch_api_data_skips_writing_on_failure(tmp_path, fake_client):
+    fake_client(failing=('Georgia',))
+    links_file = tmp_path / 'links.json'
+    links_file.write_text('["previous"]')
+    communities_file = tmp_path / 'communities.json'
+    links = fetch_api_data([state_region('FL'), state_region('GA')], workers=2,
+                           output_file=str(links_file), communities_file=str(communities_file))
+    assert links is None
+    assert json.loads(links_file.read_text()) == ['previous']
+    assert not communities_file.exists()
+
+
+def test_fetch_api_data_writes_complete_results(tmp_path, fake_client):
+    fake_client()
+    links_file = tmp_path / 'links.json'
+    links = fetch_api_data([state_region('FL'), state_region('GA')], workers=2,
+                           output_file=str(links_file), communities_file=str(tmp_path / 'communities.json'))
+    assert len(links) == 2
+    assert sorted(json.loads(links_file.read_text())) == sorted(links)
+    assert (tmp_path / 'links.jsonl').exists()
+
+
+@pytest.mark.parametrize('argv, expected', [
+    ({}, ('florida_links.json', 'florida_communities.json')),
+    ({'states': ['FL']}, ('florida_links.json', 'florida_communities.json')),
+    ({'states': ['FL', 'GA', 'TX']}, ('fl_ga_tx_links.json', 'fl_ga_tx_communities.json')),
+    ({'nationwide': True, 'states': ['HI']}, ('nationwide_links.json', 'nationwide_communities.json')),
+    ({'region': ['Tampa:27.95,-82.46,80']}, ('regions_links.json', 'regions_communities.json')),
+])
+def test_default_output_files(argv, expected):
+    args = argparse.Namespace(**dict({'nationwide': False, 'states': None, 'region': []}, **argv))
+    links_file, communities_file = default_output_files(args)
+    assert (links_file.split('/')[-1], communities_file.split('/')[-1]) == expected
@@ -0,0 +1,101 @@
+import os
+import json
+import logging
+
+import pytest
+
+import coveo_api
+from coveo_api import check_listing_coverage, fetch_listings, get_listing, load_community_index, load_listings
+from detail_pages import apply_floorplan_listing, apply_homesite_listing
+from records import HomePlan, Homesite
+
+# 南门社区房源和户型查询的Coveo响应：按抓取的页面数据和LISTING_FIELDS整理，不是API的原始响应；
+# 用get_drhorton_page.py --dump-listings保存真实响应后替换，字段名不符时这里的测试会失败
+LISTINGS_FILE = os.path.join(os.path.dirname(__file__), 'fixtures', 'coveo_listings_southgate.json')
+SOUTHGATE_ID = '686220000'
+
+
+class FixtureClient:
+    """按firstResult分页返回固定的搜索结果"""
+
+    def __init__(self, response, page_size=4):
+        self.response = response
+        self.page_size = page_size
+        self.payloads = []
+
+    def search(self, payload):
+        self.payloads.append(payload)
+        first = payload['firstResult']
+        return {'totalCount': self.response['totalCount'],
+                'results': self.response['results'][first:first + self.page_size]}
+
+
+@pytest.fixture
+def listings_response():
+    with open(LISTINGS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def community_index(tmp_path, monkeypatch):
+    """加载社区文档索引（南门有2个在售房源），测试结束后恢复模块状态"""
+    monkeypatch.setattr(coveo_api, '_index', {})
+    monkeypatch.setattr(coveo_api, '_listings', {})
+
+    def load(*communities):
+        path = tmp_path / 'communities.json'
+        path.write_text(json.dumps(list(communities)))
+        return load_community_index(str(path))
+    return load
+
+
+def community_raw(slug, community_id, available_homes):
+    return {'furllink67549': f"/georgia/southern-georgia/bainbridge/{slug}", 'fid67549': community_id,
+            'fmarketingname67549': slug.title(), 'fnumberofavailablehomes67549': available_homes}
+
+
+def test_fetch_listings_pages_and_summarizes(listings_response):
+    client = FixtureClient(listings_response)
+    listings = fetch_listings([SOUTHGATE_ID], client=client)
+    assert [payload['firstResult'] for payload in client.payloads] == [0, 4]
+    assert [listing['kind'] for listing in listings] == ['homesite'] * 2 + ['plan'] * 4
+    assert {listing['community_id'] for listing in listings} == {SOUTHGATE_ID}
+    homesite = listings[0]
+    assert (homesite['name'], homesite['plan'], homesite['price'], homesite['beds'], homesite['sqft']) == \
+        ('177 WYNN CT', 'The Cali', 263900, 4, 1799)
+    assert all(src.startswith('https://www.drhorton.com/-/media/') for listing in listings[:2] for src in listing['images'])
+
+
+def test_listings_map_to_southgate_records(southgate, listings_response, community_index):
+    community_index(community_raw('southgate', SOUTHGATE_ID, 2))
+    load_listings([SOUTHGATE_ID], client=FixtureClient(listings_response))
+
+    for expected in southgate['homesites']:
+        homesite = Homesite.from_dict(dict(expected, plan=None, images=[]))
+        assert apply_homesite_listing(homesite, get_listing(homesite['url']))
+        assert homesite.to_dict() == Homesite.from_dict(expected).to_dict()
+
+    for expected in southgate['homeplans']:
+        plan = HomePlan.from_dict({key: value for key, value in expected.items() if key != 'floorplan_images'})
+        assert apply_floorplan_listing(plan, get_listing(plan['url']))
+        assert plan['floorplan_images'] == expected['floorplan_images']
+        # 页面上已有的规格保持不变
+        assert plan['details'].to_dict() == HomePlan.from_dict(expected)['details'].to_dict()
+
+
+def test_coverage_warns_for_communities_without_homesites(listings_response, community_index, caplog):
+    community_index(community_raw('southgate', SOUTHGATE_ID, 2), community_raw('hawthorne', '686230000', 3),
+                    community_raw('sold-out', '686240000', 0))
+    with caplog.at_level(logging.WARNING, logger='coveo_api'):
+        load_listings([SOUTHGATE_ID, '686230000', '686240000'], client=FixtureClient(listings_response))
+    missing = [record.getMessage() for record in caplog.records]
+    assert len(missing) == 1 and missing[0].endswith('/hawthorne')
+
+
+def test_coverage_flags_wrong_template(listings_response, community_index, caplog):
+    community_index(community_raw('southgate', SOUTHGATE_ID, 2))
+    with caplog.at_level(logging.WARNING, logger='coveo_api'):
+        listings = fetch_listings([SOUTHGATE_ID], client=FixtureClient(listings_response), homesite_template='Spec Home')
+        missing = check_listing_coverage(listings)
+    assert missing == ['https://www.drhorton.com/georgia/southern-georgia/bainbridge/southgate']
+    assert any('--homesite-template' in record.getMessage() for record in caplog.records)
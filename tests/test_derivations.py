@@ -0,0 +1,94 @@
+import random
+
+from derivations import default_stages, derive, derive_records, summarize, summarize_batch
+
+
+def baseline_bed_range(record):
+    """原来process_drhorton_json中的规则：房源的卧室数，房源中没有有效值时用户型的卧室数"""
+    beds = []
+    for homesite in record.get('homesites') or []:
+        if homesite.get('beds'):
+            try:
+                beds.append(int(str(homesite['beds']).split()[0]))
+            except (ValueError, IndexError):
+                continue
+    if not beds:
+        for plan in record.get('homeplans') or []:
+            if plan.get('details', {}).get('beds'):
+                try:
+                    beds.append(int(str(plan['details']['beds']).split()[0]))
+                except (ValueError, IndexError):
+                    continue
+    if not beds:
+        return None
+    return f"{max(beds)} bd" if min(beds) == max(beds) else f"{min(beds)} - {max(beds)} bd"
+
+
+def test_southgate_matches_baseline(southgate):
+    scraped = dict(southgate['details'])
+    assert derive(southgate)
+    details = southgate['details']
+    # 原来的后处理只改写bed_range：两个在售房源都是4卧
+    assert details['bed_range'] == "4 bd"
+    assert details['bed_range'] == baseline_bed_range(southgate)
+    # 抓取时写入的其他范围保持不变
+    for field in ('price_range', 'sqft_range', 'bath_range', 'stories_range', 'community_count'):
+        assert details[field] == scraped[field]
+    assert details['price_range'] == "$206,900 - $269,900"
+    assert details['sqft_range'] == "From 1,204 Sq. Ft."
+    assert details['homesite_count'] == 2
+    assert details['homeplan_count'] == 4
+    assert details['homesite_status_counts'] == {'Available': 2}
+    # 第二次运行没有变化
+    assert not derive(southgate)
+
+
+def test_bed_range_falls_back_to_homeplans(southgate):
+    for homesite in southgate['homesites']:
+        homesite['beds'] = None
+    derive(southgate, ['bed_range'])
+    assert southgate['details']['bed_range'] == "3 - 4 bd"
+
+
+def test_batch_matches_baseline(southgate):
+    records = [southgate, {'details': {}, 'homesites': [], 'homeplans': [{'details': {'beds': '3 bd'}}]}]
+    derive_records(records, batch=True)
+    assert records[0]['details']['bed_range'] == "4 bd"
+    assert records[1]['details']['bed_range'] == "3 bd"
+
+
+def test_stories_range_is_opt_in():
+    assert 'stories_range' not in default_stages()
+    record = {'details': {'stories_range': "1 - 2"}, 'homeplans': [{'floorplan_images': [{}]}]}
+    derive(record)
+    assert record['details']['stories_range'] == "1 - 2"
+    derive(record, ['stories_range'])
+    assert record['details']['stories_range'] == "1"
+
+
+def _random_record(rng):
+    return {
+        'details': {},
+        'price_from': rng.choice(["$0", None, "$199,900"]),
+        'homesites': [
+            {'price': rng.choice(["$99,000", "$269,900", None, "Call"]), 'beds': rng.choice(["3", "4", None, "x"]),
+             'sqft': rng.choice(["1799", "2,001", None]), 'baths': rng.choice(["2.5", None]),
+             'status': rng.choice(["Available", "Sold", None])}
+            for _ in range(rng.randint(0, 4))
+        ],
+        'homeplans': [
+            {'details': {'price': rng.choice(["From $268s", None]), 'beds': rng.choice(["3 bd", "5 bd", None]),
+                         'sqft': "1,204 ft²"},
+             'floorplan_images': [{}] * rng.randint(0, 2)}
+            for _ in range(rng.randint(0, 3))
+        ],
+    }
+
+
+def test_bed_range_and_batch_mode_on_random_records():
+    rng = random.Random(0)
+    records = [_random_record(rng) for _ in range(500)]
+    assert summarize_batch(records) == [summarize(record) for record in records]
+    for record in records:
+        derive(record, ['bed_range'])
+        assert record['details'].get('bed_range') == baseline_bed_range(record)
@@ -0,0 +1,47 @@
+import pytest
+
+from detail_pages import parse_homesite_page_info
+from http_fetcher import has_expected_containers
+
+PLAN_LINK = '<a class="floorplan-link" href="/floor-plans/4ebf">The Cali floorplan</a>'
+GALLERY = ('<div class="PropertyGallery"><div class="sevenImages">'
+           '<div class="image"><img alt="Front" src="/-/media/lot_420.jpg?w=494"></div>'
+           '<div class="image"><img src="//www.drhorton.com/-/media/ghs-18.jpg"></div></div></div>')
+EMPTY_GALLERY = '<div class="PropertyGallery"><div class="sevenImages"></div></div><footer><img src="/logo.svg"></footer>'
+LAZY_GALLERY = '<div class="PropertyGallery"><div class="twoImages"><img data-src="/-/media/a.jpg" src=""></div></div>'
+
+
+def page(*parts):
+    return f"<html><body>{''.join(parts)}</body></html>"
+
+
+@pytest.mark.parametrize('html, expected', [
+    (page(PLAN_LINK, GALLERY), True),
+    (page(GALLERY), False),
+    (page(PLAN_LINK), False),
+    (page(PLAN_LINK, EMPTY_GALLERY), False),
+    (page(PLAN_LINK, LAZY_GALLERY), False),
+    (page(PLAN_LINK, GALLERY.replace('sevenImages', 'twoImages')), True),
+    ('', False),
+])
+def test_homesite_containers(html, expected):
+    assert has_expected_containers(html, 'homesite') is expected
+
+
+def test_accepted_homesite_page_parses_plan_and_images():
+    info = parse_homesite_page_info(page(PLAN_LINK, GALLERY))
+    assert info['plan'] == 'The Cali'
+    assert info['images'] == ['https://www.drhorton.com/-/media/lot_420.jpg?w=494',
+                              'https://www.drhorton.com/-/media/ghs-18.jpg']
+
+
+@pytest.mark.parametrize('html, expected', [
+    (page('<div class="property-details"><span>2 Story</span></div>'), True),
+    (page('<div class="content-photo"></div>'), False),
+])
+def test_floorplan_containers(html, expected):
+    assert has_expected_containers(html, 'floorplan') is expected
+
+
+def test_community_pages_are_not_checked():
+    assert has_expected_containers(page('<div></div>'), 'community')
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+import rate_limiter
+from page_cache import PageCache
+
+URL = 'https://www.drhorton.com/florida/tampa/southgate'
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """记录发出的请求，条件GET返回固定的状态码"""
+
+    def __init__(self, status_code=304):
+        self.status_code = status_code
+        self.calls = []
+
+    def head(self, url, **kwargs):
+        self.calls.append(('HEAD', url, kwargs.get('headers')))
+        return FakeResponse(200)
+
+    def get(self, url, **kwargs):
+        self.calls.append(('GET', url, kwargs.get('headers')))
+        return FakeResponse(self.status_code)
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = rate_limiter.AdaptiveRateLimiter(initial_rate=1000, max_rate=1000, burst=1000)
+    monkeypatch.setattr(rate_limiter, '_default_limiter', limiter)
+    return limiter
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PageCache(str(tmp_path), ttls={'community': 0}, revalidate=True)
+    cache._session = FakeSession()
+    yield cache
+    cache.close()
+
+
+def test_put_uses_response_validators_without_head(cache):
+    cache.put(URL, '<html>southgate</html>', headers={'etag': '"abc"', 'last-modified': 'Sat, 17 Oct 2026 00:00:00 GMT'})
+    cache.put(URL + '-2', '<html>other</html>')
+    assert cache._session.calls == []
+    rows = dict(cache._db.execute('SELECT url, etag FROM entries').fetchall())
+    assert rows == {URL: '"abc"', URL + '-2': None}
+
+
+def test_revalidation_goes_through_rate_limiter(cache, limiter):
+    cache.put(URL, '<html>southgate</html>', headers={'ETag': '"abc"'})
+    assert cache.get(URL) == '<html>southgate</html>'
+    assert cache._session.calls == [('GET', URL, {'If-None-Match': '"abc"'})]
+    assert limiter.snapshot()['www.drhorton.com']['successes'] == 1
+    assert cache.report()['revalidated'] == 1
+
+
+def test_blocked_revalidation_slows_host_and_expires(cache, limiter):
+    cache._session = FakeSession(status_code=429)
+    cache.put(URL, '<html>southgate</html>', headers={'ETag': '"abc"'})
+    assert cache.get(URL) is None
+    assert limiter.snapshot()['www.drhorton.com']['blocks'] == 1
+    assert cache.report()['expired'] == 1
+
+
+def test_stats_are_counted_under_concurrency(tmp_path):
+    cache = PageCache(str(tmp_path))
+    threads = [threading.Thread(target=lambda: [cache.get(f"{URL}/{i}") for i in range(200)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.report()['misses'] == 1600
+    cache.close()
@@ -0,0 +1,89 @@
+import pytest
+
+from price_stats import format_price_fields, listing_stats, price_fields
+from records import HomePlan, Homesite
+from spec_parsing import PRICE_PATTERN
+
+# 南门社区（2个在售房源、4个户型）的期望统计，分位数为线性插值（与numpy.percentile默认一致）
+SOUTHGATE_STATS = {
+    'homesites': {
+        'price': {'count': 2, 'min': 263900, 'max': 269900, 'p25': 265400, 'median': 266900, 'p75': 268400},
+        'sqft': {'count': 2, 'min': 1799, 'max': 1799, 'p25': 1799, 'median': 1799, 'p75': 1799},
+        'beds': {'count': 2, 'min': 4, 'max': 4, 'p25': 4, 'median': 4, 'p75': 4},
+    },
+    'homeplans': {
+        'price': {'count': 4, 'min': 207000, 'max': 268000, 'p25': 214500, 'median': 226000, 'p75': 243250},
+        'sqft': {'count': 4, 'min': 1204, 'max': 1799, 'p25': 1369.75, 'median': 1502.5, 'p75': 1634.75},
+        'beds': {'count': 4, 'min': 3, 'max': 4, 'p25': 3, 'median': 3.5, 'p75': 4},
+    },
+    'all': {
+        'price': {'count': 6, 'min': 207000, 'max': 269900, 'p25': 221500, 'median': 249450, 'p75': 266975},
+        'sqft': {'count': 6, 'min': 1204, 'max': 1799, 'p25': 1463.75, 'median': 1689.5, 'p75': 1799},
+        'beds': {'count': 6, 'min': 3, 'max': 4, 'p25': 3.25, 'median': 4, 'p75': 4},
+    },
+}
+
+
+def string_max_price(homesites):
+    """原来extract_community_info中的写法：逐个re.search后按字符串比较"""
+    max_price = None
+    for homesite in homesites:
+        if homesite.get('price'):
+            price_match = PRICE_PATTERN.search(str(homesite['price']))
+            if price_match:
+                current_price = price_match.group(0)
+                if not max_price or current_price > max_price:
+                    max_price = current_price
+    return max_price
+
+
+@pytest.fixture(params=['dict', 'record'])
+def southgate_listings(request, southgate):
+    """字典形式（读取的JSON）和Record形式（抓取时）的房源和户型"""
+    homesites, homeplans = southgate['homesites'], southgate['homeplans']
+    if request.param == 'record':
+        homesites = [Homesite(**homesite) for homesite in homesites]
+        homeplans = [HomePlan(**plan) for plan in homeplans]
+    return homesites, homeplans
+
+
+def test_southgate_listing_stats(southgate_listings):
+    assert listing_stats(*southgate_listings) == SOUTHGATE_STATS
+
+
+def test_southgate_price_fields(southgate, southgate_listings):
+    stats = listing_stats(*southgate_listings)
+    assert price_fields(southgate['price_from'], stats) == ('$206,900', '$206,900 - $269,900')
+    assert southgate['details']['price_range'] == '$206,900 - $269,900'
+    # 页面没有起始价格时用房源和户型中的最低价（户型"From $207s"）
+    assert price_fields('$0', stats) == ('$207,000', '$207,000 - $269,900')
+
+
+def test_price_fields_without_homesites(southgate):
+    stats = listing_stats([], southgate['homeplans'])
+    assert price_fields(southgate['price_from'], stats) == ('$206,900', '$206,900')
+    assert price_fields('$0', listing_stats([], [])) == ('$0', '$0')
+
+
+def test_max_price_is_numeric_not_lexicographic():
+    homesites = [Homesite(price="$99,000"), Homesite(price="$269,900"), Homesite(price="Call for price")]
+    # 原来的字符串比较认为"$99,000" > "$269,900"
+    assert string_max_price(homesites) == "$99,000"
+    stats = listing_stats(homesites)
+    assert stats['homesites']['price'] == {
+        'count': 2, 'min': 99000, 'max': 269900, 'p25': 141725, 'median': 184450, 'p75': 227175,
+    }
+    assert price_fields("$95,000", stats) == ('$95,000', '$95,000 - $269,900')
+
+
+def test_dict_and_record_inputs_agree():
+    dicts = [{'price': "$99,000", 'sqft': "2001", 'beds': "3"}, {'price': "$1,250,000", 'sqft': None, 'beds': "5"}]
+    records = [Homesite(**homesite) for homesite in dicts]
+    assert listing_stats(dicts) == listing_stats(records)
+    assert listing_stats(dicts)['homesites']['price']['max'] == 1250000
+
+
+def test_format_price_fields():
+    assert format_price_fields("$206,900", 207000, 269900) == ("$206,900", "$206,900 - $269,900")
+    assert format_price_fields("$0", 207000, None) == ("$207,000", "$207,000")
+    assert format_price_fields(None, None, None) == (None, None)
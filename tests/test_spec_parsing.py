@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from spec_parsing import (
+    CardSpecs,
+    apply_homesite_specs,
+    apply_plan_specs,
+    parse_card_specs,
+    parse_loose_specs,
+    price_to_dollars,
+    sqft_to_int,
+)
+
+SEEDS = range(5)
+
+
+def _amount(rng):
+    return rng.choice([0, rng.randint(1, 999), rng.randint(1000, 999999), rng.randint(10 ** 6, 10 ** 9)])
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_price_round_trip(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        amount = _amount(rng)
+        assert price_to_dollars(f"${amount:,}") == amount
+        assert price_to_dollars(f"${amount}") == amount
+        assert parse_card_specs(f"${amount:,} | 3 Bed").price == amount
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_sqft_round_trip(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        sqft = rng.randint(100, 99999)
+        assert sqft_to_int(f"{sqft:,}") == sqft
+        if sqft < 10 ** 6:
+            assert parse_card_specs(f"{sqft:,} Sq. Ft.").sqft == sqft
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('$263,900', 263900),
+    ('From $268s', 268000),
+    ('Starting in the $300s', 300000),
+    (263900, 263900),
+    ('$,', None),
+    ('Call for pricing', None),
+    (None, None),
+])
+def test_price_to_dollars(text, expected):
+    assert price_to_dollars(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2.5 Bath', {'baths': 2.5}),
+    ('3 Bath', {'baths': 3.0}),
+    ('1,204 Sq. Ft.', {'sqft': 1204}),
+    ('980 Sq. Ft.', {'sqft': 980}),
+    ('2 Story', {'stories': 2}),
+    ('1 Half Bath', {'half_baths': 1}),
+    ('2 Bath | 1 half bath', {'baths': 2.0, 'half_baths': 1}),
+    ('$269,900 | 4 Bed | 2 Bath | 1,799 Sq. Ft. | 2 Story',
+     {'price': 269900, 'beds': 4, 'baths': 2.0, 'sqft': 1799, 'stories': 2}),
+    # 价格吞掉了紧跟的数字，卧室数不会再读取同一个数字
+    ('$546,1841 Bed', {'price': 5461841}),
+    ('Under Contract', {}),
+    ('', {}),
+    (None, {}),
+])
+def test_parse_card_specs(text, expected):
+    specs = parse_card_specs(text)
+    values = {name: value for name, value in specs.as_dict().items() if value is not None}
+    assert values == expected
+    for name, value in values.items():
+        assert type(value) is type(expected[name])
+
+
+def test_parse_card_specs_first_value_wins():
+    specs = parse_card_specs('3 Bed | 4 Bed | $200,000 | $300,000')
+    assert (specs.beds, specs.price) == (3, 200000)
+    assert specs.raw == {'beds': '3', 'price': '$200,000'}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('3 bedrooms / 2.5 baths / 1,800 sq ft', {'beds': 3, 'baths': 2.5, 'sqft': 1800}),
+    ('4 Beds 2 Baths', {'beds': 4, 'baths': 2.0}),
+    ('1,204 SQ FT', {'sqft': 1204}),
+    ('', {}),
+])
+def test_parse_loose_specs(text, expected):
+    values = {name: value for name, value in parse_loose_specs(text).as_dict().items() if value is not None}
+    assert values == expected
+
+
+def test_apply_specs_formats():
+    specs = parse_card_specs('3 Bed | 2.5 Bath | 1 Half Bath | 1,204 Sq. Ft.')
+    details = {}
+    apply_plan_specs(details, specs)
+    assert details == {'beds': '3 bd', 'baths': '2.5 ba', 'half_baths': '1 half ba', 'sqft': '1,204 ft²'}
+    homesite = {}
+    apply_homesite_specs(homesite, specs)
+    assert homesite == {'beds': '3', 'baths': '2.5', 'sqft': '1204'}
+
+
+def test_apply_specs_missing_fields():
+    details = {'beds': '4 bd'}
+    apply_plan_specs(details, parse_card_specs('1 Half Bath'))
+    # 没有浴室数量时不记录half bath
+    assert details == {'beds': '4 bd'}
+    homesite = {}
+    apply_homesite_specs(homesite, CardSpecs())
+    assert homesite == {}
@@ -0,0 +1,62 @@
+import time
+
+from work_queue import DONE, PENDING, RUNNING, WorkQueue
+
+URL = 'https://www.drhorton.com/georgia/southern-georgia/valdosta/southgate'
+HOMESITE = 'https://www.drhorton.com/georgia/southern-georgia/valdosta/southgate/1-main-st'
+
+
+def _state(queue, kind='community', url=URL):
+    return queue._db.execute('SELECT state, owner FROM tasks WHERE kind = ? AND url = ?', (kind, url)).fetchone()
+
+
+def test_stale_worker_cannot_finish_a_reclaimed_task(tmp_path):
+    path = str(tmp_path / 'queue.sqlite')
+    stale = WorkQueue(path, lease_seconds=0.05)
+    current = WorkQueue(path, lease_seconds=60)
+    stale.enqueue('community', [URL])
+
+    old_task = stale.claim('community', owner='worker-a')
+    time.sleep(0.1)
+    new_task = current.claim('community', owner='worker-b')
+    assert new_task is not None and new_task['attempt'] == 2
+    current.checkpoint('homesite', HOMESITE, {'plan': 'Cali', 'images': []})
+
+    # 租约过期的worker不能续约，也不能再记录检查点
+    assert stale.renew() is False
+    stale.checkpoint('homesite', HOMESITE, {'plan': 'Other', 'images': []})
+    assert current.result('homesite', HOMESITE) == {'plan': 'Cali', 'images': []}
+
+    # 结束任务时不能覆盖新owner的状态，也不能删除新owner的检查点
+    assert stale.complete(old_task) is False
+    assert stale.fail(old_task, 'timeout') is False
+    assert _state(current) == (RUNNING, 'worker-b')
+    assert current.result('homesite', HOMESITE) == {'plan': 'Cali', 'images': []}
+
+    assert current.complete(new_task) is True
+    assert _state(current) == (DONE, None)
+    assert _state(current, 'homesite', HOMESITE) is None
+
+
+def test_checkpoint_renews_the_lease(tmp_path):
+    path = str(tmp_path / 'queue.sqlite')
+    worker = WorkQueue(path, lease_seconds=0.3)
+    other = WorkQueue(path, lease_seconds=60)
+    worker.enqueue('community', [URL])
+    task = worker.claim('community', owner='worker-a')
+
+    # 每个检查点都续约，处理时间超过一个租约期的社区不会被其他进程领取
+    for _ in range(4):
+        time.sleep(0.15)
+        worker.checkpoint('homesite', HOMESITE, {'plan': 'Cali', 'images': []})
+        assert other.claim('community', owner='worker-b') is None
+    assert worker.complete(task) is True
+
+
+def test_failed_task_is_requeued_by_its_owner(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'), max_attempts=2)
+    queue.enqueue('community', [URL])
+    task = queue.claim('community', owner='worker-a')
+    assert queue.fail(task, 'blocked') is True
+    assert _state(queue) == (PENDING, None)
+    assert queue.renew(task) is False
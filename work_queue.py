@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+
+from fetch_registry import normalize_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_FILE = 'data/drhorton/work_queue.sqlite'
+DEFAULT_MAX_ATTEMPTS = 3
+# 租约过期后，崩溃或被杀掉的worker正在处理的任务会被重新领取；
+# 处理中的worker每记录一个详情页检查点就续约一次，长时间限速的社区不会被其他进程抢走
+DEFAULT_LEASE_SECONDS = 30 * 60
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    parent TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    result TEXT,
+    owner TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(kind, state, lease_expires);
+'''
+
+
+def worker_id():
+    """当前进程和线程的标识，用作任务租约的owner"""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+class WorkQueue:
+    """SQLite持久化的任务队列：社区任务可被多个进程安全领取，homesite/floorplan任务记录详情页的检查点"""
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, max_attempts=DEFAULT_MAX_ATTEMPTS, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        # 当前线程正在处理的社区，详情页检查点挂在它下面
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        # WAL允许其他进程在写入时继续读取
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA busy_timeout=60000')
+        self._db.executescript(SCHEMA)
+
+    def enqueue(self, kind, urls, parent=None):
+        """加入任务，已存在的任务保持原状态；返回新加入的数量"""
+        now = time.time()
+        rows = [(kind, normalize_url(url), url, parent, PENDING, now, now) for url in urls]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute('BEGIN IMMEDIATE')
+            self._db.executemany(
+                'INSERT OR IGNORE INTO tasks (kind, key, url, parent, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._db.execute('COMMIT')
+            return self._db.total_changes - before
+
+    def claim(self, kind='community', owner=None):
+        """领取一个待处理的任务（包括租约已过期的运行中任务），没有任务时返回None"""
+        owner = owner or worker_id()
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._db.execute(
+                    'SELECT id, url, attempts FROM tasks WHERE kind = ? AND '
+                    '(state = ? OR (state = ? AND lease_expires < ?)) ORDER BY attempts, id LIMIT 1',
+                    (kind, PENDING, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    self._db.execute('COMMIT')
+                    return None
+                task_id, url, attempts = row
+                self._db.execute(
+                    'UPDATE tasks SET state = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                    (RUNNING, owner, now + self.lease_seconds, now, task_id)
+                )
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        task = {'id': task_id, 'kind': kind, 'url': url, 'attempt': attempts + 1, 'owner': owner}
+        self._local.task = task
+        return task
+
+    def renew(self, task=None):
+        """延长任务的租约（默认为当前线程领取的任务）；租约已被其他worker接手时返回False"""
+        task = task or self._task()
+        if task is None:
+            return False
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE kind = ? AND key = ? AND owner = ? AND state = ?',
+                (now + self.lease_seconds, now, task['kind'], normalize_url(task['url']), task['owner'], RUNNING)
+            )
+        if cursor.rowcount == 0:
+            logger.warning(f"Task {task['kind']} {task['url']} lost its lease to another worker")
+            return False
+        return True
+
+    def _finish(self, task, state, error=None, result=None, delete_children=False):
+        """结束任务：只有仍持有租约的owner才能更新状态，返回是否更新成功"""
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = self._db.execute(
+                    'UPDATE tasks SET state = ?, last_error = ?, result = COALESCE(?, result), owner = NULL, '
+                    'lease_expires = NULL, updated_at = ? WHERE kind = ? AND key = ? AND owner = ? AND state = ?',
+                    (state, error, result, now, task['kind'], normalize_url(task['url']), task['owner'], RUNNING)
+                )
+                finished = cursor.rowcount > 0
+                if finished and delete_children:
+                    self._db.execute('DELETE FROM tasks WHERE parent = ?', (task['url'],))
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        if self._task() is task:
+            self._local.task = None
+        if not finished:
+            logger.warning(f"Task {task['kind']} {task['url']} lost its lease to another worker, "
+                           f"result of attempt {task['attempt']} discarded")
+        return finished
+
+    def complete(self, task):
+        """任务完成，删除它下面的详情页检查点，下次抓取时重新获取；租约已丢失时返回False，不修改新owner的状态"""
+        return self._finish(task, DONE, delete_children=True)
+
+    def fail(self, task, error):
+        """任务失败，未超过重试次数时重新排队；租约已丢失时返回False"""
+        state = PENDING if task['attempt'] < self.max_attempts else FAILED
+        finished = self._finish(task, state, error=str(error))
+        if finished:
+            logger.warning(f"Task {task['kind']} {task['url']} failed (attempt {task['attempt']}/{self.max_attempts}): {error}")
+        return finished
+
+    def _task(self):
+        return getattr(self._local, 'task', None)
+
+    def _parent(self):
+        task = self._task()
+        return task['url'] if task is not None else None
+
+    def checkpoint(self, kind, url, result):
+        """记录当前社区下一个详情页的处理结果，重启后直接使用，同时为社区任务续约；
+        没有领取社区任务或租约已丢失时不记录"""
+        parent = self._parent()
+        if parent is None or not self.renew():
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO tasks (kind, key, url, parent, state, attempts, result, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?) ON CONFLICT(kind, key) DO UPDATE SET '
+                'state = excluded.state, attempts = tasks.attempts + 1, result = excluded.result, last_error = NULL, '
+                'updated_at = excluded.updated_at',
+                (kind, normalize_url(url), url, parent, DONE, json.dumps(result, ensure_ascii=False), now, now)
+            )
+
+    def record_failure(self, kind, url, error):
+        """记录一次详情页失败，超过重试次数后标记为failed；同时为社区任务续约"""
+        parent = self._parent()
+        if parent is None or not self.renew():
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO tasks (kind, key, url, parent, state, attempts, last_error, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?) ON CONFLICT(kind, key) DO UPDATE SET '
+                'attempts = tasks.attempts + 1, last_error = excluded.last_error, updated_at = excluded.updated_at, '
+                'state = CASE WHEN tasks.attempts + 1 >= ? THEN ? ELSE ? END',
+                (kind, normalize_url(url), url, parent, PENDING, str(error), now, now, self.max_attempts, FAILED, PENDING)
+            )
+
+    def result(self, kind, url):
+        """当前社区下已完成的详情页结果，没有时返回None"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT result FROM tasks WHERE kind = ? AND key = ? AND state = ? AND parent = ?',
+                (kind, normalize_url(url), DONE, self._parent())
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def exhausted(self, kind, url):
+        """当前社区下的详情页已达到最大重试次数"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT state FROM tasks WHERE kind = ? AND key = ? AND parent = ?', (kind, normalize_url(url), self._parent())
+            ).fetchone()
+        return row is not None and row[0] == FAILED
+
+    def counts(self):
+        """按类型和状态统计任务数"""
+        with self._lock:
+            rows = self._db.execute('SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state').fetchall()
+        counts = {}
+        for kind, state, count in rows:
+            counts.setdefault(kind, {})[state] = count
+        return counts
+
+    def reset(self, kind='community', states=(FAILED,)):
+        """把指定状态的任务重新放回队列，例如重试失败的社区或开始新一轮抓取"""
+        placeholders = ','.join('?' for _ in states)
+        with self._lock:
+            cursor = self._db.execute(
+                f'UPDATE tasks SET state = ?, attempts = 0, last_error = NULL, updated_at = ? WHERE kind = ? AND state IN ({placeholders})',
+                (PENDING, time.time(), kind, *states)
+            )
+            return cursor.rowcount
+
+    def report(self):
+        logger.info(f"Work queue ({self.path}): {self.counts()}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_queue = None
+
+
+def configure_work_queue(path=DEFAULT_QUEUE_FILE, **kwargs):
+    """启用持久化任务队列，path为None时禁用"""
+    global _default_queue
+    if _default_queue is not None:
+        _default_queue.close()
+    _default_queue = WorkQueue(path, **kwargs) if path else None
+    return _default_queue
+
+
+def get_work_queue():
+    """获取持久化任务队列，未启用时返回None"""
+    return _default_queue